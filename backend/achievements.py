@@ -0,0 +1,121 @@
+from collections import defaultdict, namedtuple
+
+# events: the app events that can earn the achievement.
+# check(facts): whether the facts reported with the event qualify.
+AchievementRule = namedtuple('AchievementRule', ['name', 'description', 'icon', 'events', 'check'])
+
+RULES = [
+    AchievementRule(
+        'First Step', 'Added your first transaction', 'CheckCircleIcon',
+        ('transaction_added',), lambda facts: True
+    ),
+    AchievementRule(
+        'Consistent Planner', 'Logged in daily for a week', 'CalendarIcon',
+        ('login',), lambda facts: facts['login_streak'] >= 7
+    ),
+    AchievementRule(
+        'Savings Star', 'Completed a savings goal', 'StarIcon',
+        ('goal_contribution',), lambda facts: facts['goal_current'] >= facts['goal_target']
+    ),
+    AchievementRule(
+        'Budget Master', 'Stayed within budget for 3 months', 'CheckIcon',
+        ('budget_check',), lambda facts: facts['budget_streak'] >= 3
+    ),
+]
+
+EARNED_QUERY = 'SELECT name FROM achievements WHERE user_id = %s'
+AWARD_INSERT = 'INSERT IGNORE INTO achievements (user_id, name, description, icon) VALUES (%s, %s, %s, %s)'
+
+
+class AchievementEngine:
+    """Award achievements from the events the app reports.
+
+    earned_cache maps user_id -> frozenset of earned names (e.g. an LRUCache).
+    It is loaded from the database once per user, so a rule that is already
+    held costs no query. Names awarded in an open transaction should be added
+    with mark_earned() once it commits.
+
+    The cached sets are replaced, never mutated, so a request reading one is
+    not disturbed by another adding to it. Two concurrent additions can lose
+    one; that name is then inserted again, which INSERT IGNORE makes a no-op.
+    """
+
+    def __init__(self, rules, earned_cache):
+        self.rules_by_event = defaultdict(list)
+        for rule in rules:
+            for event in rule.events:
+                self.rules_by_event[event].append(rule)
+        self.earned_cache = earned_cache
+
+    def earned(self, cursor, user_id):
+        names = self.earned_cache.get(user_id)
+        if names is None:
+            cursor.execute(EARNED_QUERY, (user_id,))
+            names = frozenset(row[0] for row in cursor.fetchall())
+            self.earned_cache.set(user_id, names)
+        return names
+
+    def evaluate(self, conn, user_id, event, facts):
+        """Insert the achievements the event earns on the caller's connection; the caller commits.
+
+        Returns the rules newly awarded. The unique (user_id, name) key makes
+        INSERT IGNORE a no-op for anything awarded concurrently.
+        """
+        candidates = self.candidates(event, facts)
+        if not candidates:
+            return []
+        cursor = conn.cursor()
+        try:
+            earned = self.earned(cursor, user_id)
+            awarded = []
+            stored = []  # Already in the table, by another request or process
+            for rule in candidates:
+                if rule.name in earned:
+                    continue
+                cursor.execute(AWARD_INSERT, (user_id, rule.name, rule.description, rule.icon))
+                if cursor.rowcount:
+                    awarded.append(rule)
+                else:
+                    stored.append(rule.name)
+            if stored:
+                self.mark_earned(user_id, stored)
+            return awarded
+        finally:
+            cursor.close()
+
+    async def evaluate_async(self, conn, user_id, event, facts):
+        """evaluate() on a mysql.connector.aio connection."""
+        candidates = self.candidates(event, facts)
+        if not candidates:
+            return []
+        cursor = await conn.cursor()
+        try:
+            earned = self.earned_cache.get(user_id)
+            if earned is None:
+                await cursor.execute(EARNED_QUERY, (user_id,))
+                earned = frozenset(row[0] for row in await cursor.fetchall())
+                self.earned_cache.set(user_id, earned)
+            awarded = []
+            stored = []
+            for rule in candidates:
+                if rule.name in earned:
+                    continue
+                await cursor.execute(AWARD_INSERT, (user_id, rule.name, rule.description, rule.icon))
+                if cursor.rowcount:
+                    awarded.append(rule)
+                else:
+                    stored.append(rule.name)
+            if stored:
+                self.mark_earned(user_id, stored)
+            return awarded
+        finally:
+            await cursor.close()
+
+    def candidates(self, event, facts):
+        """The rules the event can earn whose check passes on its facts."""
+        return [rule for rule in self.rules_by_event.get(event, ()) if rule.check(facts)]
+
+    def mark_earned(self, user_id, names):
+        earned = self.earned_cache.get(user_id)
+        if earned is not None:
+            self.earned_cache.set(user_id, earned | frozenset(names))
@@ -0,0 +1,299 @@
+import math
+from datetime import date
+
+import numpy as np
+
+GRANULARITIES = ('day', 'week', 'month')
+# datetime64[D] counts days from 1970-01-01, a Thursday; this shifts Monday to 0
+EPOCH_WEEKDAY = 3
+ONE_DAY = np.timedelta64(1, 'D')
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class RollupArrays:
+    """A user's daily_rollups rows as parallel NumPy arrays.
+
+    rows are (day, category, budget_id, goal_id, income, expense) tuples.
+    Categories are stored as codes into self.categories (sorted), so grouping
+    by category is a bincount rather than a dict lookup per row.
+    """
+
+    def __init__(self, rows):
+        if rows:
+            days, categories, budget_ids, goal_ids, income, expense = zip(*rows)
+        else:
+            days = categories = budget_ids = goal_ids = income = expense = ()
+        count = len(days)
+        # Through ordinals: numpy parsing date objects one by one is several times slower
+        ordinals = np.fromiter(map(date.toordinal, days), dtype=np.int64, count=count)
+        self.days = (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+        self.categories, self.category_codes = np.unique(np.array(categories, dtype=str), return_inverse=True)
+        self.budget_ids = np.fromiter(budget_ids, dtype=np.int64, count=count)
+        self.goal_ids = np.fromiter(goal_ids, dtype=np.int64, count=count)
+        self.income = np.fromiter(map(float, income), dtype=np.float64, count=count)
+        self.expense = np.fromiter(map(float, expense), dtype=np.float64, count=count)
+
+    def __len__(self):
+        return len(self.days)
+
+    def between(self, start, end):
+        """Mask of the rows dated start..end, both included."""
+        return (self.days >= np.datetime64(start, 'D')) & (self.days <= np.datetime64(end, 'D'))
+
+
+def week_start(days):
+    """The Monday on or before each datetime64[D] day."""
+    return days - (days.astype(np.int64) + EPOCH_WEEKDAY) % 7
+
+
+def month_start(days):
+    return days.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def period_axis(start, end, granularity):
+    """The first day of every period overlapping start..end."""
+    start = np.datetime64(start, 'D')
+    end = np.datetime64(end, 'D')
+    if granularity == 'month':
+        return np.arange(start.astype('datetime64[M]'), end.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    if granularity == 'week':
+        return np.arange(week_start(start), end + ONE_DAY, np.timedelta64(7, 'D'))
+    return np.arange(start, end + ONE_DAY)
+
+
+def period_index(days, axis, granularity):
+    """Position in axis of the period each day falls in."""
+    if granularity == 'month':
+        return (days.astype('datetime64[M]') - axis[0].astype('datetime64[M]')).astype(np.int64)
+    if granularity == 'week':
+        return (week_start(days) - axis[0]).astype(np.int64) // 7
+    return (days - axis[0]).astype(np.int64)
+
+
+def choose_granularity(start, end, max_points):
+    """The finest granularity that fits start..end into max_points periods,
+    or month when nothing does (downsample() then merges months)."""
+    for granularity in GRANULARITIES:
+        if len(period_axis(start, end, granularity)) <= max_points:
+            return granularity
+    return 'month'
+
+
+def grouped_sums(index, codes, weights, periods, width):
+    """A (periods, width) matrix of weights summed by (period index, code)."""
+    flat = np.bincount(index * width + codes, weights=weights, minlength=periods * width)
+    return flat.reshape(periods, width)
+
+
+def downsample(values, labels, max_points):
+    """Merge consecutive rows of values (summing them) until at most max_points
+    remain; each merged row is labelled with its first label. Returns
+    (values, labels, rows merged per point)."""
+    count = len(labels)
+    if count <= max_points:
+        return values, labels, 1
+    size = math.ceil(count / max_points)
+    padding = -count % size
+    if padding:
+        values = np.concatenate([values, np.zeros((padding,) + values.shape[1:])])
+    return values.reshape((-1, size) + values.shape[1:]).sum(axis=1), labels[::size], size
+
+
+def rolling_mean(values, window):
+    """Trailing mean over window rows; the first rows average what there is so far."""
+    if window <= 1 or not len(values):
+        return values
+    totals = np.cumsum(values, axis=0)
+    totals[window:] = totals[window:] - totals[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return totals / counts.reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def deltas(values):
+    """Change from the previous row and the change as a fraction of it; NaN for
+    the first row and where the previous row is zero."""
+    change = np.full(values.shape, np.nan)
+    change[1:] = np.diff(values, axis=0)
+    previous = np.full(values.shape, np.nan)
+    previous[1:] = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(previous != 0, change / previous, np.nan)
+    return change, fraction
+
+
+def to_list(values, decimals=2):
+    """Rounded floats for JSON, with NaN as None."""
+    return [None if math.isnan(value) else value for value in np.round(values, decimals).tolist()]
+
+
+def dates_to_list(days):
+    return np.datetime_as_string(days, unit='D').tolist()
+
+
+def trend_series(frame, start, end, granularity, max_points, window):
+    """Income, expense and net per period for start..end, spending per category
+    per period, and a rolling mean of expense over window points."""
+    axis = period_axis(start, end, granularity)
+    width = len(frame.categories)
+    mask = frame.between(start, end)
+    index = period_index(frame.days[mask], axis, granularity)
+    codes = frame.category_codes[mask]
+    # Column 0 is income, 1 expense, then spending per category code
+    matrix = np.zeros((len(axis), width + 2))
+    matrix[:, 0] = np.bincount(index, weights=frame.income[mask], minlength=len(axis))
+    matrix[:, 1] = np.bincount(index, weights=frame.expense[mask], minlength=len(axis))
+    matrix[:, 2:] = grouped_sums(index, codes, frame.expense[mask], len(axis), width)
+    matrix, axis, bucket_size = downsample(matrix, axis, max_points)
+
+    spending = matrix[:, 2:]
+    spent = spending.any(axis=0)
+    return {
+        'granularity': granularity,
+        'bucket_size': bucket_size,
+        'periods': dates_to_list(axis),
+        'income': to_list(matrix[:, 0]),
+        'expense': to_list(matrix[:, 1]),
+        'net': to_list(matrix[:, 0] - matrix[:, 1]),
+        'expense_rolling': to_list(rolling_mean(matrix[:, 1], window)),
+        'window': window,
+        'categories': {
+            str(category): to_list(spending[:, position])
+            for position, category in zip(np.flatnonzero(spent), frame.categories[spent])
+        }
+    }
+
+
+def monthly_changes(frame, start, end, max_months):
+    """Expense per calendar month in start..end, overall and per category, with
+    month-over-month change. Only the latest max_months months are returned."""
+    axis = period_axis(start, end, 'month')
+    width = len(frame.categories)
+    mask = frame.between(start, end)
+    index = period_index(frame.days[mask], axis, 'month')
+    spending = grouped_sums(index, frame.category_codes[mask], frame.expense[mask], len(axis), width)
+    total = spending.sum(axis=1)
+    total_change, total_fraction = deltas(total)
+    change, fraction = deltas(spending)
+
+    latest = slice(-max_months, None)
+    spent = spending.any(axis=0)
+    return {
+        'months': [month[:7] for month in dates_to_list(axis[latest])],
+        'expense': to_list(total[latest]),
+        'change': to_list(total_change[latest]),
+        'change_pct': to_list(total_fraction[latest] * 100, 1),
+        'categories': {
+            str(category): {
+                'expense': to_list(spending[latest, position]),
+                'change': to_list(change[latest, position]),
+                'change_pct': to_list(fraction[latest, position] * 100, 1)
+            }
+            for position, category in zip(np.flatnonzero(spent), frame.categories[spent])
+        }
+    }
+
+
+def budget_burn_rates(budgets, today):
+    """Project each budget's spend to the end of its current period.
+
+    budgets are (id, category, amount, period, spent) tuples, spent being the
+    spend so far this period as a positive amount. The daily rate is spent
+    over the days elapsed, today included; exhausted_on is the day that rate
+    uses up the budget, when that falls before the period ends.
+
+    >>> burn = budget_burn_rates([(1, 'Food', 100, 'monthly', 150)], date(2026, 10, 10))[0]
+    >>> burn['spent'], burn['daily_rate'], burn['projected'], burn['status']
+    (150.0, 15.0, 465.0, 'over')
+    """
+    if not budgets:
+        return []
+    ids, categories, amounts, periods, spent = zip(*budgets)
+    amounts = np.array(amounts, dtype=np.float64)
+    spent = np.array(spent, dtype=np.float64)
+    weekly = np.array(periods) == 'weekly'
+    today = np.datetime64(today, 'D')
+
+    this_month = month_start(today)
+    starts = np.where(weekly, week_start(today), this_month)
+    ends = np.where(weekly, starts + np.timedelta64(7, 'D'), (this_month.astype('datetime64[M]') + 1).astype('datetime64[D]'))
+    period_days = (ends - starts).astype(np.int64)
+    elapsed = (today - starts).astype(np.int64) + 1
+    daily_rate = spent / elapsed
+    projected = daily_rate * period_days
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_left = np.where(daily_rate > 0, (amounts - spent) / daily_rate, np.inf)
+    runs_out = (spent <= amounts) & (projected > amounts)
+    exhausted_on = today + np.ceil(np.where(runs_out, days_left, 0)).astype(np.int64)
+    status = np.where(spent > amounts, 'over', np.where(runs_out, 'at_risk', 'on_track'))
+
+    return [
+        {
+            'id': ids[i],
+            'category': categories[i],
+            'period': periods[i],
+            'amount': round(float(amounts[i]), 2),
+            'spent': round(float(spent[i]), 2),
+            'period_end': str(ends[i] - ONE_DAY),
+            'daily_rate': round(float(daily_rate[i]), 2),
+            'projected': round(float(projected[i]), 2),
+            'exhausted_on': str(exhausted_on[i]) if runs_out[i] else None,
+            'status': str(status[i])
+        }
+        for i in range(len(ids))
+    ]
+
+
+def goal_etas(frame, goals, today, window_days):
+    """Estimate when each savings goal is reached at its recent saving rate.
+
+    goals are (id, name, target_amount, current_amount, deadline) tuples. The
+    rate is the income recorded against the goal over the last window_days
+    days; required_rate is what would meet the deadline instead.
+    """
+    if not goals:
+        return []
+    ids, names, targets, current, deadlines = zip(*goals)
+    targets = np.array(targets, dtype=np.float64)
+    current = np.array(current, dtype=np.float64)
+    today = np.datetime64(today, 'D')
+
+    recent = frame.between(today - np.timedelta64(window_days - 1, 'D'), today) & (frame.goal_ids > 0)
+    goal_ids = np.array(ids, dtype=np.int64)
+    order = np.argsort(goal_ids)
+    positions = np.searchsorted(goal_ids[order], frame.goal_ids[recent])
+    positions = np.minimum(positions, len(goal_ids) - 1)
+    known = goal_ids[order][positions] == frame.goal_ids[recent]
+    contributed = np.zeros(len(goal_ids))
+    contributed[order] = np.bincount(positions[known], weights=frame.income[recent][known], minlength=len(goal_ids))
+
+    daily_rate = contributed / window_days
+    remaining = np.maximum(targets - current, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eta_days = np.where(daily_rate > 0, np.ceil(remaining / daily_rate), np.inf)
+
+    results = []
+    for i, goal_id in enumerate(ids):
+        deadline = deadlines[i]
+        days_to_deadline = int((np.datetime64(deadline, 'D') - today).astype(np.int64)) if deadline else None
+        if remaining[i] == 0:
+            eta, status = str(today), 'reached'
+        elif np.isinf(eta_days[i]):
+            eta, status = None, 'stalled'
+        else:
+            eta = str(today + np.timedelta64(int(eta_days[i]), 'D'))
+            status = 'on_track' if days_to_deadline is None or eta_days[i] <= days_to_deadline else 'behind'
+        results.append({
+            'id': goal_id,
+            'name': names[i],
+            'target_amount': round(float(targets[i]), 2),
+            'current_amount': round(float(current[i]), 2),
+            'deadline': deadline.isoformat() if deadline else None,
+            'daily_rate': round(float(daily_rate[i]), 2),
+            'eta': eta,
+            'required_rate': (
+                round(float(remaining[i]) / days_to_deadline, 2)
+                if days_to_deadline and days_to_deadline > 0 else None
+            ),
+            'status': status
+        })
+    return results
@@ -1,6 +1,9 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, stream_with_context, has_app_context
 from flask_cors import CORS
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+import click
 import mysql.connector
+from mysql.connector import pooling
 import bcrypt
 from datetime import datetime
 from groq import Groq
@@ -10,7 +13,30 @@ import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
 import json
+import csv
+import io
 from decimal import Decimal
+import threading
+import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import functools
+import secrets
+import re
+from collections import OrderedDict
+from rule_matcher import build_matcher
+from few_shot import build_example_index, build_prompt, prompt_instructions
+from event_hub import EventHub, SubscriberLimitError
+from achievements import AchievementEngine, RULES as ACHIEVEMENT_RULES
+from migrations import migrate, MigrationError
+from query_plans import check_query_plans
+from fast_json import row_encoder, dumps, choose_encoding, compress, COMPRESS_MIN_BYTES
+from metrics import Registry, Counter, Gauge, Histogram, RequestStats, TimedConnection, current_request
+from llm_gateway import LLMGateway, CallSite, CircuitBreaker
+from analytics import (
+    RollupArrays, GRANULARITIES, choose_granularity, trend_series, monthly_changes, budget_burn_rates, goal_etas
+)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -29,6 +55,126 @@ db_config = {
     'database': 'budget_app'
 }
 
+# Request metrics, served in the Prometheus text format on /metrics. Each
+# response also gets a Server-Timing header splitting its time between MySQL,
+# Groq and the app. Streamed responses are timed to their first byte; queries
+# and Groq calls made while streaming still count toward their route.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+BACKGROUND_LABELS = ('background', '')  # Work outside a request: workers, flushes, refreshes
+
+metrics_registry = Registry()
+ROUTE_LABELS = ['route', 'method']
+http_requests_total = metrics_registry.register(Counter(
+    'budget_app_http_requests_total', 'Requests handled.', ['route', 'method', 'status']))
+http_request_duration = metrics_registry.register(Histogram(
+    'budget_app_http_request_duration_seconds', 'Request latency, to the first byte for streamed responses.',
+    ROUTE_LABELS))
+db_queries_total = metrics_registry.register(Counter(
+    'budget_app_db_queries_total', 'Statements sent to MySQL, commits and rollbacks included.', ROUTE_LABELS))
+db_seconds_total = metrics_registry.register(Counter(
+    'budget_app_db_seconds_total', 'Seconds spent waiting on MySQL, fetches included.', ROUTE_LABELS))
+db_connections_total = metrics_registry.register(Counter(
+    'budget_app_db_connections_total', 'Connections checked out of the pool.', ROUTE_LABELS))
+llm_calls_total = metrics_registry.register(Counter(
+    'budget_app_llm_calls_total', 'Successful Groq calls.', ROUTE_LABELS))
+llm_seconds_total = metrics_registry.register(Counter(
+    'budget_app_llm_seconds_total', 'Seconds spent in successful Groq calls, retries included.', ROUTE_LABELS))
+llm_call_duration = metrics_registry.register(Histogram(
+    'budget_app_llm_call_duration_seconds', 'Groq call latency per call site, retries included.', ['site']))
+llm_tokens_total = metrics_registry.register(Counter(
+    'budget_app_llm_tokens_total', 'Tokens Groq reported using.', ['site', 'kind']))
+metrics_registry.register(Gauge(
+    'budget_app_db_pool_in_use', 'Pooled connections checked out now.',
+    read=lambda: {(): pool_stats['in_use']}))
+metrics_registry.register(Gauge(
+    'budget_app_llm_in_flight', 'Groq calls in flight now.',
+    read=lambda: {(): llm.in_flight}))
+metrics_registry.register(Gauge(
+    'budget_app_llm_circuit_open', '1 while the Groq circuit breaker fails calls fast.',
+    read=lambda: {(): int(llm.breaker.is_open())}))
+metrics_registry.register(Gauge(
+    'budget_app_event_streams', 'Open /events streams.',
+    read=lambda: {(): event_hub.stats()['streams']}))
+
+def work_labels():
+    """The current request's RequestStats while it is open, else the labels to record under at once."""
+    stats = current_request.get()
+    if stats is None and has_app_context():
+        # A streamed body runs after teardown reset current_request, but in the request's app context
+        stats = g.get('request_stats')
+    if stats is not None and stats.labels is None:
+        return stats, None
+    return None, stats.labels if stats is not None else BACKGROUND_LABELS
+
+def record_db_query(seconds, is_statement):
+    stats, labels = work_labels()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.db_queries += is_statement
+        return
+    db_seconds_total.inc(labels, seconds)
+    if is_statement:
+        db_queries_total.inc(labels)
+
+def record_db_connection():
+    stats, labels = work_labels()
+    if stats is not None:
+        stats.db_connections += 1
+    else:
+        db_connections_total.inc(labels)
+
+def record_llm_call(site, seconds, usage):
+    llm_call_duration.observe((site,), seconds)
+    if usage is not None:
+        llm_tokens_total.inc((site, 'prompt'), usage.prompt_tokens or 0)
+        llm_tokens_total.inc((site, 'completion'), usage.completion_tokens or 0)
+    stats, labels = work_labels()
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.llm_seconds += seconds
+    else:
+        llm_calls_total.inc(labels)
+        llm_seconds_total.inc(labels, seconds)
+
+def start_request_stats():
+    """Start timing a request. Returns its RequestStats, or None when metrics are off."""
+    if not METRICS_ENABLED:
+        return None
+    stats = RequestStats()
+    current_request.set(stats)
+    return stats
+
+def finish_request_stats(route, method, status):
+    """Record the current request's metrics. Returns its Server-Timing header
+    value, or None when metrics are off."""
+    stats = current_request.get()
+    if stats is None or stats.labels is not None:
+        return None
+    total = time.perf_counter() - stats.started
+    labels = (route, method)
+    http_requests_total.inc((route, method, str(status)))
+    http_request_duration.observe(labels, total)
+    db_queries_total.inc(labels, stats.db_queries)
+    db_seconds_total.inc(labels, stats.db_seconds)
+    db_connections_total.inc(labels, stats.db_connections)
+    llm_calls_total.inc(labels, stats.llm_calls)
+    llm_seconds_total.inc(labels, stats.llm_seconds)
+    stats.labels = labels
+    return stats.server_timing(total)
+
+@app.before_request
+def before_request_stats():
+    g.request_stats = start_request_stats()
+
+@app.after_request
+def after_request_stats(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    server_timing = finish_request_stats(route, request.method, response.status_code)
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
 # Initialize Groq client
 try:
     groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
@@ -37,10 +183,40 @@ except Exception as e:
     logger.error(f"Failed to initialize Groq client: {str(e)}")
     raise
 
+# Every Groq call goes through the gateway. Timeouts are in seconds, per attempt.
+LLM_MODEL = "llama3-70b-8192"
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 2))  # seconds to wait for a free slot
+LLM_USER_RATE = float(os.getenv('LLM_USER_RATE', 0.5))  # calls per second per user, sustained
+LLM_USER_BURST = int(os.getenv('LLM_USER_BURST', 10))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))  # consecutive failures to open
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))  # seconds open before a trial call
+LLM_SITES = {
+    'categorize': CallSite(timeout=5, retries=1),
+    'categorize_batch': CallSite(timeout=20, retries=2),
+    'report': CallSite(timeout=20, retries=1),
+    'report_stream': CallSite(timeout=20, retries=1),
+    'chat': CallSite(timeout=10, retries=1),
+    'chat_stream': CallSite(timeout=10, retries=1)
+}
+CHAT_UNAVAILABLE = "Sorry, I couldn't process your request. Try again later."
+
+llm = LLMGateway(
+    groq_client, LLM_MODEL, LLM_SITES,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+    user_rate=LLM_USER_RATE,
+    user_burst=LLM_USER_BURST,
+    breaker=CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET),
+    on_call=record_llm_call if METRICS_ENABLED else None
+)
+
 # Load categorization prompt
 try:
     with open('categorization_prompt.txt', 'r') as file:
         CATEGORIZATION_PROMPT = file.read().strip()
+    # Cached categories are keyed on this, so editing the prompt invalidates them
+    CATEGORIZATION_PROMPT_VERSION = hashlib.sha256(CATEGORIZATION_PROMPT.encode('utf-8')).hexdigest()[:16]
     logger.info("Categorization prompt loaded successfully")
 except FileNotFoundError:
     logger.error("categorization_prompt.txt not found")
@@ -49,86 +225,1130 @@ except Exception as e:
     logger.error(f"Error loading categorization prompt: {str(e)}")
     raise
 
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(**db_config)
-        logger.debug("Database connection established")
+# Connection pool settings. The pool pings each connection on checkout and
+# reconnects dead ones, and pool_reset_session clears session state on return.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # mysql-connector caps this at 32
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # seconds to wait for a free connection
+
+db_pool = None
+db_pool_lock = threading.Lock()
+pool_stats = {
+    'checkouts': 0,
+    'waits': 0,
+    'timeouts': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+    'in_use': 0,
+    'peak_in_use': 0
+}
+pool_stats_lock = threading.Lock()
+
+def get_db_pool():
+    """Create the connection pool on first use so the app can start without MySQL."""
+    global db_pool
+    if db_pool is None:
+        with db_pool_lock:
+            if db_pool is None:
+                db_pool = pooling.MySQLConnectionPool(
+                    pool_name='budget_app_pool',
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **db_config
+                )
+                logger.info(f"Database pool created with {DB_POOL_SIZE} connections")
+    return db_pool
+
+def acquire_db_connection():
+    """Check a connection out of the pool, waiting up to DB_POOL_TIMEOUT seconds.
+
+    Callers outside a request must close() the connection to return it to the pool.
+    """
+    pool = get_db_pool()
+    started = time.monotonic()
+    waited = False
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() - started >= DB_POOL_TIMEOUT:
+                with pool_stats_lock:
+                    pool_stats['timeouts'] += 1
+                logger.error(f"Database pool exhausted after waiting {DB_POOL_TIMEOUT}s")
+                raise
+            waited = True
+            time.sleep(0.01)
+        except mysql.connector.Error as err:
+            logger.error(f"Database connection error: {str(err)}")
+            raise
+    wait_time = time.monotonic() - started
+    with pool_stats_lock:
+        pool_stats['checkouts'] += 1
+        pool_stats['in_use'] += 1
+        pool_stats['peak_in_use'] = max(pool_stats['peak_in_use'], pool_stats['in_use'])
+        if waited:
+            pool_stats['waits'] += 1
+            pool_stats['wait_time_total'] += wait_time
+            pool_stats['wait_time_max'] = max(pool_stats['wait_time_max'], wait_time)
+    if not METRICS_ENABLED:
         return conn
+    record_db_connection()
+    return TimedConnection(conn, record_db_query)
+
+def release_db_connection(conn):
+    """Roll back anything left uncommitted and return the connection to the pool."""
+    try:
+        conn.rollback()
+    except mysql.connector.Error as err:
+        logger.warning(f"Rollback before pool return failed: {str(err)}")
+    finally:
+        conn.close()
+        with pool_stats_lock:
+            pool_stats['in_use'] -= 1
+
+def discard_db_connection(conn):
+    """Close the connection's session and return it to the pool, which reconnects
+    it on its next checkout. For connections that can't be rolled back cheaply,
+    such as one abandoned partway through an unbuffered result."""
+    try:
+        conn.disconnect()
+        conn.close()
     except mysql.connector.Error as err:
-        logger.error(f"Database connection error: {str(err)}")
-        raise
-
-def categorize_transaction(description):
-    """Use Groq to categorize a transaction description with improved accuracy."""
-    logger.debug(f"Categorizing transaction: {description}")
-    valid_categories = [
-        "Food", "Rent", "Entertainment", "Utilities", "Income", "Clothes",
-        "Transport", "Health", "Education", "Savings", "Other"
+        logger.warning(f"Discarded connection did not close cleanly: {str(err)}")
+    finally:
+        with pool_stats_lock:
+            pool_stats['in_use'] -= 1
+
+def get_db_connection():
+    """Return the request's connection, checking one out of the pool on first use."""
+    if 'db_conn' not in g:
+        g.db_conn = acquire_db_connection()
+        logger.debug("Database connection checked out from pool")
+    return g.db_conn
+
+@app.teardown_appcontext
+def teardown_db_connection(exception):
+    release_request_connection()
+    current_request.set(None)  # Server threads are reused across requests
+
+def release_request_connection():
+    """Return the request's connection early, e.g. before a long streamed response."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        release_db_connection(conn)
+
+# Push events to open /events streams. A stream holds a thread and a queue but
+# no database connection; heartbeats keep proxies from closing idle streams.
+EVENT_STREAM_MAX_PER_USER = int(os.getenv('EVENT_STREAM_MAX_PER_USER', 3))
+EVENT_STREAM_HEARTBEAT = float(os.getenv('EVENT_STREAM_HEARTBEAT', 15))  # seconds
+event_hub = EventHub(EVENT_STREAM_MAX_PER_USER)
+
+def queue_event(user_id, event, data):
+    """Queue a push event; it is published only once the transaction commits."""
+    g.setdefault('pending_events', []).append((user_id, event, data))
+
+def queue_change(user_id, *resources):
+    """Queue a 'changed' event telling the user's streams which resources to refetch."""
+    queue_event(user_id, 'changed', {'resources': list(resources)})
+
+def after_commit(callback):
+    """Run callback once the transaction commits; it is dropped if the request fails first."""
+    g.setdefault('after_commit', []).append(callback)
+
+def commit_request(conn):
+    """Write the staged notifications and commit the transaction, then run the
+    after_commit callbacks and publish the events queued while it was open."""
+    outbox = g.pop('notification_outbox', [])
+    if outbox and not NOTIFICATION_FLUSH_INTERVAL:
+        for notification_id, row in write_notifications(conn, outbox):
+            queue_event(row[0], 'notification', notification_event(notification_id, row))
+    conn.commit()
+    publish_committed(outbox)
+
+def publish_committed(outbox):
+    """The part of commit_request after the commit, shared with asgi.py: hand the
+    outbox to the flusher if it writes notifications, then run the after_commit
+    callbacks and publish the queued events."""
+    if outbox and NOTIFICATION_FLUSH_INTERVAL:
+        buffer_notifications(outbox)
+    for callback in g.pop('after_commit', []):
+        callback()
+    changes = {}
+    for user_id, event, data in g.pop('pending_events', []):
+        if event == 'changed':
+            # Coalesce, so a write touching several tables sends one refetch hint
+            changes.setdefault(user_id, set()).update(data['resources'])
+        else:
+            event_hub.publish(user_id, event, data)
+    for user_id, resources in changes.items():
+        event_hub.publish(user_id, 'changed', {'resources': sorted(resources)})
+
+VALID_CATEGORIES = [
+    "Food", "Rent", "Entertainment", "Utilities", "Income", "Clothes",
+    "Transport", "Health", "Education", "Savings", "Other"
+]
+
+# Broad keywords per category, compiled into the rule matcher with the prompt examples
+KEYWORD_RULES = {
+    "Clothes": ['jacket', 'shirt', 'pants', 'dress', 'shoes', 'jeans'],
+    "Transport": ['car', 'gas', 'fuel', 'bus', 'train', 'taxi'],
+    "Food": ['food', 'grocery', 'pizza', 'coffee', 'restaurant'],
+    "Rent": ['rent', 'mortgage'],
+    "Entertainment": ['movie', 'concert', 'game', 'streaming'],
+    "Utilities": ['electric', 'water', 'internet', 'phone'],
+    "Income": ['salary', 'paycheck', 'bonus', 'freelance'],
+    "Health": ['doctor', 'hospital', 'medicine', 'pharmacy'],
+    "Education": ['book', 'tuition', 'course', 'school'],
+    "Savings": ['savings', 'deposit', 'retirement', 'emergency']
+}
+
+# Rule matches at or above this confidence skip the caches and Groq entirely
+RULE_CONFIDENCE_THRESHOLD = float(os.getenv('RULE_CONFIDENCE_THRESHOLD', 0.8))
+category_matcher = build_matcher(CATEGORIZATION_PROMPT, KEYWORD_RULES)
+logger.info(f"Rule matcher compiled with {category_matcher.size} phrases")
+
+# Few-shot categorization: Groq gets the prompt's instructions with one anchor
+# example per category plus the FEW_SHOT_EXAMPLES examples nearest each
+# description, instead of the whole example list (see benchmark/fewshot_eval.py)
+FEW_SHOT_CATEGORIZATION = os.getenv('FEW_SHOT_CATEGORIZATION', 'true').lower() == 'true'
+FEW_SHOT_EXAMPLES = int(os.getenv('FEW_SHOT_EXAMPLES', 8))
+CATEGORIZATION_INSTRUCTIONS = prompt_instructions(CATEGORIZATION_PROMPT)
+example_index = build_example_index(CATEGORIZATION_PROMPT)
+logger.info(f"Few-shot example index built with {len(example_index)} examples")
+
+def categorization_system_prompt(descriptions):
+    if not FEW_SHOT_CATEGORIZATION:
+        return CATEGORIZATION_PROMPT
+    return build_prompt(CATEGORIZATION_INSTRUCTIONS, example_index.select(descriptions, FEW_SHOT_EXAMPLES))
+
+CATEGORY_CACHE_SIZE = int(os.getenv('CATEGORY_CACHE_SIZE', 10000))
+CATEGORY_INFLIGHT_TIMEOUT = 30  # seconds a duplicate request waits on the shared Groq call
+
+class LRUCache:
+    """Thread-safe in-process LRU cache that evicts the least recently used key."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                return None
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def discard_where(self, predicate):
+        """Drop every key for which predicate(key) is true."""
+        with self.lock:
+            for key in [k for k in self.data if predicate(k)]:
+                del self.data[key]
+
+    def __len__(self):
+        return len(self.data)
+
+category_cache = LRUCache(CATEGORY_CACHE_SIZE)
+categorization_stats = defaultdict(int)
+category_inflight = {}
+category_inflight_lock = threading.Lock()
+
+def normalize_description(description):
+    """Reduce a description to its cache key, e.g. 'STARBUCKS #1234 ' -> 'starbucks'."""
+    key = ' '.join(re.sub(r'[^a-z ]+', ' ', description.lower()).split())
+    return (key or ' '.join(description.lower().split()))[:255]
+
+def categorization_messages(description):
+    return [
+        {
+            "role": "system",
+            "content": categorization_system_prompt([description])
+        },
+        {
+            "role": "user",
+            "content": f"Description: {description}"
+        }
     ]
+
+def groq_categorize(description, user_id=None):
+    """Ask Groq for a category. Raises if the call fails or is refused."""
+    categorization_stats['llm_calls'] += 1
+    category = llm.complete(
+        'categorize',
+        messages=categorization_messages(description),
+        max_tokens=10,
+        temperature=0.3,
+        user_id=user_id
+    ).strip()
+    logger.debug(f"Groq returned category: {category}")
+    return category if category in VALID_CATEGORIES else "Other"
+
+def groq_categorize_batch(descriptions):
+    """Categorize several descriptions with one Groq request.
+
+    Returns a list aligned with descriptions, holding None wherever the reply
+    had no usable line. Raises if the call fails.
+    """
+    categorization_stats['llm_calls'] += 1
+    categorization_stats['llm_batched_descriptions'] += len(descriptions)
+    numbered = '\n'.join(f"{i}. {d}" for i, d in enumerate(descriptions, 1))
+    reply = llm.complete(
+        'categorize_batch',
+        messages=[
+            {
+                "role": "system",
+                "content": categorization_system_prompt(descriptions)
+            },
+            {
+                "role": "user",
+                "content": (
+                    "Categorize each numbered description below. Reply with one line per "
+                    "description in the form '<number>. <Category>' and nothing else.\n" + numbered
+                )
+            }
+        ],
+        max_tokens=8 * len(descriptions) + 16,
+        temperature=0.3
+    )
+    categories = [None] * len(descriptions)
+    for line in reply.splitlines():
+        match = re.match(r'\s*(\d+)[.):]\s*(\w+)', line)
+        if match and 1 <= int(match.group(1)) <= len(descriptions):
+            category = match.group(2)
+            categories[int(match.group(1)) - 1] = category if category in VALID_CATEGORIES else "Other"
+    logger.debug(f"Groq batch returned {sum(c is not None for c in categories)}/{len(descriptions)} categories")
+    return categories
+
+def keyword_categorize(description):
+    """Fallback used when Groq is unavailable: the rule matcher's best guess at any confidence."""
+    category, _ = category_matcher.match(description)
+    return category or "Other"
+
+CATEGORY_CACHE_SELECT = 'SELECT category FROM category_cache WHERE description_key = %s AND prompt_version = %s'
+CATEGORY_CACHE_UPSERT = (
+    'INSERT INTO category_cache (description_key, prompt_version, category) VALUES (%s, %s, %s) '
+    'ON DUPLICATE KEY UPDATE category = VALUES(category)'
+)
+
+def load_cached_category(conn, key):
+    cursor = None
     try:
-        response = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {
-                    "role": "system",
-                    "content": CATEGORIZATION_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"Description: {description}"
-                }
-            ],
-            max_tokens=10,
-            temperature=0.3
+        cursor = conn.cursor()
+        cursor.execute(CATEGORY_CACHE_SELECT, (key, CATEGORIZATION_PROMPT_VERSION))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except mysql.connector.Error as err:
+        logger.error(f"Category cache lookup error: {str(err)}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+
+def store_cached_category(conn, key, category):
+    """Persist a category on the caller's connection; the caller commits."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CATEGORY_CACHE_UPSERT, (key, CATEGORIZATION_PROMPT_VERSION, category))
+    except mysql.connector.Error as err:
+        logger.error(f"Category cache store error: {str(err)}")
+    finally:
+        if cursor:
+            cursor.close()
+
+def local_category(description):
+    """The in-process tiers: the rule matcher, then the LRU. Returns None on a miss."""
+    category, confidence = category_matcher.match(description)
+    if category and confidence >= RULE_CONFIDENCE_THRESHOLD:
+        categorization_stats['rule_hits'] += 1
+        logger.debug(f"Categorized '{description}' as {category} via rules ({confidence:.2f})")
+        return category
+
+    category = category_cache.get(normalize_description(description))
+    if category:
+        categorization_stats['lru_hits'] += 1
+        logger.debug(f"Categorized '{description}' as {category} via LRU cache")
+        return category
+    return None
+
+def lookup_category(description, conn=None):
+    """Try the tiers that need no Groq call: the rule matcher, the in-process LRU
+    and the MySQL cache. Returns None when none of them knows the description."""
+    category = local_category(description)
+    if category:
+        return category
+
+    if conn is not None:
+        key = normalize_description(description)
+        category = load_cached_category(conn, key)
+        if category:
+            categorization_stats['db_hits'] += 1
+            category_cache.set(key, category)
+            logger.debug(f"Categorized '{description}' as {category} via MySQL cache")
+            return category
+
+    return None
+
+def categorize_transaction(description, conn=None, user_id=None):
+    """Categorize a description through lookup_category() and finally Groq.
+
+    Concurrent calls for the same normalized description share one Groq request,
+    which counts against user_id's LLM quota. Keyword fallbacks are returned but
+    never cached.
+    """
+    category = lookup_category(description, conn)
+    if category:
+        return category
+
+    key = normalize_description(description)
+    categorization_stats['misses'] += 1
+    with category_inflight_lock:
+        call = category_inflight.get(key)
+        leader = call is None
+        if leader:
+            call = category_inflight[key] = {'done': threading.Event(), 'category': None}
+
+    if not leader:
+        categorization_stats['inflight_shared'] += 1
+        call['done'].wait(CATEGORY_INFLIGHT_TIMEOUT)
+        return call['category'] or keyword_categorize(description)
+
+    try:
+        try:
+            category = groq_categorize(description, user_id)
+        except Exception as e:
+            logger.error(f"Groq categorization error: {str(e)}")
+            category = keyword_categorize(description)
+        else:
+            category_cache.set(key, category)
+            if conn is not None:
+                store_cached_category(conn, key, category)
+        call['category'] = category
+        return category
+    finally:
+        with category_inflight_lock:
+            category_inflight.pop(key, None)
+        call['done'].set()
+
+def invalidate_category_cache(conn):
+    """Reload categorization_prompt.txt, recompile the rule matcher and example
+    index and drop cached categories from older prompt versions."""
+    global CATEGORIZATION_PROMPT, CATEGORIZATION_PROMPT_VERSION, category_matcher
+    global CATEGORIZATION_INSTRUCTIONS, example_index
+    with open('categorization_prompt.txt', 'r') as file:
+        CATEGORIZATION_PROMPT = file.read().strip()
+    CATEGORIZATION_PROMPT_VERSION = hashlib.sha256(CATEGORIZATION_PROMPT.encode('utf-8')).hexdigest()[:16]
+    category_matcher = build_matcher(CATEGORIZATION_PROMPT, KEYWORD_RULES)
+    CATEGORIZATION_INSTRUCTIONS = prompt_instructions(CATEGORIZATION_PROMPT)
+    example_index = build_example_index(CATEGORIZATION_PROMPT)
+    category_cache.clear()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM category_cache WHERE prompt_version != %s', (CATEGORIZATION_PROMPT_VERSION,))
+        removed = cursor.rowcount
+    finally:
+        cursor.close()
+    conn.commit()
+    logger.info(f"Category cache invalidated: prompt version {CATEGORIZATION_PROMPT_VERSION}, {removed} rows removed")
+    return removed
+
+# Deferred categorization: transactions that would need Groq are inserted with
+# ai_category = NULL, which doubles as the durable queue, and categorized in batches
+DEFERRED_CATEGORIZATION = os.getenv('DEFERRED_CATEGORIZATION', 'false').lower() == 'true'
+CATEGORIZATION_BATCH_SIZE = int(os.getenv('CATEGORIZATION_BATCH_SIZE', 20))
+CATEGORIZATION_WORKERS = int(os.getenv('CATEGORIZATION_WORKERS', 2))
+CATEGORIZATION_POLL_INTERVAL = 5  # seconds between scans for pending rows
+
+categorization_wakeup = threading.Event()
+categorization_executor = None
+categorization_claimed = set()  # Pending transaction ids already handed to a worker
+categorization_lock = threading.Lock()
+
+def start_categorization_workers():
+    """Start the dispatcher thread and worker pool once per process."""
+    global categorization_executor
+    with categorization_lock:
+        if categorization_executor is not None:
+            return
+        categorization_executor = ThreadPoolExecutor(
+            max_workers=CATEGORIZATION_WORKERS, thread_name_prefix='categorizer'
         )
-        category = response.choices[0].message.content.strip()
-        logger.debug(f"Groq returned category: {category}")
-        return category if category in valid_categories else "Other"
-    except Exception as e:
-        logger.error(f"Groq categorization error: {str(e)}")
-        # Fallback keyword matching
-        description = description.lower()
-        if any(word in description for word in ['jacket', 'shirt', 'pants', 'dress', 'shoes', 'jeans']):
-            return "Clothes"
-        elif any(word in description for word in ['car', 'gas', 'fuel', 'bus', 'train', 'taxi']):
-            return "Transport"
-        elif any(word in description for word in ['food', 'grocery', 'pizza', 'coffee', 'restaurant']):
-            return "Food"
-        elif any(word in description for word in ['rent', 'mortgage']):
-            return "Rent"
-        elif any(word in description for word in ['movie', 'concert', 'game', 'streaming']):
-            return "Entertainment"
-        elif any(word in description for word in ['electric', 'water', 'internet', 'phone']):
-            return "Utilities"
-        elif any(word in description for word in ['salary', 'paycheck', 'bonus', 'freelance']):
-            return "Income"
-        elif any(word in description for word in ['doctor', 'hospital', 'medicine', 'pharmacy']):
-            return "Health"
-        elif any(word in description for word in ['book', 'tuition', 'course', 'school']):
-            return "Education"
-        elif any(word in description for word in ['savings', 'deposit', 'retirement', 'emergency']):
-            return "Savings"
-        return "Other"
-
-def create_notification(user_id, message, notification_type):
-    """Helper function to insert a notification into the database."""
+    threading.Thread(target=categorization_dispatcher, name='categorization-dispatcher', daemon=True).start()
+    logger.info(f"Started {CATEGORIZATION_WORKERS} deferred categorization workers")
+
+def categorization_dispatcher():
+    # Scan before the first wait, so rows left pending by an earlier run drain at startup
+    while True:
+        categorization_wakeup.clear()
+        try:
+            dispatch_pending_categorizations()
+        except Exception as e:
+            logger.error(f"Deferred categorization dispatch error: {str(e)}")
+        categorization_wakeup.wait(CATEGORIZATION_POLL_INTERVAL)
+
+@app.before_request
+def start_deferred_categorization():
+    """With DEFERRED_CATEGORIZATION on, start the workers in whichever process
+    serves requests: the dev server, each WSGI worker after it forks, or asgi.py
+    (which also starts them before serving). Importing the app for CLI commands
+    or benchmarks starts nothing."""
+    if DEFERRED_CATEGORIZATION and categorization_executor is None:
+        start_categorization_workers()
+
+def dispatch_pending_categorizations():
+    """Claim pending transactions and hand them to the workers in batches."""
+    limit = CATEGORIZATION_BATCH_SIZE * CATEGORIZATION_WORKERS
+    with categorization_lock:
+        claimed = list(categorization_claimed)
+    conn = acquire_db_connection()
+    cursor = None
     try:
-        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        query = (
+            'SELECT id, user_id, description, amount, transaction_date, budget_id, goal_id '
+            'FROM transactions WHERE ai_category IS NULL'
+        )
+        if claimed:
+            query += f" AND id NOT IN ({', '.join(['%s'] * len(claimed))})"
+        cursor.execute(query + ' ORDER BY id LIMIT %s', (*claimed, limit))
+        rows = cursor.fetchall()
+    finally:
+        if cursor:
+            cursor.close()
+        release_db_connection(conn)
+
+    with categorization_lock:
+        categorization_claimed.update(row['id'] for row in rows)
+    for i in range(0, len(rows), CATEGORIZATION_BATCH_SIZE):
+        categorization_executor.submit(categorize_pending_batch, rows[i:i + CATEGORIZATION_BATCH_SIZE])
+    if len(rows) == limit:
+        categorization_wakeup.set()  # More are waiting; don't sleep until the next poll
+
+def in_app_context(func):
+    """Run a background task in its own app context, so it can queue push events."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with app.app_context():
+            return func(*args, **kwargs)
+    return wrapper
+
+@in_app_context
+def categorize_pending_batch(rows):
+    """Categorize one batch with at most one Groq call and write it back with one UPDATE."""
+    conn = None
+    cursor = None
+    try:
+        conn = acquire_db_connection()
+        results = {}
+        unresolved = {}  # normalized key -> rows sharing it
+        for row in rows:
+            category = lookup_category(row['description'], conn)
+            if category:
+                results[row['id']] = category
+            else:
+                unresolved.setdefault(normalize_description(row['description']), []).append(row)
+
+        if unresolved:
+            keys = list(unresolved)
+            try:
+                categories = groq_categorize_batch([unresolved[key][0]['description'] for key in keys])
+            except Exception as e:
+                logger.error(f"Groq batch categorization error: {str(e)}")
+                categories = [None] * len(keys)
+            for key, category in zip(keys, categories):
+                if category:
+                    category_cache.set(key, category)
+                    store_cached_category(conn, key, category)
+                for row in unresolved[key]:
+                    results[row['id']] = category or keyword_categorize(row['description'])
+
+        # Lock the rows still pending; any deleted meanwhile drop out here
         cursor = conn.cursor()
         cursor.execute(
-            'INSERT INTO notifications (user_id, message, type, created_at, is_read) '
-            'VALUES (%s, %s, %s, %s, %s)',
-            (user_id, message, notification_type, datetime.now(), False)
+            f"SELECT id FROM transactions WHERE ai_category IS NULL AND id IN ({', '.join(['%s'] * len(results))}) FOR UPDATE",
+            list(results)
         )
-        conn.commit()
-        logger.info(f"Notification created for user_id {user_id}: {message}")
-    except mysql.connector.Error as err:
-        logger.error(f"Notification creation error: {str(err)}")
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            conn.commit()
+            return
+        cursor.execute(
+            f"UPDATE transactions SET ai_category = CASE id {' '.join(['WHEN %s THEN %s'] * len(ids))} END "
+            f"WHERE ai_category IS NULL AND id IN ({', '.join(['%s'] * len(ids))})",
+            [value for id_ in ids for value in (id_, results[id_])] + ids
+        )
+
+        # Move the rows out of the 'Uncategorized' rollups
+        deltas = new_rollup_deltas()
+        for row in rows:
+            if row['id'] in ids:
+                add_rollup(deltas, row['user_id'], row['transaction_date'], None,
+                           row['budget_id'], row['goal_id'], row['amount'], sign=-1)
+                add_rollup(deltas, row['user_id'], row['transaction_date'], results[row['id']],
+                           row['budget_id'], row['goal_id'], row['amount'])
+        record_daily_rollups(conn, deltas)
+
+        # Category-driven insights could not be checked at insert time
+        # In user order, so concurrent batches take the insight_generations locks alike
+        for user_id in sorted({row['user_id'] for row in rows}):
+            new_expense_categories = {
+                results[row['id']] for row in rows if row['user_id'] == user_id and float(row['amount']) < 0
+            }
+            if new_expense_categories:
+                recheck_spending_insight(conn, user_id, new_expense_categories)
+            invalidate_insights(conn, user_id)
+            queue_change(user_id, 'transactions')
+
+        commit_request(conn)
+        logger.info(f"Deferred categorization wrote {len(ids)} transactions")
+    except Exception as e:
+        logger.error(f"Deferred categorization batch error: {str(e)}")
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            release_db_connection(conn)
+        with categorization_lock:
+            categorization_claimed.difference_update(row['id'] for row in rows)
+
+def notify_budget_status(conn, user_id, category, spent, limit):
+    """Warn at 80% of a budget and alert once it is exceeded."""
+    if spent >= limit:
+        create_notification(conn, user_id, f"Budget exceeded for {category}: ${spent:.2f}/ ${limit:.2f}", "budget")
+    elif spent >= limit * 0.8:
+        create_notification(conn, user_id, f"Warning: {category} budget nearing limit: ${spent:.2f}/ ${limit:.2f}", "budget")
+
+def budget_period_start(period, day):
+    """First day of the monthly or weekly (Monday-based) budget period containing day."""
+    if period == 'weekly':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+BUDGET_SPEND_UPSERT = '''
+    INSERT INTO budget_spend (budget_id, period_start, spent)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE spent = spent + VALUES(spent)
+'''
+
+def record_budget_spend(conn, spends):
+    """Add (budget_id, period_start, amount) deltas to budget_spend on the caller's
+    connection, so they commit atomically with the transaction rows."""
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(BUDGET_SPEND_UPSERT, spends)
+    finally:
+        cursor.close()
+
+def rebuild_budget_spend(conn, user_id=None):
+    """Recompute budget_spend from the transactions table, for every budget or one user's."""
+    params = (user_id,) if user_id else ()
+    cursor = conn.cursor()
+    try:
+        if user_id:
+            cursor.execute('''
+                DELETE s FROM budget_spend s
+                JOIN budgets b ON b.id = s.budget_id
+                WHERE b.user_id = %s
+            ''', params)
+        else:
+            cursor.execute('DELETE FROM budget_spend')
+        cursor.execute(f'''
+            INSERT INTO budget_spend (budget_id, period_start, spent)
+            SELECT t.budget_id,
+                   CASE b.period
+                       WHEN 'weekly' THEN DATE_SUB(t.transaction_date, INTERVAL WEEKDAY(t.transaction_date) DAY)
+                       ELSE DATE_SUB(t.transaction_date, INTERVAL DAYOFMONTH(t.transaction_date) - 1 DAY)
+                   END AS period_start,
+                   -SUM(t.amount)
+            FROM transactions t
+            JOIN budgets b ON b.id = t.budget_id
+            WHERE t.amount < 0 {'AND b.user_id = %s' if user_id else ''}
+            GROUP BY t.budget_id, period_start
+        ''', params)
+        rows = cursor.rowcount
+    finally:
+        cursor.close()
+    conn.commit()
+    return rows
+
+@app.cli.command('rebuild-budget-spend')
+@click.option('--user-id', type=int, help='Only rebuild this user\'s budgets.')
+def rebuild_budget_spend_command(user_id):
+    """Rebuild the per-period budget spend totals from scratch."""
+    conn = acquire_db_connection()
+    try:
+        rows = rebuild_budget_spend(conn, user_id)
+        logger.info(f"Rebuilt budget_spend: {rows} period rows")
+    finally:
+        release_db_connection(conn)
+
+def add_rollup(deltas, user_id, day, category, budget_id, goal_id, amount, sign=1):
+    """Accumulate one transaction into daily_rollups deltas; sign=-1 removes it."""
+    amount = float(amount)
+    delta = deltas[(user_id, day, category or 'Uncategorized', budget_id or 0, goal_id or 0)]
+    if amount > 0:
+        delta[0] += sign * amount
+    else:
+        delta[1] += sign * -amount
+    delta[2] += sign
+
+def new_rollup_deltas():
+    return defaultdict(lambda: [0.0, 0.0, 0])
+
+DAILY_ROLLUPS_UPSERT = '''
+    INSERT INTO daily_rollups (user_id, day, category, budget_id, goal_id, income, expense, count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE income = income + VALUES(income),
+                            expense = expense + VALUES(expense),
+                            count = count + VALUES(count)
+'''
+
+def daily_rollup_rows(deltas):
+    return [(*key, income, expense, count) for key, (income, expense, count) in deltas.items()]
+
+def record_daily_rollups(conn, deltas):
+    """Apply accumulated deltas to daily_rollups on the caller's connection."""
+    if not deltas:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(DAILY_ROLLUPS_UPSERT, daily_rollup_rows(deltas))
+    finally:
+        cursor.close()
+
+def rebuild_daily_rollups(conn, user_id=None):
+    """Recompute daily_rollups from the transactions table, for every user or one."""
+    params = (user_id,) if user_id else ()
+    user_filter = 'WHERE user_id = %s' if user_id else ''
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'DELETE FROM daily_rollups {user_filter}', params)
+        cursor.execute(f'''
+            INSERT INTO daily_rollups (user_id, day, category, budget_id, goal_id, income, expense, count)
+            SELECT user_id, transaction_date, COALESCE(ai_category, 'Uncategorized'),
+                   COALESCE(budget_id, 0), COALESCE(goal_id, 0),
+                   SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+                   SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END),
+                   COUNT(*)
+            FROM transactions
+            {user_filter}
+            GROUP BY user_id, transaction_date, COALESCE(ai_category, 'Uncategorized'),
+                     COALESCE(budget_id, 0), COALESCE(goal_id, 0)
+        ''', params)
+        rows = cursor.rowcount
+    finally:
+        cursor.close()
+    conn.commit()
+    return rows
+
+REPORT_AGGREGATES_QUERY = '''
+    SELECT category, budget_id, goal_id, SUM(income) AS income, SUM(expense) AS expense
+    FROM daily_rollups
+    WHERE user_id = %s AND day BETWEEN %s AND %s
+    GROUP BY category, budget_id, goal_id
+'''
+
+def report_aggregates(cursor, user_id, start_date, end_date):
+    """Report totals for a date range, read from daily_rollups.
+
+    Returns (total_income, total_expenses, category_sums, goal_contributions, budget_spending).
+    """
+    cursor.execute(REPORT_AGGREGATES_QUERY, (user_id, start_date, end_date))
+    return fold_report_aggregates(cursor.fetchall())
+
+def fold_report_aggregates(rows):
+    """report_aggregates() from the rows of REPORT_AGGREGATES_QUERY, as dicts."""
+    total_income = 0.0
+    total_expenses = 0.0
+    category_sums = defaultdict(float)
+    goal_contributions = defaultdict(float)
+    budget_spending = defaultdict(float)
+    for r in rows:
+        income = float(r['income'])
+        expense = float(r['expense'])
+        total_income += income
+        total_expenses += expense
+        category_sums[r['category']] += income - expense
+        if r['goal_id']:
+            goal_contributions[r['goal_id']] += income
+        if r['budget_id']:
+            budget_spending[r['budget_id']] += expense
+    return total_income, total_expenses, category_sums, goal_contributions, budget_spending
+
+def raw_report_aggregates(cursor, user_id, start_date, end_date):
+    """Same result as report_aggregates(), computed from raw transactions."""
+    cursor.execute('''
+        SELECT amount, goal_id, budget_id, ai_category
+        FROM transactions
+        WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+    ''', (user_id, start_date, end_date))
+    total_income = 0.0
+    total_expenses = 0.0
+    category_sums = defaultdict(float)
+    goal_contributions = defaultdict(float)
+    budget_spending = defaultdict(float)
+    for t in cursor.fetchall():
+        amount = float(t['amount'])
+        category = t['ai_category'] or 'Uncategorized'
+        if amount > 0:
+            total_income += amount
+        else:
+            total_expenses += abs(amount)
+        category_sums[category] += amount
+
+        if t['goal_id']:
+            goal_contributions[t['goal_id']] += amount if amount > 0 else 0
+
+        if t['budget_id']:
+            budget_spending[t['budget_id']] += abs(amount) if amount < 0 else 0
+    return total_income, total_expenses, category_sums, goal_contributions, budget_spending
+
+@app.cli.command('rebuild-daily-rollups')
+@click.option('--user-id', type=int, help='Only rebuild this user\'s rows.')
+def rebuild_daily_rollups_command(user_id):
+    """Backfill daily_rollups from the transactions table."""
+    conn = acquire_db_connection()
+    try:
+        rows = rebuild_daily_rollups(conn, user_id)
+        logger.info(f"Rebuilt daily_rollups: {rows} rows")
+    finally:
+        release_db_connection(conn)
+
+@app.cli.command('check-daily-rollups')
+@click.option('--user-id', type=int, help='Only check this user.')
+def check_daily_rollups_command(user_id):
+    """Compare rollup-based report totals with the raw transaction path."""
+    conn = acquire_db_connection()
+    mismatches = 0
+    try:
+        cursor = conn.cursor(dictionary=True)
+        if user_id:
+            user_ids = [user_id]
+        else:
+            cursor.execute('SELECT id FROM users')
+            user_ids = [row['id'] for row in cursor.fetchall()]
+        for uid in user_ids:
+            cursor.execute('SELECT MIN(transaction_date) AS first, MAX(transaction_date) AS last FROM transactions WHERE user_id = %s', (uid,))
+            span = cursor.fetchone()
+            if not span['first']:
+                continue
+            rolled = report_aggregates(cursor, uid, span['first'], span['last'])
+            raw = raw_report_aggregates(cursor, uid, span['first'], span['last'])
+            for name, a, b in zip(['total_income', 'total_expenses', 'categories', 'goals', 'budgets'], rolled, raw):
+                if isinstance(a, dict):
+                    keys = set(a) | set(b)
+                    same = all(abs(a.get(k, 0.0) - b.get(k, 0.0)) < 0.005 for k in keys)
+                else:
+                    same = abs(a - b) < 0.005
+                if not same:
+                    mismatches += 1
+                    click.echo(f"user {uid}: {name} differs (rollup {a!r}, raw {b!r})")
+        cursor.close()
+    finally:
+        release_db_connection(conn)
+    click.echo(f"{mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+@app.cli.command('invalidate-category-cache')
+def invalidate_category_cache_command():
+    """Drop cached categories from older prompt versions after editing categorization_prompt.txt.
+
+    Running servers keep their loaded prompt until restarted or sent POST /category-cache/invalidate.
+    """
+    conn = acquire_db_connection()
+    try:
+        removed = invalidate_category_cache(conn)
+    finally:
+        release_db_connection(conn)
+    click.echo(f"Prompt version {CATEGORIZATION_PROMPT_VERSION}: {removed} cached categories removed")
+
+@app.cli.command('migrate')
+@click.option('--dry-run', is_flag=True, help='List pending migrations without applying them.')
+def migrate_command(dry_run):
+    """Apply pending database/migrations/*.sql files in version order."""
+    conn = acquire_db_connection()
+    try:
+        applied = migrate(conn, dry_run=dry_run, log=click.echo)
+    except (MigrationError, mysql.connector.Error) as err:
+        click.echo(f"Migration failed: {str(err)}")
+        raise SystemExit(1)
+    finally:
+        release_db_connection(conn)
+    click.echo(f"{len(applied)} migrations {'pending' if dry_run else 'applied'}")
+
+# Functions whose statements read whole tables on purpose: backfills and admin commands
+FULL_SCAN_OK = {'rebuild_budget_spend', 'rebuild_daily_rollups', 'check_daily_rollups_command', 'invalidate_category_cache'}
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """EXPLAIN every SQL statement in app.py; exit 1 on a table scan with no usable index."""
+    conn = acquire_db_connection()
+    try:
+        failures, warnings = check_query_plans(conn, os.path.abspath(__file__), FULL_SCAN_OK)
+    finally:
+        release_db_connection(conn)
+    for function, line, detail in warnings:
+        click.echo(f"warning: app.py:{line} {function}: {detail}")
+    for function, line, detail in failures:
+        click.echo(f"FAIL: app.py:{line} {function}: {detail}")
+    click.echo(f"{len(failures)} failures, {len(warnings)} warnings")
+    if failures:
+        raise SystemExit(1)
+
+def add_goal_contribution(conn, user_id, goal_id, amount):
+    """Add a positive amount to a savings goal, notifying on each milestone crossed."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute('''
+            SELECT name, current_amount, target_amount
+            FROM savings_goals
+            WHERE id = %s AND user_id = %s
+        ''', (goal_id, user_id))
+        goal = cursor.fetchone()
+        if not goal:
+            return
+        cursor.execute('''
+            UPDATE savings_goals
+            SET current_amount = current_amount + %s
+            WHERE id = %s AND user_id = %s
+        ''', (amount, goal_id, user_id))
+    finally:
+        cursor.close()
+    new_current, target = notify_goal_milestones(conn, user_id, goal, amount)
+    check_achievements(conn, user_id, 'goal_contribution', goal_current=new_current, goal_target=target)
+
+def notify_goal_milestones(conn, user_id, goal, amount):
+    """Notify on each milestone a contribution to goal (its row before the update)
+    crosses. Returns (new_current, target)."""
+    new_current = float(goal['current_amount']) + amount
+    target = float(goal['target_amount'])
+    progress = (new_current / target) * 100
+    milestones = [25, 50, 75, 100]
+    for milestone in milestones:
+        if (float(goal['current_amount']) / target * 100) < milestone <= progress:
+            create_notification(conn, user_id, f"Reached {milestone}% of savings goal '{goal['name']}': ${new_current:.2f}/ ${target:.2f}", "savings")
+    return new_current, target
+
+def check_spending_insight(conn, user_id, category_sums, total_expenses):
+    """Notify the user when one expense category is over half of total expenses."""
+    sorted_categories = sorted(category_sums.items(), key=lambda x: abs(x[1]), reverse=True)
+    if sorted_categories and abs(sorted_categories[0][1]) > total_expenses * 0.5:
+        top_category, top_amount = sorted_categories[0]
+        if top_amount < 0:  # Only for expenses
+            create_notification(
+                conn,
+                user_id,
+                f"You're spending a lot on {top_category}: ${abs(top_amount):.2f}. Consider reviewing this category.",
+                "insight"
+            )
+            return top_category
+    return None
+
+def recheck_spending_insight(conn, user_id, categories):
+    """Re-run the insight check over the last 30 days once deferred categories land,
+    notifying only if the dominant category is one that was just assigned."""
+    end_date = datetime.now().date()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT COALESCE(ai_category, 'Uncategorized'), SUM(amount),
+                   SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END)
+            FROM transactions
+            WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
+            GROUP BY COALESCE(ai_category, 'Uncategorized')
+        ''', (user_id, end_date - timedelta(days=30), end_date))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    category_sums = {category: float(net) for category, net, _ in rows}
+    total_expenses = sum(float(expenses) for _, _, expenses in rows)
+    top = sorted(category_sums.items(), key=lambda x: abs(x[1]), reverse=True)
+    if top and top[0][0] in categories:
+        check_spending_insight(conn, user_id, category_sums, total_expenses)
+
+# Notifications are staged in a per-request outbox and written by
+# commit_request, inside the transaction that produced them.
+# With NOTIFICATION_FLUSH_INTERVAL set, committed requests instead hand their
+# rows to a background flusher that coalesces writes across requests; a crash
+# can then lose up to one interval of notifications.
+NOTIFICATION_FLUSH_INTERVAL = float(os.getenv('NOTIFICATION_FLUSH_INTERVAL', 0))  # seconds; 0 = in-transaction
+
+notification_buffer = []
+notification_buffer_lock = threading.Lock()
+notification_flusher_started = False
+
+def create_notification(conn, user_id, message, notification_type):
+    """Stage a notification for the caller's transaction on conn.
+
+    Nothing is written unless the caller commits it with commit_request.
+    """
+    g.setdefault('notification_outbox', []).append((user_id, message, notification_type, datetime.now()))
+    logger.info(f"Notification created for user_id {user_id}: {message}")
+
+NOTIFICATION_INSERT = (
+    'INSERT INTO notifications (user_id, message, type, created_at, is_read) VALUES (%s, %s, %s, %s, FALSE)'
+)
+
+def write_notifications(conn, rows):
+    """Insert (user_id, message, type, created_at) rows; the caller commits.
+
+    Returns (id, row) pairs. Each row gets its own INSERT so its id is the
+    cursor's lastrowid: the ids of one multi-row INSERT need not be
+    consecutive (interleaved auto-increment locking, auto_increment_increment
+    > 1), so they cannot be derived from the first one.
+    """
+    written = []
+    cursor = conn.cursor()
+    try:
+        for row in rows:
+            cursor.execute(NOTIFICATION_INSERT, row)
+            written.append((cursor.lastrowid, row))
+    finally:
+        cursor.close()
+    return written
+
+def notification_event(notification_id, row):
+    user_id, message, notification_type, created_at = row
+    return {
+        'id': notification_id, 'message': message, 'type': notification_type,
+        'created_at': created_at.isoformat(), 'is_read': False
+    }
+
+def buffer_notifications(rows):
+    """Hand committed notifications to the background flusher, starting it on first use."""
+    global notification_flusher_started
+    with notification_buffer_lock:
+        notification_buffer.extend(rows)
+        start = not notification_flusher_started
+        notification_flusher_started = True
+    if start:
+        threading.Thread(target=notification_flusher, name='notification-flusher', daemon=True).start()
+        atexit.register(flush_notifications)
+        logger.info(f"Started notification flusher ({NOTIFICATION_FLUSH_INTERVAL}s interval)")
+
+def notification_flusher():
+    while True:
+        time.sleep(NOTIFICATION_FLUSH_INTERVAL)
+        flush_notifications()
+
+def flush_notifications():
+    """Write everything buffered in one transaction, then publish the push events."""
+    with notification_buffer_lock:
+        rows = notification_buffer[:]
+        notification_buffer.clear()
+    if not rows:
+        return
+    try:
+        conn = acquire_db_connection()
+        try:
+            written = write_notifications(conn, rows)
+            conn.commit()
+        finally:
+            release_db_connection(conn)
+    except mysql.connector.Error as err:
+        logger.error(f"Notification flush error, retrying {len(rows)} rows next interval: {str(err)}")
+        with notification_buffer_lock:
+            notification_buffer[:0] = rows
+        return
+    for notification_id, row in written:
+        event_hub.publish(row[0], 'notification', notification_event(notification_id, row))
+    logger.debug(f"Flushed {len(rows)} notifications")
+
+# Session tokens. login() issues a signed, expiring token carrying the user id,
+# so require_user can identify the caller without a database round trip.
+SESSION_TOKEN_MAX_AGE = int(os.getenv('SESSION_TOKEN_MAX_AGE', 7 * 24 * 3600))  # seconds
+# Clients that predate tokens send a bare X-Username header; trusting it is opt-in
+ALLOW_USERNAME_HEADER = os.getenv('ALLOW_USERNAME_HEADER', 'false').lower() == 'true'
+USER_ID_CACHE_SIZE = int(os.getenv('USER_ID_CACHE_SIZE', 1024))
+# Comma-separated usernames allowed to call the operational endpoints (stats, cache invalidation)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+    logger.warning("SECRET_KEY not set; using a random key, so sessions end when the server restarts")
+session_serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='session-token')
+
+# Usernames never change, so cached ids never go stale
+user_id_cache = LRUCache(USER_ID_CACHE_SIZE)
+
+def issue_session_token(user_id, username):
+    return session_serializer.dumps({'user_id': user_id, 'username': username})
+
+def resolve_user_id(username):
+    """Look up a user id by username through the bounded cache. None if there is no such user."""
+    user_id = user_id_cache.get(username)
+    if user_id is None:
+        cursor = get_db_connection().cursor()
+        try:
+            cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row:
+            return None
+        user_id = row[0]
+        user_id_cache.set(username, user_id)
+    return user_id
+
+def require_user(view):
+    """Authenticate the caller from its session token and set g.user_id and g.username."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get('Authorization', '')
+        username = request.headers.get('X-Username')
+        if auth.startswith('Bearer '):
+            try:
+                claims = session_serializer.loads(auth[len('Bearer '):], max_age=SESSION_TOKEN_MAX_AGE)
+            except SignatureExpired:
+                logger.warning(f"{request.path} rejected: Session expired")
+                return jsonify({'error': 'Session expired'}), 401
+            except BadSignature:
+                logger.warning(f"{request.path} rejected: Invalid session token")
+                return jsonify({'error': 'Invalid session token'}), 401
+            g.user_id = claims['user_id']
+            g.username = claims['username']
+        elif username and ALLOW_USERNAME_HEADER:
+            try:
+                user_id = resolve_user_id(username)
+            except mysql.connector.Error as err:
+                logger.error(f"User lookup database error: {str(err)}")
+                return jsonify({'error': str(err)}), 500
+            if user_id is None:
+                logger.warning(f"{request.path} rejected: User {username} not found")
+                return jsonify({'error': 'User not found'}), 404
+            g.user_id = user_id
+            g.username = username
+        else:
+            logger.warning(f"{request.path} rejected: Authentication required")
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def require_admin(view):
+    """Like require_user, but only for a session token of a user in ADMIN_USERNAMES.
+
+    The X-Username fallback proves nothing about the caller, so it is not enough here.
+    """
+    @functools.wraps(view)
+    def check_admin(*args, **kwargs):
+        if not request.headers.get('Authorization', '').startswith('Bearer ') or g.username not in ADMIN_USERNAMES:
+            logger.warning(f"{request.path} rejected: {g.username} is not an admin")
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return require_user(check_admin)
 
 @app.route('/register', methods=['POST'])
 def register():
@@ -168,8 +1388,6 @@ def register():
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
 
 @app.route('/login', methods=['POST'])
 def login():
@@ -213,15 +1431,15 @@ def login():
                     'UPDATE login_streaks SET streak = %s, last_login = %s WHERE user_id = %s',
                     (streak, today, user['id'])
                 )
-            if streak >= 7:
-                award_achievement(user['id'], 'Consistent Planner', 'Logged in daily for a week', 'CalendarIcon')
+            check_achievements(conn, user['id'], 'login', login_streak=streak)
 
-            conn.commit()
+            commit_request(conn)
             logger.info(f"User logged in: {username}")
             return jsonify({
                 'message': 'Login successful',
                 'username': user['username'],
-                'user_id': user['id']
+                'user_id': user['id'],
+                'token': issue_session_token(user['id'], user['username'])
             }), 200
         else:
             logger.warning(f"Login failed: Invalid password for {username}")
@@ -232,15 +1450,19 @@ def login():
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+
+def goals_query(user_id):
+    return ('''
+        SELECT id, name, target_amount, current_amount, deadline
+        FROM savings_goals
+        WHERE user_id = %s
+    ''', (user_id,))
 
 @app.route('/savings-goals', methods=['GET', 'POST'])
+@require_user
 def savings_goals():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Savings goals request failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+    username = g.username
+    user_id = g.user_id
 
     conn = None
     cursor = None
@@ -248,19 +1470,8 @@ def savings_goals():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Savings goals failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        user_id = user['id']
-
         if request.method == 'GET':
-            cursor.execute('''
-                SELECT id, name, target_amount, current_amount, deadline
-                FROM savings_goals
-                WHERE user_id = %s
-            ''', (user_id,))
+            cursor.execute(*goals_query(user_id))
             goals = cursor.fetchall()
             logger.debug(f"Fetched {len(goals)} savings goals for user {username}")
             return jsonify({'goals': goals}), 200
@@ -295,8 +1506,10 @@ def savings_goals():
                 INSERT INTO savings_goals (user_id, name, target_amount, current_amount, deadline)
                 VALUES (%s, %s, %s, %s, %s)
             ''', (user_id, name, target_amount, 0.00, deadline_date))
-            create_notification(user_id, f"Created new savings goal: {name}", "savings")
-            conn.commit()
+            create_notification(conn, user_id, f"Created new savings goal: {name}", "savings")
+            invalidate_insights(conn, user_id)
+            queue_change(user_id, 'goals')
+            commit_request(conn)
             logger.info(f"Savings goal created for user {username}: {name}")
             return jsonify({'message': 'Savings goal created'}), 201
 
@@ -309,15 +1522,107 @@ def savings_goals():
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+
+TRANSACTIONS_PAGE_SIZE = 50
+TRANSACTIONS_MAX_PAGE_SIZE = 500
+
+def transaction_filters(args):
+    """Build SQL conditions on the transactions alias t from query parameters.
+
+    Supports start_date, end_date, category, budget_id, goal_id and
+    type=income|expense. Raises ValueError on malformed values.
+    """
+    filters = []
+    params = []
+    for name, condition in [('start_date', 't.transaction_date >= %s'), ('end_date', 't.transaction_date <= %s')]:
+        if args.get(name):
+            try:
+                params.append(datetime.strptime(args[name], '%Y-%m-%d').date())
+            except ValueError:
+                raise ValueError('Invalid date format (use YYYY-MM-DD)')
+            filters.append(condition)
+    if args.get('category'):
+        filters.append('t.ai_category = %s')
+        params.append(args['category'])
+    for name in ['budget_id', 'goal_id']:
+        if args.get(name):
+            if not args[name].isdigit():
+                raise ValueError(f"Invalid {name.replace('_id', '')} ID")
+            filters.append(f't.{name} = %s')
+            params.append(int(args[name]))
+    transaction_type = args.get('type')
+    if transaction_type == 'income':
+        filters.append('t.amount > 0')
+    elif transaction_type == 'expense':
+        filters.append('t.amount < 0')
+    elif transaction_type:
+        raise ValueError('Invalid type (use income or expense)')
+    return filters, params
+
+JSON_LAYOUTS = ('objects', 'columns')
+
+def json_layout(args):
+    """The row layout asked for with ?layout=: a list of objects (the default) or
+    columnar {"columns": [...], "rows": [[...]]}. Raises ValueError if unknown."""
+    layout = args.get('layout', 'objects')
+    if layout not in JSON_LAYOUTS:
+        raise ValueError('Invalid layout (use objects or columns)')
+    return layout
+
+def json_response(payload, status=200):
+    """Compact JSON with no default() hook, for payloads already made of plain
+    values (see fast_json.RowEncoder). Compressed with br or gzip when the
+    client accepts it and the body is big enough to gain from it."""
+    body = dumps(payload).encode('utf-8')
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+TRANSACTION_BUDGET_QUERY = 'SELECT id, category, amount, period FROM budgets WHERE id = %s AND user_id = %s'
+TRANSACTION_INSERT = '''
+    INSERT INTO transactions (user_id, amount, description, transaction_date, goal_id, budget_id, ai_category)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+'''
+
+def parse_new_transaction(data):
+    """Check a POST /transactions body. Returns (amount, description,
+    transaction_date, goal_id, budget_id); raises ValueError with the error to send."""
+    data = data or {}
+    amount = data.get('amount')
+    description = data.get('description')
+    transaction_date = data.get('transaction_date')
+    goal_id = data.get('goal_id')
+    budget_id = data.get('budget_id')
+
+    if not amount or not description or not transaction_date:
+        raise ValueError('Missing required fields')
+    try:
+        amount = float(amount)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid amount')
+    try:
+        transaction_date = datetime.strptime(transaction_date, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        raise ValueError('Invalid date format (use YYYY-MM-DD)')
+    try:
+        goal_id = int(goal_id) if goal_id else None
+    except (ValueError, TypeError):
+        raise ValueError('Invalid goal ID')
+    try:
+        budget_id = int(budget_id) if budget_id else None
+    except (ValueError, TypeError):
+        raise ValueError('Invalid budget ID')
+    return amount, description, transaction_date, goal_id, budget_id
 
 @app.route('/transactions', methods=['GET', 'POST', 'DELETE'])
+@require_user
 def transactions():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Transactions request failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+    username = g.username
+    user_id = g.user_id
 
     conn = None
     cursor = None
@@ -325,135 +1630,138 @@ def transactions():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Transactions failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        user_id = user['id']
-
         if request.method == 'GET':
-            cursor.execute('''
-                SELECT t.id, t.amount, t.description, t.transaction_date, t.goal_id, g.name AS goal_name,
-                       t.budget_id, b.category AS budget_category, t.ai_category
-                FROM transactions t
-                LEFT JOIN savings_goals g ON t.goal_id = g.id
-                LEFT JOIN budgets b ON t.budget_id = b.id
-                WHERE t.user_id = %s
-                ORDER BY t.transaction_date DESC
-            ''', (user_id,))
-            transactions = cursor.fetchall()
-            logger.debug(f"Fetched {len(transactions)} transactions for user {username}")
-            return jsonify({'transactions': transactions}), 200
+            try:
+                filters, params = transaction_filters(request.args)
+                layout = json_layout(request.args)
+            except ValueError as e:
+                logger.warning(f"Transactions fetch failed: {str(e)}")
+                return jsonify({'error': str(e)}), 400
+            try:
+                limit = min(int(request.args.get('limit', TRANSACTIONS_PAGE_SIZE)), TRANSACTIONS_MAX_PAGE_SIZE)
+                if limit <= 0:
+                    raise ValueError
+            except ValueError:
+                logger.warning("Transactions fetch failed: Invalid limit")
+                return jsonify({'error': 'Invalid limit'}), 400
+            page_after = request.args.get('cursor')
+            if page_after:
+                try:
+                    after_date, after_id = page_after.split('_')
+                    after_date = datetime.strptime(after_date, '%Y-%m-%d').date()
+                    after_id = int(after_id)
+                except ValueError:
+                    logger.warning("Transactions fetch failed: Invalid cursor")
+                    return jsonify({'error': 'Invalid cursor'}), 400
+
+            # Keyset pagination on (transaction_date, id) keeps every page an index range scan
+            page_filters = list(filters)
+            page_params = list(params)
+            if page_after:
+                page_filters.append('(t.transaction_date < %s OR (t.transaction_date = %s AND t.id < %s))')
+                page_params += [after_date, after_date, after_id]
+            # Tuple rows, encoded by a per-query RowEncoder instead of a dict per row and jsonify
+            rows_cursor = conn.cursor()
+            try:
+                rows_cursor.execute(f'''
+                    SELECT t.id, t.amount, t.description, t.transaction_date, t.goal_id, g.name AS goal_name,
+                           t.budget_id, b.category AS budget_category, t.ai_category
+                    FROM transactions t
+                    LEFT JOIN savings_goals g ON t.goal_id = g.id
+                    LEFT JOIN budgets b ON t.budget_id = b.id
+                    WHERE t.user_id = %s {''.join(' AND ' + f for f in page_filters)}
+                    ORDER BY t.transaction_date DESC, t.id DESC
+                    LIMIT %s
+                ''', (user_id, *page_params, limit + 1))
+                rows = rows_cursor.fetchall()
+                encoder = row_encoder(rows_cursor.description)
+            finally:
+                rows_cursor.close()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last_id, _, _, last_date = rows[-1][:4]
+                next_cursor = f"{last_date.isoformat()}_{last_id}"
+
+            response = {'transactions': encoder.encode(rows, layout), 'next_cursor': next_cursor}
+            # The total only needs computing once, for the first page
+            if not page_after:
+                cursor.execute(f'''
+                    SELECT COUNT(*) AS total FROM transactions t
+                    WHERE t.user_id = %s {''.join(' AND ' + f for f in filters)}
+                ''', (user_id, *params))
+                response['total'] = cursor.fetchone()['total']
+            logger.debug(f"Fetched {len(rows)} transactions for user {username}")
+            return json_response(response)
 
         elif request.method == 'POST':
             data = request.get_json()
             logger.debug(f"Transaction POST data: {data}")
-            amount = data.get('amount')
-            description = data.get('description')
-            transaction_date = data.get('transaction_date')
-            goal_id = data.get('goal_id')
-            budget_id = data.get('budget_id')
-
-            if not amount or not description or not transaction_date:
-                logger.warning("Transaction creation failed: Missing required fields")
-                return jsonify({'error': 'Missing required fields'}), 400
-
-            try:
-                amount = float(amount)
-            except (ValueError, TypeError):
-                logger.warning("Transaction creation failed: Invalid amount")
-                return jsonify({'error': 'Invalid amount'}), 400
-
             try:
-                transaction_date = datetime.strptime(transaction_date, '%Y-%m-%d').date()
-            except ValueError:
-                logger.warning("Transaction creation failed: Invalid date format")
-                return jsonify({'error': 'Invalid date format (use YYYY-MM-DD)'}), 400
+                amount, description, transaction_date, goal_id, budget_id = parse_new_transaction(data)
+            except ValueError as e:
+                logger.warning(f"Transaction creation failed: {str(e)}")
+                return jsonify({'error': str(e)}), 400
 
             if goal_id:
-                try:
-                    goal_id = int(goal_id)
-                    cursor.execute('SELECT id FROM savings_goals WHERE id = %s AND user_id = %s', (goal_id, user_id))
-                    if not cursor.fetchone():
-                        logger.warning(f"Transaction creation failed: Invalid goal ID {goal_id}")
-                        return jsonify({'error': 'Invalid goal ID'}), 400
-                except (ValueError, TypeError):
-                    logger.warning("Transaction creation failed: Invalid goal ID format")
+                cursor.execute('SELECT id FROM savings_goals WHERE id = %s AND user_id = %s', (goal_id, user_id))
+                if not cursor.fetchone():
+                    logger.warning(f"Transaction creation failed: Invalid goal ID {goal_id}")
                     return jsonify({'error': 'Invalid goal ID'}), 400
 
             if budget_id:
-                try:
-                    budget_id = int(budget_id)
-                    cursor.execute('SELECT id FROM budgets WHERE id = %s AND user_id = %s', (budget_id, user_id))
-                    if not cursor.fetchone():
-                        logger.warning(f"Transaction creation failed: Invalid budget ID {budget_id}")
-                        return jsonify({'error': 'Invalid budget ID'}), 400
-                except (ValueError, TypeError):
-                    logger.warning("Transaction creation failed: Invalid budget ID format")
+                cursor.execute(TRANSACTION_BUDGET_QUERY, (budget_id, user_id))
+                budget = cursor.fetchone()
+                if not budget:
+                    logger.warning(f"Transaction creation failed: Invalid budget ID {budget_id}")
                     return jsonify({'error': 'Invalid budget ID'}), 400
 
-            # Categorize using Groq
-            ai_category = categorize_transaction(description)
+            # Categorize using Groq, or leave it to the background workers when deferred
+            defer = data.get('defer', DEFERRED_CATEGORIZATION)
+            if defer:
+                ai_category = lookup_category(description, conn)
+            else:
+                ai_category = categorize_transaction(description, conn, user_id)
 
             # Insert transaction
-            cursor.execute('''
-                INSERT INTO transactions (user_id, amount, description, transaction_date, goal_id, budget_id, ai_category)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', (user_id, amount, description, transaction_date, goal_id or None, budget_id or None, ai_category))
+            cursor.execute(
+                TRANSACTION_INSERT,
+                (user_id, amount, description, transaction_date, goal_id or None, budget_id or None, ai_category)
+            )
 
-            # Budget notification
+            deltas = new_rollup_deltas()
+            add_rollup(deltas, user_id, transaction_date, ai_category, budget_id, goal_id, amount)
+            record_daily_rollups(conn, deltas)
+
+            # Budget spend and notification
             if budget_id and amount < 0:
-                cursor.execute('''
-                    SELECT b.category, b.amount AS budget_amount, COALESCE(SUM(t.amount), 0) AS spent_amount
-                    FROM budgets b
-                    LEFT JOIN transactions t ON t.budget_id = b.id AND t.amount < 0
-                    WHERE b.id = %s AND b.user_id = %s
-                    GROUP BY b.id, b.category, b.amount
-                ''', (budget_id, user_id))
-                budget = cursor.fetchone()
-                if budget:
-                    spent = float(abs(budget['spent_amount'])) + abs(amount)
-                    limit = float(budget['budget_amount'])
-                    if spent >= limit:
-                        create_notification(user_id, f"Budget exceeded for {budget['category']}: ${spent:.2f}/ ${limit:.2f}", "budget")
-                    elif spent >= limit * 0.8:
-                        create_notification(user_id, f"Warning: {budget['category']} budget nearing limit: ${spent:.2f}/ ${limit:.2f}", "budget")
+                period_start = budget_period_start(budget['period'], transaction_date)
+                record_budget_spend(conn, [(budget_id, period_start, -amount)])
+                cursor.execute(
+                    'SELECT spent FROM budget_spend WHERE budget_id = %s AND period_start = %s',
+                    (budget_id, period_start)
+                )
+                spent = float(cursor.fetchone()['spent'])
+                notify_budget_status(conn, user_id, budget['category'], spent, float(budget['amount']))
 
             # Savings goal progress notification
             if goal_id and amount > 0:
-                cursor.execute('''
-                    SELECT name, current_amount, target_amount
-                    FROM savings_goals
-                    WHERE id = %s AND user_id = %s
-                ''', (goal_id, user_id))
-                goal = cursor.fetchone()
-                if goal:
-                    cursor.execute('''
-                        UPDATE savings_goals
-                        SET current_amount = current_amount + %s
-                        WHERE id = %s AND user_id = %s
-                    ''', (amount, goal_id, user_id))
-                    new_current = float(goal['current_amount']) + amount
-                    target = float(goal['target_amount'])
-                    progress = (new_current / target) * 100
-                    milestones = [25, 50, 75, 100]
-                    for milestone in milestones:
-                        if (float(goal['current_amount']) / target * 100) < milestone <= progress:
-                            create_notification(user_id, f"Reached {milestone}% of savings goal '{goal['name']}': ${new_current:.2f}/ ${target:.2f}", "savings")
-                    # Check for "Savings Star"
-                    if new_current >= target:
-                        award_achievement(user_id, 'Savings Star', 'Completed a savings goal', 'StarIcon')
-
-            # Award "First Step" for first transaction
-            cursor.execute('SELECT COUNT(*) as count FROM transactions WHERE user_id = %s', (user_id,))
-            transaction_count = cursor.fetchone()['count']
-            if transaction_count == 1:
-                award_achievement(user_id, 'First Step', 'Added your first transaction', 'CheckCircleIcon')
+                add_goal_contribution(conn, user_id, goal_id, amount)
 
-            conn.commit()
-            logger.info(f"Transaction created for user {username}: {description}, AI Category: {ai_category}")
-            return jsonify({'message': 'Transaction created', 'ai_category': ai_category}), 201
+            check_achievements(conn, user_id, 'transaction_added')
+
+            invalidate_insights(conn, user_id)
+            queue_change(user_id, 'transactions', 'budgets', 'goals')
+            commit_request(conn)
+            if ai_category is None:
+                start_categorization_workers()
+                categorization_wakeup.set()
+            logger.info(f"Transaction created for user {username}: {description}, AI Category: {ai_category or 'pending'}")
+            return jsonify({
+                'message': 'Transaction created',
+                'ai_category': ai_category,
+                'categorization_pending': ai_category is None
+            }), 201
 
     except mysql.connector.Error as err:
         logger.error(f"Transactions database error: {str(err)}")
@@ -464,45 +1772,392 @@ def transactions():
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
 
-@app.route('/transactions/<int:transaction_id>', methods=['DELETE'])
-def delete_transaction(transaction_id):
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Delete transaction failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+IMPORT_CHUNK_SIZE = 500  # rows per executemany
+IMPORT_MAX_REPORTED_ERRORS = 100
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%Y%m%d']
+
+# Accepted CSV headers (lowercased) for each transaction field
+IMPORT_CSV_COLUMNS = {
+    'transaction_date': ['transaction_date', 'date', 'posted date', 'posting date', 'transaction date'],
+    'description': ['description', 'name', 'payee', 'memo'],
+    'amount': ['amount'],
+    'debit': ['debit'],
+    'credit': ['credit'],
+    'goal_id': ['goal_id'],
+    'budget_id': ['budget_id']
+}
+
+def parse_csv_import(lines):
+    """Yield (row_number, raw_row) from a CSV export with a header row."""
+    reader = csv.reader(lines)
+    header = [h.strip().lower() for h in next(reader, [])]
+    columns = {}
+    for field, names in IMPORT_CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                columns[field] = header.index(name)
+                break
+    for row_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield row_number, {field: row[i].strip() if i < len(row) else '' for field, i in columns.items()}
+
+def parse_ofx_import(lines):
+    """Yield (row_number, raw_row) for each <STMTTRN> block of an OFX/QFX file.
+
+    Handles both SGML (unclosed tags) and XML OFX; row_number counts transactions.
+    """
+    current = None
+    row_number = 0
+    for line in lines:
+        for tag, value in re.findall(r'<(/?\w+)>([^<\r\n]*)', line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                current = {}
+            elif tag == '/STMTTRN' and current is not None:
+                row_number += 1
+                yield row_number, {
+                    'transaction_date': current.get('DTPOSTED', '')[:8],
+                    'amount': current.get('TRNAMT', ''),
+                    'description': current.get('NAME') or current.get('MEMO', '')
+                }
+                current = None
+            elif current is not None and not tag.startswith('/'):
+                current[tag] = value.strip()
+
+def parse_import_amount(value):
+    """A bank export amount as a float: '$1,234.50' -> 1234.5, blank -> 0."""
+    value = value.replace(',', '').replace('$', '').strip()
+    return float(value) if value else 0.0
+
+def validate_import_row(raw, goal_ids, budget_ids):
+    """Turn a raw import row into (amount, description, date, goal_id, budget_id).
+
+    Raises ValueError with a user-facing message when the row is invalid.
+    """
+    description = raw.get('description')
+    if not description:
+        raise ValueError('Missing description')
+
+    try:
+        if raw.get('amount'):
+            amount = parse_import_amount(raw['amount'])
+        else:
+            credit = parse_import_amount(raw.get('credit', ''))
+            debit = parse_import_amount(raw.get('debit', ''))
+            amount = credit - abs(debit)
+    except ValueError:
+        raise ValueError('Invalid amount')
+    if not amount:
+        raise ValueError('Missing amount')
+
+    transaction_date = None
+    for date_format in IMPORT_DATE_FORMATS:
+        try:
+            transaction_date = datetime.strptime(raw.get('transaction_date', ''), date_format).date()
+            break
+        except ValueError:
+            continue
+    if transaction_date is None:
+        raise ValueError('Invalid date format (use YYYY-MM-DD)')
+
+    goal_id = raw.get('goal_id') or None
+    if goal_id:
+        if not goal_id.isdigit() or int(goal_id) not in goal_ids:
+            raise ValueError('Invalid goal ID')
+        goal_id = int(goal_id)
+
+    budget_id = raw.get('budget_id') or None
+    if budget_id:
+        if not budget_id.isdigit() or int(budget_id) not in budget_ids:
+            raise ValueError('Invalid budget ID')
+        budget_id = int(budget_id)
+
+    return amount, description, transaction_date, goal_id, budget_id
+
+def categorize_import_chunk(conn, rows, defer):
+    """Categorize a chunk of validated rows with at most one Groq call per batch.
+
+    When deferring, rows the local tiers can't resolve are left as None.
+    """
+    categories = []
+    unresolved = {}  # normalized key -> indexes into rows
+    for i, row in enumerate(rows):
+        category = lookup_category(row[1], conn)
+        categories.append(category)
+        if category is None:
+            unresolved.setdefault(normalize_description(row[1]), []).append(i)
+    if defer or not unresolved:
+        return categories
+
+    keys = list(unresolved)
+    for start in range(0, len(keys), CATEGORIZATION_BATCH_SIZE):
+        batch = keys[start:start + CATEGORIZATION_BATCH_SIZE]
+        try:
+            results = groq_categorize_batch([rows[unresolved[key][0]][1] for key in batch])
+        except Exception as e:
+            logger.error(f"Groq batch categorization error during import: {str(e)}")
+            results = [None] * len(batch)
+        for key, category in zip(batch, results):
+            if category:
+                category_cache.set(key, category)
+                store_cached_category(conn, key, category)
+            for i in unresolved[key]:
+                categories[i] = category or keyword_categorize(rows[i][1])
+    return categories
+
+@app.route('/transactions/import', methods=['POST'])
+@require_user
+def import_transactions():
+    """Import a CSV or OFX bank export in one DB transaction.
+
+    Accepts a multipart 'file' upload or a raw request body. Budget, savings
+    milestone and achievement checks run once per import, not once per row.
+    """
+    username = g.username
+    user_id = g.user_id
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    filename = (upload.filename or '') if upload else ''
+    import_format = request.args.get('format') or ('ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv')
+    if import_format not in ['csv', 'ofx']:
+        logger.warning(f"Transaction import failed: Unsupported format {import_format}")
+        return jsonify({'error': 'Unsupported format (use csv or ofx)'}), 400
+    defer = request.args.get('defer', str(DEFERRED_CATEGORIZATION)).lower() == 'true'
 
     conn = None
     cursor = None
+    started = time.monotonic()
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
 
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Delete transaction failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        user_id = user['id']
+        cursor.execute('SELECT id FROM savings_goals WHERE user_id = %s', (user_id,))
+        goal_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute('SELECT id, category, amount, period FROM budgets WHERE user_id = %s', (user_id,))
+        budgets_by_id = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        lines = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        parser = parse_ofx_import if import_format == 'ofx' else parse_csv_import
+
+        imported = 0
+        pending = 0
+        errors = []
+        error_count = 0
+        goal_totals = defaultdict(float)
+        budget_spends = defaultdict(float)  # (budget_id, period_start) -> spent
+        chunk = []
+
+        def flush(chunk):
+            categories = categorize_import_chunk(conn, chunk, defer)
+            cursor.executemany('''
+                INSERT INTO transactions (user_id, amount, description, transaction_date, goal_id, budget_id, ai_category)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ''', [(user_id, *row, category) for row, category in zip(chunk, categories)])
+            deltas = new_rollup_deltas()
+            for (amount, _, transaction_date, goal_id, budget_id), category in zip(chunk, categories):
+                add_rollup(deltas, user_id, transaction_date, category, budget_id, goal_id, amount)
+            record_daily_rollups(conn, deltas)
+            return sum(category is None for category in categories)
+
+        for row_number, raw in parser(lines):
+            try:
+                row = validate_import_row(raw, goal_ids, budgets_by_id)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                    errors.append({'row': row_number, 'error': str(e)})
+                continue
+            amount, _, transaction_date, goal_id, budget_id = row
+            if goal_id and amount > 0:
+                goal_totals[goal_id] += amount
+            if budget_id and amount < 0:
+                period_start = budget_period_start(budgets_by_id[budget_id][2], transaction_date)
+                budget_spends[(budget_id, period_start)] -= amount
+            chunk.append(row)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                pending += flush(chunk)
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            pending += flush(chunk)
+            imported += len(chunk)
+
+        # Once-per-import checks
+        if budget_spends:
+            record_budget_spend(conn, [(b, p, spent) for (b, p), spent in budget_spends.items()])
+            # Alert on the latest period the import touched for each budget
+            latest_periods = {}
+            for budget_id, period_start in budget_spends:
+                latest_periods[budget_id] = max(period_start, latest_periods.get(budget_id, period_start))
+            for budget_id, period_start in latest_periods.items():
+                cursor.execute(
+                    'SELECT spent FROM budget_spend WHERE budget_id = %s AND period_start = %s',
+                    (budget_id, period_start)
+                )
+                category, limit, _ = budgets_by_id[budget_id]
+                notify_budget_status(conn, user_id, category, float(cursor.fetchone()[0]), float(limit))
+        for goal_id, total in goal_totals.items():
+            add_goal_contribution(conn, user_id, goal_id, total)
+        if imported:
+            check_achievements(conn, user_id, 'transaction_added')
+
+        invalidate_insights(conn, user_id)
+        queue_change(user_id, 'transactions', 'budgets', 'goals')
+        commit_request(conn)
+        if pending:
+            start_categorization_workers()
+            categorization_wakeup.set()
+        elapsed = time.monotonic() - started
+        logger.info(f"Imported {imported} transactions for user {username} ({error_count} rejected) in {elapsed:.2f}s")
+        return jsonify({
+            'message': 'Import complete',
+            'imported': imported,
+            'failed': error_count,
+            'errors': errors,
+            'categorization_pending': pending,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round((imported + error_count) / elapsed, 1) if elapsed else None
+        }), 201
 
-        # Fetch transaction details
-        cursor.execute('''
-            SELECT amount, goal_id, budget_id
-            FROM transactions
-            WHERE id = %s AND user_id = %s
-        ''', (transaction_id, user_id))
-        transaction = cursor.fetchone()
-        if not transaction:
-            logger.warning(f"Delete transaction failed: Transaction {transaction_id} not found for user {username}")
-            return jsonify({'error': 'Transaction not found'}), 404
+    except mysql.connector.Error as err:
+        logger.error(f"Transaction import database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    except Exception as e:
+        logger.error(f"Transaction import unexpected error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if cursor:
+            cursor.close()
 
-        # Update savings goal if necessary
-        if transaction['goal_id'] and transaction['amount'] > 0:
-            cursor.execute('''
-                UPDATE savings_goals
-                SET current_amount = current_amount - %s
+# Export streams rows from an unbuffered cursor, so memory stays flat however
+# long the history is. A slow client keeps MySQL waiting between fetches,
+# hence the longer write timeout for the export's session.
+EXPORT_FETCH_SIZE = 1000
+EXPORT_NET_WRITE_TIMEOUT = 600  # seconds
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# transaction_date, description, amount, goal_id and budget_id are the names /transactions/import reads back
+EXPORT_HEADER = [
+    'id', 'transaction_date', 'description', 'amount', 'ai_category',
+    'budget_id', 'budget_category', 'goal_id', 'goal_name'
+]
+
+def export_chunks(cursor, export_format):
+    """Yield the export's rows one fetchmany() chunk at a time."""
+    encoder = row_encoder(cursor.description)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    while True:
+        rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+        if not rows:
+            return
+        if export_format == 'csv':
+            # csv writes Decimal and date values as plain numbers and ISO dates
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(dumps(record) + '\n' for record in encoder.records(rows))
+
+@app.route('/transactions/export', methods=['GET'])
+@require_user
+def export_transactions():
+    """Download transactions, oldest first, as CSV or NDJSON.
+
+    Accepts the filters of GET /transactions. The body is streamed while the
+    rows are read, and the CSV header goes out before the query runs.
+    """
+    user_id = g.user_id
+    username = g.username
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        logger.warning("Transaction export failed: Invalid format")
+        return jsonify({'error': 'Invalid format (use csv or ndjson)'}), 400
+    try:
+        filters, params = transaction_filters(request.args)
+    except ValueError as e:
+        logger.warning(f"Transaction export failed: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+    # The stream checks out a connection of its own for as long as it runs
+    release_request_connection()
+    logger.info(f"Transaction export ({export_format}) started for user {username}")
+
+    def body():
+        if export_format == 'csv':
+            yield ','.join(EXPORT_HEADER) + '\r\n'
+        try:
+            conn = acquire_db_connection()
+        except mysql.connector.Error:
+            return  # Logged by acquire_db_connection; the download just ends
+        finished = False
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SET SESSION net_write_timeout = %s', (EXPORT_NET_WRITE_TIMEOUT,))
+            cursor.execute(f'''
+                SELECT t.id, t.transaction_date, t.description, t.amount, t.ai_category,
+                       t.budget_id, b.category AS budget_category, t.goal_id, g.name AS goal_name
+                FROM transactions t
+                LEFT JOIN savings_goals g ON t.goal_id = g.id
+                LEFT JOIN budgets b ON t.budget_id = b.id
+                WHERE t.user_id = %s {''.join(' AND ' + f for f in filters)}
+                ORDER BY t.transaction_date, t.id
+            ''', (user_id, *params))
+            yield from export_chunks(cursor, export_format)
+            cursor.close()
+            finished = True
+        except mysql.connector.Error as err:
+            # The headers are already sent, so the download just ends early
+            logger.error(f"Transaction export database error: {str(err)}")
+        finally:
+            if finished:
+                release_db_connection(conn)
+            else:
+                # A half-read result would have to be drained before the session could be reused
+                discard_db_connection(conn)
+
+    return Response(
+        stream_with_context(body()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="transactions.{export_format}"',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/transactions/<int:transaction_id>', methods=['DELETE'])
+@require_user
+def delete_transaction(transaction_id):
+    username = g.username
+    user_id = g.user_id
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # Fetch transaction details
+        cursor.execute('''
+            SELECT t.amount, t.transaction_date, t.goal_id, t.budget_id, t.ai_category, b.period AS budget_period
+            FROM transactions t
+            LEFT JOIN budgets b ON b.id = t.budget_id
+            WHERE t.id = %s AND t.user_id = %s
+        ''', (transaction_id, user_id))
+        transaction = cursor.fetchone()
+        if not transaction:
+            logger.warning(f"Delete transaction failed: Transaction {transaction_id} not found for user {username}")
+            return jsonify({'error': 'Transaction not found'}), 404
+
+        # Update savings goal if necessary
+        if transaction['goal_id'] and transaction['amount'] > 0:
+            cursor.execute('''
+                UPDATE savings_goals
+                SET current_amount = current_amount - %s
                 WHERE id = %s AND user_id = %s
             ''', (transaction['amount'], transaction['goal_id'], user_id))
             logger.debug(f"Updated savings goal {transaction['goal_id']} for user {username}: subtracted {transaction['amount']}")
@@ -513,7 +2168,19 @@ def delete_transaction(transaction_id):
             logger.warning(f"Delete transaction failed: No rows affected for transaction {transaction_id}")
             return jsonify({'error': 'Transaction not found'}), 404
 
-        conn.commit()
+        deltas = new_rollup_deltas()
+        add_rollup(deltas, user_id, transaction['transaction_date'], transaction['ai_category'],
+                   transaction['budget_id'], transaction['goal_id'], transaction['amount'], sign=-1)
+        record_daily_rollups(conn, deltas)
+
+        # Take the amount back out of its budget period
+        if transaction['budget_id'] and transaction['budget_period'] and transaction['amount'] < 0:
+            period_start = budget_period_start(transaction['budget_period'], transaction['transaction_date'])
+            record_budget_spend(conn, [(transaction['budget_id'], period_start, transaction['amount'])])
+
+        invalidate_insights(conn, user_id)
+        queue_change(user_id, 'transactions', 'budgets', 'goals')
+        commit_request(conn)
         logger.info(f"Transaction {transaction_id} deleted for user {username}")
         return jsonify({'message': 'Transaction deleted'}), 200
 
@@ -526,15 +2193,24 @@ def delete_transaction(transaction_id):
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+
+def budgets_query(user_id):
+    """Budgets with the spend for the current period, read from the maintained budget_spend rows."""
+    today = datetime.now().date()
+    return ('''
+        SELECT b.id, b.category, b.amount AS budget_amount, b.period,
+               -COALESCE(s.spent, 0) AS spent_amount
+        FROM budgets b
+        LEFT JOIN budget_spend s ON s.budget_id = b.id AND s.period_start =
+            CASE b.period WHEN 'weekly' THEN %s ELSE %s END
+        WHERE b.user_id = %s
+    ''', (budget_period_start('weekly', today), budget_period_start('monthly', today), user_id))
 
 @app.route('/budgets', methods=['GET', 'POST'])
+@require_user
 def budgets():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Budgets request failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+    username = g.username
+    user_id = g.user_id
 
     conn = None
     cursor = None
@@ -542,22 +2218,8 @@ def budgets():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Budgets failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        user_id = user['id']
-
         if request.method == 'GET':
-            cursor.execute('''
-                SELECT b.id, b.category, b.amount AS budget_amount,
-                       COALESCE(SUM(t.amount), 0) AS spent_amount
-                FROM budgets b
-                LEFT JOIN transactions t ON t.budget_id = b.id AND t.amount < 0
-                WHERE b.user_id = %s
-                GROUP BY b.id, b.category, b.amount
-            ''', (user_id,))
+            cursor.execute(*budgets_query(user_id))
             budgets = cursor.fetchall()
             logger.debug(f"Fetched {len(budgets)} budgets for user {username}")
             return jsonify({'budgets': budgets}), 200
@@ -588,8 +2250,10 @@ def budgets():
                 INSERT INTO budgets (user_id, category, amount, period)
                 VALUES (%s, %s, %s, %s)
             ''', (user_id, category, amount, period))
-            create_notification(user_id, f"Created new budget: {category}", "budget")
-            conn.commit()
+            create_notification(conn, user_id, f"Created new budget: {category}", "budget")
+            invalidate_insights(conn, user_id)
+            queue_change(user_id, 'budgets')
+            commit_request(conn)
             logger.info(f"Budget created for user {username}: {category}")
             return jsonify({'message': 'Budget created'}), 201
 
@@ -602,169 +2266,282 @@ def budgets():
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
-
-@app.route('/transaction-report', methods=['GET'])
-def transaction_report():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Transaction report failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
-
-    # Optional date range parameters (default: last 30 days)
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-    
-    try:
-        # Validate and set date range
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        else:
-            start_date = end_date - timedelta(days=30)
-
-        if start_date > end_date:
-            logger.warning("Transaction report failed: Invalid date range")
-            return jsonify({'error': 'Start date cannot be after end date'}), 400
 
-        conn = None
-        cursor = None
+# Generated report insights, keyed on (user_id, start_date, end_date) and
+# valid while the report data hash and the user's write generation (the
+# insight_generations table, so every process sees a bump) match
+INSIGHT_CACHE_SIZE = int(os.getenv('INSIGHT_CACHE_SIZE', 1000))
+INSIGHT_CACHE_TTL = int(os.getenv('INSIGHT_CACHE_TTL', 3600))  # seconds
+INSIGHT_CACHE_DB = os.getenv('INSIGHT_CACHE_DB', 'false').lower() == 'true'
+INSIGHT_CACHE_SWR = os.getenv('INSIGHT_CACHE_SWR', 'false').lower() == 'true'  # stale-while-revalidate
+INSIGHTS_UNAVAILABLE = "Unable to generate AI insights at this time."
+
+insight_cache = LRUCache(INSIGHT_CACHE_SIZE)
+insight_refreshing = set()
+insight_refresh_lock = threading.Lock()
+insight_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='insights')
+
+def generate_ai_insights(ai_prompt, user_id=None):
+    """Ask Groq for report insights. Returns None if the call fails or is refused."""
+    try:
+        text = llm.complete(
+            'report',
+            messages=[
+                {"role": "system", "content": REPORT_SYSTEM_PROMPT},
+                {"role": "user", "content": ai_prompt}
+            ],
+            max_tokens=350,
+            temperature=0.5,
+            user_id=user_id
+        )
+        logger.debug("Groq generated transaction report successfully")
+        return text.strip()
+    except Exception as e:
+        logger.error(f"Groq report generation error: {str(e)}")
+        return None
+
+INSIGHT_CACHE_UPSERT = '''
+    INSERT INTO insight_cache (user_id, start_date, end_date, report_hash, insights)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE report_hash = VALUES(report_hash), insights = VALUES(insights),
+                            created_at = CURRENT_TIMESTAMP
+'''
+
+def store_ai_insights(conn, key, report_hash, generation, text):
+    insight_cache.set(key, (report_hash, generation, time.time(), text))
+    if INSIGHT_CACHE_DB and conn is not None:
+        cursor = conn.cursor()
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            # Get user ID
-            cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-            user = cursor.fetchone()
-            if not user:
-                logger.warning(f"Transaction report failed: User {username} not found")
-                return jsonify({'error': 'User not found'}), 404
-            user_id = user['id']
-
-            # Fetch transactions
-            cursor.execute('''
-                SELECT amount, description, transaction_date, goal_id, budget_id, ai_category
-                FROM transactions
-                WHERE user_id = %s AND transaction_date BETWEEN %s AND %s
-                ORDER BY transaction_date DESC
-            ''', (user_id, start_date, end_date))
-            transactions = cursor.fetchall()
-
-            # Initialize aggregates
-            total_income = 0.0
-            total_expenses = 0.0
-            category_sums = defaultdict(float)
-            goal_contributions = defaultdict(float)
-            budget_spending = defaultdict(float)
-
-            # Process transactions
-            for t in transactions:
-                amount = float(t['amount'])
-                category = t['ai_category'] or 'Uncategorized'
-                if amount > 0:
-                    total_income += amount
-                else:
-                    total_expenses += abs(amount)
-                category_sums[category] += amount
-
-                if t['goal_id']:
-                    goal_contributions[t['goal_id']] += amount if amount > 0 else 0
+            cursor.execute(INSIGHT_CACHE_UPSERT, (*key, report_hash, text))
+        except mysql.connector.Error as err:
+            logger.error(f"Insight cache store error: {str(err)}")
+        finally:
+            cursor.close()
 
-                if t['budget_id']:
-                    budget_spending[t['budget_id']] += abs(amount) if amount < 0 else 0
+def refresh_ai_insights(key, report_hash, generation, ai_prompt):
+    """Background regeneration for stale-while-revalidate."""
+    try:
+        text = generate_ai_insights(ai_prompt)
+        if text is None:
+            return
+        conn = acquire_db_connection() if INSIGHT_CACHE_DB else None
+        try:
+            store_ai_insights(conn, key, report_hash, generation, text)
+            if conn is not None:
+                conn.commit()
+        finally:
+            if conn is not None:
+                release_db_connection(conn)
+    except Exception as e:
+        logger.error(f"Background insight refresh error: {str(e)}")
+    finally:
+        with insight_refresh_lock:
+            insight_refreshing.discard(key)
+
+INSIGHT_GENERATION_SELECT = 'SELECT generation FROM insight_generations WHERE user_id = %s'
+INSIGHT_GENERATION_BUMP = (
+    'INSERT INTO insight_generations (user_id, generation) VALUES (%s, 1) '
+    'ON DUPLICATE KEY UPDATE generation = generation + 1'
+)
+INSIGHT_CACHE_SELECT = '''
+    SELECT report_hash, insights, UNIX_TIMESTAMP(created_at)
+    FROM insight_cache
+    WHERE user_id = %s AND start_date = %s AND end_date = %s
+'''
+
+def insight_generation(conn, user_id):
+    """The user's write generation; insights cached under an older one are stale."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INSIGHT_GENERATION_SELECT, (user_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return row[0] if row else 0
 
-            # Fetch savings goals
-            cursor.execute('''
-                SELECT id, name, target_amount, current_amount
-                FROM savings_goals
-                WHERE user_id = %s
-            ''', (user_id,))
-            goals = cursor.fetchall()
-            goal_summary = {
-                g['id']: {
-                    'name': g['name'],
-                    'target': float(g['target_amount']),
-                    'current': float(g['current_amount']),
-                    'contributed': goal_contributions.get(g['id'], 0.0)
-                } for g in goals
-            }
+def lookup_ai_insights(conn, key, report_hash, generation):
+    """Return (insights, fresh) from the cache tiers, or (None, False) on a miss."""
+    entry = insight_cache.get(key)
 
-            # Fetch budgets
-            cursor.execute('''
-                SELECT id, category, amount
-                FROM budgets
-                WHERE user_id = %s
-            ''', (user_id,))
-            budgets = cursor.fetchall()
-            budget_summary = {
-                b['id']: {
-                    'category': b['category'],
-                    'limit': float(b['amount']),
-                    'spent': budget_spending.get(b['id'], 0.0)
-                } for b in budgets
-            }
+    if entry is None and INSIGHT_CACHE_DB:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(INSIGHT_CACHE_SELECT, key)
+            row = cursor.fetchone()
+            if row:
+                entry = (row[0], generation, float(row[2]), row[1])
+                insight_cache.set(key, entry)
+        except mysql.connector.Error as err:
+            logger.error(f"Insight cache lookup error: {str(err)}")
+        finally:
+            cursor.close()
 
-            # Check for "Budget Master" achievement
-            all_within_budget = all(b['spent'] <= b['limit'] for b in budget_summary.values())
-            current_date = datetime.now().date()
-            cursor.execute('SELECT budget_streak, last_budget_check FROM streaks WHERE user_id = %s', (user_id,))
-            streak_data = cursor.fetchone()
-            if not streak_data:
-                streak = 0
-                cursor.execute(
-                    'INSERT INTO streaks (user_id, budget_streak, last_budget_check) VALUES (%s, %s, %s)',
-                    (user_id, streak, current_date)
-                )
-            else:
-                if streak_data['last_budget_check'] and streak_data['last_budget_check'].month != current_date.month:
-                    if all_within_budget:
-                        streak = streak_data['budget_streak'] + 1
-                        cursor.execute(
-                            'UPDATE streaks SET budget_streak = %s, last_budget_check = %s WHERE user_id = %s',
-                            (streak, current_date, user_id)
-                        )
-                        if streak >= 3:
-                            award_achievement(user_id, 'Budget Master', 'Stayed within budget for 3 months', 'CheckIcon')
-                    else:
-                        cursor.execute(
-                            'UPDATE streaks SET budget_streak = 0, last_budget_check = %s WHERE user_id = %s',
-                            (current_date, user_id)
-                        )
-                streak = streak_data['budget_streak']
-
-            # Financial insight notification
-            sorted_categories = sorted(category_sums.items(), key=lambda x: abs(x[1]), reverse=True)
-            if sorted_categories and abs(sorted_categories[0][1]) > total_expenses * 0.5:
-                top_category, top_amount = sorted_categories[0]
-                if top_amount < 0:  # Only for expenses
-                    create_notification(
-                        user_id,
-                        f"You're spending a lot on {top_category}: ${abs(top_amount):.2f}. Consider reviewing this category.",
-                        "insight"
-                    )
-
-            # Prepare data for AI analysis
-            report_data = {
-                'total_income': total_income,
-                'total_expenses': total_expenses,
-                'net_balance': total_income - total_expenses,
-                'categories': [
-                    {'name': k, 'amount': v, 'type': 'Income' if v > 0 else 'Expense'}
-                    for k, v in sorted(category_sums.items(), key=lambda x: abs(x[1]), reverse=True)
-                ],
-                'goals': [
-                    {'name': g['name'], 'target': g['target'], 'current': g['current'], 'contributed': g['contributed']}
-                    for g in goal_summary.values()
-                ],
-                'budgets': [
-                    {'category': b['category'], 'limit': b['limit'], 'spent': b['spent']}
-                    for b in budget_summary.values()
-                ]
-            }
+    return cached_insight(entry, report_hash, generation)
+
+def cached_insight(entry, report_hash, generation):
+    """(insights, fresh) for an insight_cache entry, or (None, False) for none."""
+    if entry is None:
+        return None, False
+    cached_hash, cached_generation, created_at, text = entry
+    fresh = time.time() - created_at < INSIGHT_CACHE_TTL
+    return text, fresh and cached_hash == report_hash and cached_generation == generation
+
+def cached_ai_insights(conn, user_id, start_date, end_date, report_hash, ai_prompt):
+    """Return (insights, status) where status is 'cached', 'stale', 'generated'
+    or 'unavailable' when Groq failed and nothing was cached.
+
+    When Groq fails, an outdated cached text is served as 'stale' rather than
+    nothing at all.
+    """
+    key = (user_id, start_date, end_date)
+    generation = insight_generation(conn, user_id)
+    text, fresh = lookup_ai_insights(conn, key, report_hash, generation)
+    if text is not None:
+        if fresh:
+            return text, 'cached'
+        if INSIGHT_CACHE_SWR:
+            with insight_refresh_lock:
+                start_refresh = key not in insight_refreshing
+                insight_refreshing.add(key)
+            if start_refresh:
+                insight_executor.submit(refresh_ai_insights, key, report_hash, generation, ai_prompt)
+            return text, 'stale'
+
+    generated = generate_ai_insights(ai_prompt, user_id)
+    if generated is None:
+        return (text, 'stale') if text is not None else (INSIGHTS_UNAVAILABLE, 'unavailable')
+    store_ai_insights(conn, key, report_hash, generation, generated)
+    return generated, 'generated'
+
+def invalidate_insights(conn, user_id):
+    """Mark a user's cached insights stale after a transaction, budget or goal write.
+
+    The bump commits with the caller's write, so no process sees the new data
+    under the old generation.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INSIGHT_GENERATION_BUMP, (user_id,))
+        if INSIGHT_CACHE_DB and not INSIGHT_CACHE_SWR:
+            cursor.execute('DELETE FROM insight_cache WHERE user_id = %s', (user_id,))
+    finally:
+        cursor.close()
 
-            # AI prompt for detailed report
-            ai_prompt = f"""
+def report_date_range(args, default_days=30):
+    """Parse start_date/end_date query parameters (default: the default_days days up to today).
+
+    Raises ValueError on a malformed date.
+    """
+    end_date = datetime.strptime(args.get('end_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+    start_date = args.get('start_date')
+    if start_date:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    else:
+        start_date = end_date - timedelta(days=default_days)
+    return start_date, end_date
+
+def report_content_hash(start_date, end_date, report_data):
+    return hashlib.sha256(
+        json.dumps([str(start_date), str(end_date), report_data], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+REPORT_GOALS_QUERY = 'SELECT id, name, target_amount, current_amount FROM savings_goals WHERE user_id = %s'
+REPORT_BUDGETS_QUERY = 'SELECT id, category, amount FROM budgets WHERE user_id = %s'
+STREAK_QUERY = 'SELECT budget_streak, last_budget_check FROM streaks WHERE user_id = %s'
+
+def build_transaction_report(conn, cursor, user_id, start_date, end_date):
+    """Aggregate a user's report and run its streak, achievement and insight checks.
+
+    Returns (report, report_data, ai_prompt); the caller adds the AI insights and commits.
+    """
+    # Aggregate from the daily rollups rather than every raw transaction
+    aggregates = report_aggregates(cursor, user_id, start_date, end_date)
+    cursor.execute(REPORT_GOALS_QUERY, (user_id,))
+    goals = cursor.fetchall()
+    cursor.execute(REPORT_BUDGETS_QUERY, (user_id,))
+    budgets = cursor.fetchall()
+    report, report_data, ai_prompt = assemble_report(start_date, end_date, aggregates, goals, budgets)
+
+    # Check for "Budget Master" achievement
+    cursor.execute(STREAK_QUERY, (user_id,))
+    streak_write = budget_streak_write(user_id, cursor.fetchone(), report_data['budgets'], datetime.now().date())
+    if streak_write:
+        statement, params, streak = streak_write
+        cursor.execute(statement, params)
+        if streak:
+            check_achievements(conn, user_id, 'budget_check', budget_streak=streak)
+
+    # Financial insight notification
+    _, total_expenses, category_sums, _, _ = aggregates
+    check_spending_insight(conn, user_id, category_sums, total_expenses)
+    return report, report_data, ai_prompt
+
+def budget_streak_write(user_id, streak_data, budgets, current_date):
+    """The streaks statement a report makes, as (statement, params, streak), or None.
+
+    The first report of a month extends the budget streak when every budget
+    is within its limit, and resets it otherwise; streak is the extended
+    streak, for the "Budget Master" check, else None.
+    """
+    if not streak_data:
+        return (
+            'INSERT INTO streaks (user_id, budget_streak, last_budget_check) VALUES (%s, %s, %s)',
+            (user_id, 0, current_date), None
+        )
+    if not streak_data['last_budget_check'] or streak_data['last_budget_check'].month == current_date.month:
+        return None
+    if all(b['spent'] <= b['limit'] for b in budgets):
+        streak = streak_data['budget_streak'] + 1
+        return (
+            'UPDATE streaks SET budget_streak = %s, last_budget_check = %s WHERE user_id = %s',
+            (streak, current_date, user_id), streak
+        )
+    return (
+        'UPDATE streaks SET budget_streak = 0, last_budget_check = %s WHERE user_id = %s',
+        (current_date, user_id), None
+    )
+
+def assemble_report(start_date, end_date, aggregates, goals, budgets):
+    """The report, its data for hashing and the Groq prompt, from report_aggregates()
+    and the user's goal and budget rows. Returns (report, report_data, ai_prompt)."""
+    total_income, total_expenses, category_sums, goal_contributions, budget_spending = aggregates
+    goal_summary = {
+        g['id']: {
+            'name': g['name'],
+            'target': float(g['target_amount']),
+            'current': float(g['current_amount']),
+            'contributed': goal_contributions.get(g['id'], 0.0)
+        } for g in goals
+    }
+    budget_summary = {
+        b['id']: {
+            'category': b['category'],
+            'limit': float(b['amount']),
+            'spent': budget_spending.get(b['id'], 0.0)
+        } for b in budgets
+    }
+
+    # Prepare data for AI analysis
+    report_data = {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_balance': total_income - total_expenses,
+        'categories': [
+            {'name': k, 'amount': v, 'type': 'Income' if v > 0 else 'Expense'}
+            for k, v in sorted(category_sums.items(), key=lambda x: abs(x[1]), reverse=True)
+        ],
+        'goals': [
+            {'name': g['name'], 'target': g['target'], 'current': g['current'], 'contributed': g['contributed']}
+            for g in goal_summary.values()
+        ],
+        'budgets': [
+            {'category': b['category'], 'limit': b['limit'], 'spent': b['spent']}
+            for b in budget_summary.values()
+        ]
+    }
+
+    # AI prompt for detailed report
+    ai_prompt = f"""
 You are a financial advisor analyzing a user's transactions from {start_date} to {end_date}. Provide a detailed report summarizing their financial activity and offer personalized advice. Use the following data:
 
 - Total Income: ${total_income:.2f}
@@ -786,38 +2563,66 @@ Generate a report with:
 Keep the tone professional yet friendly, and limit the response to 300 words.
 """
 
-            # Query Groq for report
-            try:
-                response = groq_client.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=[
-                        {"role": "system", "content": "You are a financial advisor providing clear, concise, and actionable insights."},
-                        {"role": "user", "content": ai_prompt}
-                    ],
-                    max_tokens=350,
-                    temperature=0.5
-                )
-                ai_report = response.choices[0].message.content.strip()
-                logger.debug("Groq generated transaction report successfully")
-            except Exception as e:
-                logger.error(f"Groq report generation error: {str(e)}")
-                ai_report = "Unable to generate AI insights at this time."
-
-            # Combine raw data and AI report
-            report = {
-                'summary': {
-                    'total_income': total_income,
-                    'total_expenses': total_expenses,
-                    'net_balance': total_income - total_expenses,
-                    'period': f"{start_date} to {end_date}"
-                },
-                'categories': report_data['categories'],
-                'goals': report_data['goals'],
-                'budgets': report_data['budgets'],
-                'ai_insights': ai_report
-            }
+    # Combine raw data; the caller adds the AI insights
+    report = {
+        'summary': {
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'net_balance': total_income - total_expenses,
+            'period': f"{start_date} to {end_date}"
+        },
+        'categories': report_data['categories'],
+        'goals': report_data['goals'],
+        'budgets': report_data['budgets']
+    }
+    return report, report_data, ai_prompt
+
+def load_report(conn, user_id, start_date, end_date):
+    """Build a report and look up its cached insights, for callers that generate
+    the insights after the transaction ends. The caller commits.
+
+    Returns (report, ai_prompt, key, report_hash, generation, cached_text, fresh).
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        report, report_data, ai_prompt = build_transaction_report(conn, cursor, user_id, start_date, end_date)
+    finally:
+        cursor.close()
+    key = (user_id, start_date, end_date)
+    report_hash = report_content_hash(start_date, end_date, report_data)
+    generation = insight_generation(conn, user_id)
+    cached_text, fresh = lookup_ai_insights(conn, key, report_hash, generation)
+    return report, ai_prompt, key, report_hash, generation, cached_text, fresh
 
-            conn.commit()
+@app.route('/transaction-report', methods=['GET'])
+@require_user
+def transaction_report():
+    username = g.username
+    user_id = g.user_id
+
+    try:
+        # Optional date range parameters (default: last 30 days)
+        start_date, end_date = report_date_range(request.args)
+
+        if start_date > end_date:
+            logger.warning("Transaction report failed: Invalid date range")
+            return jsonify({'error': 'Start date cannot be after end date'}), 400
+
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            report, report_data, ai_prompt = build_transaction_report(conn, cursor, user_id, start_date, end_date)
+
+            # Query Groq for report, unless the insights for this exact data are cached
+            report_hash = report_content_hash(start_date, end_date, report_data)
+            ai_report, insights_status = cached_ai_insights(conn, user_id, start_date, end_date, report_hash, ai_prompt)
+            report['ai_insights'] = ai_report
+            report['ai_insights_status'] = insights_status
+
+            commit_request(conn)
             logger.info(f"Transaction report generated for user {username}")
             return jsonify(report), 200
 
@@ -827,8 +2632,6 @@ Keep the tone professional yet friendly, and limit the response to 300 words.
         finally:
             if cursor:
                 cursor.close()
-            if conn:
-                conn.close()
 
     except ValueError as ve:
         logger.warning(f"Transaction report failed: Invalid date format - {str(ve)}")
@@ -837,116 +2640,388 @@ Keep the tone professional yet friendly, and limit the response to 300 words.
         logger.error(f"Transaction report unexpected error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-def award_achievement(user_id, name, description, icon='StarIcon'):
+ANALYTICS_DEFAULT_DAYS = int(os.getenv('ANALYTICS_DEFAULT_DAYS', 365))
+ANALYTICS_MAX_DAYS = int(os.getenv('ANALYTICS_MAX_DAYS', 3660))
+ANALYTICS_DEFAULT_POINTS = 120
+ANALYTICS_MAX_POINTS = 1000
+ANALYTICS_MAX_WINDOW = 52
+# Days of goal contributions the savings rate behind a goal's ETA is taken from
+ANALYTICS_GOAL_RATE_DAYS = int(os.getenv('ANALYTICS_GOAL_RATE_DAYS', 90))
+
+def analytics_params(args):
+    """Parse /analytics query parameters into (start_date, end_date, granularity, max_points, window).
+
+    Raises ValueError with a message for the client.
+    """
+    try:
+        start_date, end_date = report_date_range(args, ANALYTICS_DEFAULT_DAYS)
+    except ValueError:
+        raise ValueError('Invalid date format (use YYYY-MM-DD)')
+    if start_date > end_date:
+        raise ValueError('Start date cannot be after end date')
+    if (end_date - start_date).days > ANALYTICS_MAX_DAYS:
+        raise ValueError(f'Date range cannot exceed {ANALYTICS_MAX_DAYS} days')
+    granularity = args.get('granularity', 'auto')
+    if granularity != 'auto' and granularity not in GRANULARITIES:
+        raise ValueError('Invalid granularity (use auto, day, week or month)')
+    try:
+        max_points = int(args.get('max_points', ANALYTICS_DEFAULT_POINTS))
+        window = int(args.get('window', 3))
+    except ValueError:
+        raise ValueError('max_points and window must be integers')
+    if not 2 <= max_points <= ANALYTICS_MAX_POINTS:
+        raise ValueError(f'max_points must be between 2 and {ANALYTICS_MAX_POINTS}')
+    if not 1 <= window <= ANALYTICS_MAX_WINDOW:
+        raise ValueError(f'window must be between 1 and {ANALYTICS_MAX_WINDOW}')
+    return start_date, end_date, granularity, max_points, window
+
+def analytics_rollups(cursor, user_id, start_date, end_date):
+    """The user's daily_rollups rows for a date range, as NumPy arrays."""
+    cursor.execute('''
+        SELECT day, category, budget_id, goal_id, income, expense
+        FROM daily_rollups
+        WHERE user_id = %s AND day BETWEEN %s AND %s
+    ''', (user_id, start_date, end_date))
+    return RollupArrays(cursor.fetchall())
+
+@app.route('/analytics', methods=['GET'])
+@require_user
+def analytics():
+    """Chart series for a date range: income/expense/net and per-category spending
+    per period, month-over-month changes, budget burn rates and goal ETAs.
+
+    The series use the finest granularity that fits max_points (or the one
+    asked for), and consecutive periods are summed together past that.
+    """
+    username = g.username
+    user_id = g.user_id
+
+    try:
+        start_date, end_date, granularity, max_points, window = analytics_params(request.args)
+    except ValueError as ve:
+        logger.warning(f"Analytics failed: {str(ve)}")
+        return jsonify({'error': str(ve)}), 400
+    if granularity == 'auto':
+        granularity = choose_granularity(start_date, end_date, max_points)
+
+    today = datetime.now().date()
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            'SELECT COUNT(*) FROM achievements WHERE user_id = %s AND name = %s',
-            (user_id, name)
+        # One read covers the requested range and the recent days goal rates need
+        frame = analytics_rollups(
+            cursor, user_id,
+            min(start_date, today - timedelta(days=ANALYTICS_GOAL_RATE_DAYS - 1)), max(end_date, today)
         )
-        if cursor.fetchone()[0] > 0:
+        cursor.execute(*budgets_query(user_id))
+        # spent_amount is negative, as /budgets returns it; burn rates take spend as a positive amount
+        budget_rows = [(*row[:4], 0 - row[4]) for row in cursor.fetchall()]
+        cursor.execute(*goals_query(user_id))
+        goal_rows = cursor.fetchall()
+        commit_request(conn)
+
+        payload = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'series': trend_series(frame, start_date, end_date, granularity, max_points, window),
+            'monthly': monthly_changes(frame, start_date, end_date, max_points),
+            'budgets': budget_burn_rates(budget_rows, today),
+            'goals': goal_etas(frame, goal_rows, today, ANALYTICS_GOAL_RATE_DAYS)
+        }
+        logger.info(f"Analytics generated for user {username} ({len(frame)} rollup rows)")
+        return json_response(payload)
+
+    except mysql.connector.Error as err:
+        logger.error(f"Analytics database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    except Exception as e:
+        logger.error(f"Analytics unexpected error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if cursor:
             cursor.close()
-            conn.close()
-            return  # Already awarded
-        cursor.execute(
-            'INSERT INTO achievements (user_id, name, description, icon) VALUES (%s, %s, %s, %s)',
-            (user_id, name, description, icon)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
-        logger.info(f"Awarded achievement {name} to user_id {user_id}")
+
+# Per-user sets of earned achievement names, so rules already held are skipped without a query
+ACHIEVEMENT_CACHE_SIZE = int(os.getenv('ACHIEVEMENT_CACHE_SIZE', 10000))
+achievement_engine = AchievementEngine(ACHIEVEMENT_RULES, LRUCache(ACHIEVEMENT_CACHE_SIZE))
+
+def check_achievements(conn, user_id, event, **facts):
+    """Award the achievements an event earns on the caller's connection; the caller commits."""
+    try:
+        awarded = achievement_engine.evaluate(conn, user_id, event, facts)
     except mysql.connector.Error as err:
         logger.error(f"Achievement award error: {str(err)}")
+        return
+    record_awarded_achievements(user_id, awarded)
+
+def record_awarded_achievements(user_id, awarded):
+    """Cache the awarded rules once the transaction commits and tell the user's streams."""
+    if awarded:
+        names = [rule.name for rule in awarded]
+        after_commit(lambda: achievement_engine.mark_earned(user_id, names))
+        queue_change(user_id, 'achievements')
+        logger.info(f"Awarded achievements {', '.join(names)} to user_id {user_id}")
+
+def achievements_query(user_id):
+    return 'SELECT name, description, icon, earned_at FROM achievements WHERE user_id = %s', (user_id,)
 
 @app.route('/achievements', methods=['GET'])
+@require_user
 def get_achievements():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Achievements fetch failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+    username = g.username
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Achievements fetch failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        cursor.execute(
-            'SELECT name, description, icon, earned_at FROM achievements WHERE user_id = %s',
-            (user['id'],)
-        )
+        cursor.execute(*achievements_query(g.user_id))
         achievements = cursor.fetchall()
         cursor.close()
-        conn.close()
         logger.info(f"Fetched achievements for user {username}")
         return jsonify({'achievements': achievements}), 200
     except mysql.connector.Error as err:
         logger.error(f"Achievements fetch database error: {str(err)}")
         return jsonify({'error': str(err)}), 500
 
+NOTIFICATIONS_PAGE_SIZE = 50
+NOTIFICATIONS_MAX_PAGE_SIZE = 200
+
+def positive_int_arg(args, name, default=None, maximum=None):
+    """Read an optional positive integer query parameter. Raises ValueError if malformed."""
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    if not value.isdigit() or int(value) <= 0:
+        raise ValueError(f"Invalid {name}")
+    return min(int(value), maximum) if maximum else int(value)
+
 @app.route('/notifications', methods=['GET'])
+@require_user
 def get_notifications():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Notifications fetch failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
+    """Notification history, newest first, or only the rows newer than a known id.
+
+    since_id=N returns every notification with id > N, oldest first, for
+    incremental polling. Otherwise the history is paged with before_id and
+    limit, and next_cursor is the before_id of the next page. unread=true
+    restricts either mode to unread notifications.
+    """
+    username = g.username
+    user_id = g.user_id
+    try:
+        since_id = positive_int_arg(request.args, 'since_id')
+        before_id = positive_int_arg(request.args, 'before_id')
+        limit = positive_int_arg(request.args, 'limit', NOTIFICATIONS_PAGE_SIZE, NOTIFICATIONS_MAX_PAGE_SIZE)
+        layout = json_layout(request.args)
+    except ValueError as e:
+        logger.warning(f"Notifications fetch failed: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    unread_only = request.args.get('unread', '').lower() in ('1', 'true', 'yes')
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Notifications fetch failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        cursor.execute('''
+        cursor = conn.cursor()
+
+        filters = []
+        params = [user_id]
+        if unread_only:
+            filters.append('is_read = FALSE')
+        if since_id is not None:
+            # Incremental sync: everything after the newest row the client has
+            filters.append('id > %s')
+            params.append(since_id)
+            order = 'ASC'
+        else:
+            if before_id is not None:
+                filters.append('id < %s')
+                params.append(before_id)
+            order = 'DESC'
+        # Ids are assigned in insertion order, so they order notifications like created_at
+        cursor.execute(f'''
             SELECT id, message, type, created_at, is_read
             FROM notifications
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-        ''', (user['id'],))
-        notifications = cursor.fetchall()
+            WHERE user_id = %s {''.join(' AND ' + f for f in filters)}
+            ORDER BY id {order}
+            LIMIT %s
+        ''', (*params, limit + 1))
+        rows = cursor.fetchall()
+        encoder = row_encoder(cursor.description)
         cursor.close()
-        conn.close()
-        logger.info(f"Fetched {len(notifications)} notifications for user {username}")
-        return jsonify({'notifications': notifications}), 200
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        last_id = rows[-1][0] if rows else None
+        if since_id is not None:
+            # With has_more set, the client fetches again from latest_id
+            response = {
+                'notifications': encoder.encode(rows, layout),
+                'latest_id': last_id if rows else since_id,
+                'has_more': has_more
+            }
+        else:
+            response = {
+                'notifications': encoder.encode(rows, layout),
+                'next_cursor': last_id if has_more else None
+            }
+        logger.info(f"Fetched {len(rows)} notifications for user {username}")
+        return json_response(response)
     except mysql.connector.Error as err:
         logger.error(f"Notifications fetch database error: {str(err)}")
         return jsonify({'error': str(err)}), 500
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    username = request.headers.get('X-Username')
-    if not username:
-        logger.warning("Chat request failed: Username required")
-        return jsonify({'error': 'Username required'}), 400
-
-    data = request.get_json()
-    query = data.get('query')
-    financial_data = data.get('financialData')
+def unread_count_query(user_id):
+    return ('''
+        SELECT COALESCE(SUM(is_read = FALSE), 0) AS unread_count, COALESCE(MAX(id), 0) AS latest_id
+        FROM notifications
+        WHERE user_id = %s
+    ''', (user_id,))
+
+@app.route('/notifications/unread-count', methods=['GET'])
+@require_user
+def notifications_unread_count():
+    """Unread count and newest notification id, for cheap polling."""
+    user_id = g.user_id
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(*unread_count_query(user_id))
+        counts = cursor.fetchone()
+        cursor.close()
+        return jsonify({'unread_count': int(counts['unread_count']), 'latest_id': counts['latest_id']}), 200
+    except mysql.connector.Error as err:
+        logger.error(f"Unread count database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
 
-    if not query or not financial_data:
-        logger.warning("Chat request failed: Missing query or financial data")
-        return jsonify({'error': 'Missing query or financial data'}), 400
+@app.route('/notifications/mark-read', methods=['POST'])
+@require_user
+def mark_notifications_read():
+    """Mark notifications read in one statement.
+
+    Body: {"ids": [..]} for specific notifications, or {"up_to_id": N} for
+    everything up to and including N (the id the client last saw).
+    """
+    username = g.username
+    user_id = g.user_id
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    up_to_id = data.get('up_to_id')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            logger.warning("Mark read failed: Invalid ids")
+            return jsonify({'error': 'ids must be a non-empty list of notification IDs'}), 400
+        if len(ids) > NOTIFICATIONS_MAX_PAGE_SIZE:
+            logger.warning("Mark read failed: Too many ids")
+            return jsonify({'error': f'At most {NOTIFICATIONS_MAX_PAGE_SIZE} ids per request'}), 400
+    elif not isinstance(up_to_id, int) or isinstance(up_to_id, bool):
+        logger.warning("Mark read failed: ids or up_to_id required")
+        return jsonify({'error': 'ids or up_to_id required'}), 400
 
-    conn = None
     cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
+        if ids is not None:
+            cursor.execute(f'''
+                UPDATE notifications SET is_read = TRUE
+                WHERE user_id = %s AND is_read = FALSE AND id IN ({', '.join(['%s'] * len(ids))})
+            ''', (user_id, *ids))
+        else:
+            cursor.execute('''
+                UPDATE notifications SET is_read = TRUE
+                WHERE user_id = %s AND is_read = FALSE AND id <= %s
+            ''', (user_id, up_to_id))
+        updated = cursor.rowcount
+        if updated:
+            queue_change(user_id, 'notifications')
+        commit_request(conn)
+        logger.info(f"Marked {updated} notifications read for user {username}")
+        return jsonify({'updated': updated}), 200
+    except mysql.connector.Error as err:
+        logger.error(f"Mark read database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    finally:
+        if cursor:
+            cursor.close()
 
-        # Verify user
-        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Chat failed: User {username} not found")
-            return jsonify({'error': 'User not found'}), 404
-        user_id = user['id']
+DASHBOARD_FIELDS = ['goals', 'budgets', 'achievements', 'notifications']
 
-        # Construct AI prompt
-        ai_prompt = f"""
+def fetch_result_sets(conn, statements):
+    """Run several SELECTs in one read-only transaction, so they all see the same
+    snapshot, and return each one's rows as JSON-ready dicts.
+
+    One statement at a time: a multi-statement execute() needs the C extension,
+    which not every install of mysql-connector has.
+    """
+    if not conn.in_transaction:
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+    cursor = conn.cursor()
+    try:
+        results = []
+        for sql, params in statements:
+            cursor.execute(sql, params)
+            results.append(row_encoder(cursor.description).records(cursor.fetchall()))
+        return results
+    finally:
+        cursor.close()
+
+@app.route('/dashboard', methods=['GET'])
+@require_user
+def dashboard():
+    """Goals, budgets, achievements and the latest notifications in one response.
+
+    fields=goals,budgets,... picks sections (default: all). All sections are
+    read in one transaction on one connection, so they come from the same
+    snapshot. Notifications are the latest page, read or not, each with
+    is_read; unread_count says how many are unread. The ETag covers the whole
+    body and an unchanged refresh is a 304.
+    """
+    username = g.username
+    user_id = g.user_id
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or DASHBOARD_FIELDS
+    unknown = [f for f in fields if f not in DASHBOARD_FIELDS]
+    if unknown:
+        logger.warning(f"Dashboard fetch failed: Unknown fields {unknown}")
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)} (use {', '.join(DASHBOARD_FIELDS)})"}), 400
+
+    try:
+        conn = get_db_connection()
+
+        statements = {}
+        if 'goals' in fields:
+            statements['goals'] = goals_query(user_id)
+        if 'budgets' in fields:
+            statements['budgets'] = budgets_query(user_id)
+        if 'achievements' in fields:
+            statements['achievements'] = achievements_query(user_id)
+        if 'notifications' in fields:
+            statements['notifications'] = ('''
+                SELECT id, message, type, created_at, is_read
+                FROM notifications
+                WHERE user_id = %s
+                ORDER BY id DESC
+                LIMIT %s
+            ''', (user_id, NOTIFICATIONS_PAGE_SIZE))
+            statements['notification_counts'] = unread_count_query(user_id)
+        data = dict(zip(statements, fetch_result_sets(conn, list(statements.values()))))
+
+        counts = data.pop('notification_counts', None)
+        if counts:
+            data['unread_count'] = int(counts[0]['unread_count'])
+            data['latest_id'] = counts[0]['latest_id']
+        logger.debug(f"Fetched dashboard {fields} for user {username}")
+
+        response = json_response(data)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
+    except mysql.connector.Error as err:
+        logger.error(f"Dashboard fetch database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+CHAT_SYSTEM_PROMPT = "You are a financial advisor chatbot providing concise, data-driven answers."
+REPORT_SYSTEM_PROMPT = "You are a financial advisor providing clear, concise, and actionable insights."
+
+def build_chat_prompt(query, financial_data):
+    """Chatbot prompt built from the question and the report data the client sent."""
+    ai_prompt = f"""
 You are a financial advisor chatbot for a budget app. Answer the user's question based on their financial data and insights. Be concise, friendly, and actionable. Limit responses to 100 words.
 
 **Financial Data**:
@@ -967,37 +3042,239 @@ You are a financial advisor chatbot for a budget app. Answer the user's question
 
 Provide a direct answer with relevant details from the data.
 """
+    return ai_prompt
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/chat', methods=['POST'])
+@require_user
+def chat():
+    data = request.get_json()
+    query = data.get('query')
+    financial_data = data.get('financialData')
+
+    if not query or not financial_data:
+        logger.warning("Chat request failed: Missing query or financial data")
+        return jsonify({'error': 'Missing query or financial data'}), 400
+
+    try:
+        # Construct AI prompt
+        ai_prompt = build_chat_prompt(query, financial_data)
 
         # Query Groq
         try:
-            response = groq_client.chat.completions.create(
-                model="llama3-70b-8192",
+            ai_response = llm.complete(
+                'chat',
                 messages=[
-                    {"role": "system", "content": "You are a financial advisor chatbot providing concise, data-driven answers."},
+                    {"role": "system", "content": CHAT_SYSTEM_PROMPT},
                     {"role": "user", "content": ai_prompt}
                 ],
                 max_tokens=150,
-                temperature=0.5
-            )
-            ai_response = response.choices[0].message.content.strip()
+                temperature=0.5,
+                user_id=g.user_id
+            ).strip()
             logger.debug(f"Groq chat response: {ai_response}")
         except Exception as e:
             logger.error(f"Groq chat error: {str(e)}")
-            ai_response = "Sorry, I couldn't process your request. Try again later."
+            ai_response = CHAT_UNAVAILABLE
 
         return jsonify({'response': ai_response}), 200
 
-    except mysql.connector.Error as err:
-        logger.error(f"Chat database error: {str(err)}")
-        return jsonify({'error': str(err)}), 500
     except Exception as e:
         logger.error(f"Chat unexpected error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+@app.route('/chat/stream', methods=['POST'])
+@require_user
+def chat_stream():
+    """Stream the chatbot answer as Server-Sent Events: token events, then done."""
+    user_id = g.user_id
+    username = g.username
+
+    data = request.get_json()
+    query = data.get('query')
+    financial_data = data.get('financialData')
+
+    if not query or not financial_data:
+        logger.warning("Chat stream failed: Missing query or financial data")
+        return jsonify({'error': 'Missing query or financial data'}), 400
+
+    # Don't hold a pooled connection (from a username lookup) for the length of the completion
+    release_request_connection()
+    logger.info(f"Chat stream started for user {username}")
+    ai_prompt = build_chat_prompt(query, financial_data)
+
+    def events():
+        try:
+            for delta in llm.stream(
+                'chat_stream',
+                [{"role": "system", "content": CHAT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+                max_tokens=150,
+                temperature=0.5,
+                user_id=user_id
+            ):
+                yield sse_event('token', {'text': delta})
+        except Exception as e:
+            logger.error(f"Groq chat stream error: {str(e)}")
+            yield sse_event('error', {'error': CHAT_UNAVAILABLE})
+            return
+        yield sse_event('done', {})
+
+    return sse_response(events())
+
+@app.route('/transaction-report/insights/stream', methods=['GET'])
+@require_user
+def stream_report_insights():
+    """Stream a report as Server-Sent Events.
+
+    Sends the structured report first, then either cached insights or the
+    insight text token by token; generated text is written to the insight cache.
+    """
+    user_id = g.user_id
+
+    try:
+        start_date, end_date = report_date_range(request.args)
+    except ValueError:
+        logger.warning("Report stream failed: Invalid date format")
+        return jsonify({'error': 'Invalid date format (use YYYY-MM-DD)'}), 400
+    if start_date > end_date:
+        logger.warning("Report stream failed: Invalid date range")
+        return jsonify({'error': 'Start date cannot be after end date'}), 400
+
+    try:
+        conn = get_db_connection()
+        report, ai_prompt, key, report_hash, generation, cached_text, fresh = \
+            load_report(conn, user_id, start_date, end_date)
+        commit_request(conn)
+    except mysql.connector.Error as err:
+        logger.error(f"Report stream database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    release_request_connection()
+
+    def events():
+        yield sse_event('report', report)
+        if cached_text is not None:
+            yield sse_event('insights', {'text': cached_text, 'status': 'cached' if fresh else 'stale'})
+            if fresh:
+                yield sse_event('done', {'status': 'cached'})
+                return
+
+        parts = []
+        try:
+            for delta in llm.stream(
+                'report_stream',
+                [{"role": "system", "content": REPORT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+                max_tokens=350,
+                temperature=0.5,
+                user_id=user_id
+            ):
+                parts.append(delta)
+                yield sse_event('token', {'text': delta})
+        except Exception as e:
+            logger.error(f"Groq report stream error: {str(e)}")
+            yield sse_event('error', {'error': INSIGHTS_UNAVAILABLE})
+            return
+
+        text = ''.join(parts).strip()
+        conn = acquire_db_connection() if INSIGHT_CACHE_DB else None
+        try:
+            store_ai_insights(conn, key, report_hash, generation, text)
+            if conn is not None:
+                conn.commit()
+        except mysql.connector.Error as err:
+            logger.error(f"Report stream cache store error: {str(err)}")
+        finally:
+            if conn is not None:
+                release_db_connection(conn)
+        yield sse_event('done', {'status': 'generated'})
+
+    return sse_response(events())
+
+@app.route('/events', methods=['GET'])
+@require_user
+def event_stream():
+    """Per-user push stream, replacing client polling.
+
+    Sends 'ready' on connect, 'notification' with each new notification,
+    'changed' with the resources to refetch after a write, and 'resync' if
+    the client fell too far behind. Comment lines serve as heartbeats.
+    """
+    username = g.username
+    release_request_connection()
+
+    try:
+        subscription = event_hub.subscribe(g.user_id)
+    except SubscriberLimitError as e:
+        logger.warning(f"Event stream refused for user {username}: {str(e)}")
+        return jsonify({'error': str(e)}), 429
+    logger.info(f"Event stream opened for user {username}")
+
+    def events():
+        yield sse_event('ready', {'heartbeat': EVENT_STREAM_HEARTBEAT})
+        while True:
+            item = subscription.get(EVENT_STREAM_HEARTBEAT)
+            # A write to a closed connection fails here, which ends the stream
+            yield ': heartbeat\n\n' if item is None else sse_event(*item)
+
+    response = sse_response(events())
+    # Runs however the stream ends, including before the first event is sent
+    response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+    return response
+
+@app.route('/event-stats', methods=['GET'])
+@require_admin
+def get_event_stats():
+    return jsonify(event_hub.stats()), 200
+
+@app.route('/pool-stats', methods=['GET'])
+@require_admin
+def get_pool_stats():
+    with pool_stats_lock:
+        stats = dict(pool_stats)
+    stats['pool_size'] = DB_POOL_SIZE
+    stats['avg_wait_time'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+    return jsonify(stats), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/llm-stats', methods=['GET'])
+@require_admin
+def get_llm_stats():
+    return jsonify(llm.stats()), 200
+
+@app.route('/categorization-stats', methods=['GET'])
+@require_admin
+def get_categorization_stats():
+    stats = dict(categorization_stats)
+    stats['lru_size'] = len(category_cache)
+    stats['prompt_version'] = CATEGORIZATION_PROMPT_VERSION
+    return jsonify(stats), 200
+
+@app.route('/category-cache/invalidate', methods=['POST'])
+@require_admin
+def invalidate_category_cache_route():
+    try:
+        removed = invalidate_category_cache(get_db_connection())
+        logger.info(f"Category cache invalidated by {g.username}")
+        return jsonify({'message': 'Category cache invalidated', 'removed': removed,
+                        'prompt_version': CATEGORIZATION_PROMPT_VERSION}), 200
+    except mysql.connector.Error as err:
+        logger.error(f"Category cache invalidation error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    except OSError as e:
+        logger.error(f"Category cache invalidation error: {str(e)}")
+        return jsonify({'error': 'Could not reload categorization prompt'}), 500
 
 
 if __name__ == '__main__':
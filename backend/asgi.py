@@ -0,0 +1,796 @@
+# Async serving mode: uvicorn asgi:application --port 5001
+#
+# The routes that wait on Groq or hold a stream open are served here on one
+# event loop, with AsyncGroq and the mysql.connector.aio pool, so a process can
+# hold thousands of in-flight completions without a thread each. Every other
+# path is handed to the Flask app, which keeps running its routes in threads.
+from quart import Quart, request, jsonify, g, Response
+from quart_cors import cors
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from flask import g as flask_g
+import mysql.connector
+from mysql.connector.aio.pooling import MySQLConnectionPool
+from itsdangerous import BadSignature, SignatureExpired
+from groq import AsyncGroq
+from llm_gateway import AsyncLLMGateway
+from datetime import datetime
+import asyncio
+import functools
+import os
+import time
+import app as sync_app
+from app import (
+    app as flask_app, logger, llm as sync_llm, CHAT_UNAVAILABLE, db_config, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+    session_serializer, SESSION_TOKEN_MAX_AGE, ALLOW_USERNAME_HEADER, user_id_cache, report_date_range,
+    insight_cache, insight_refreshing, insight_refresh_lock, INSIGHT_CACHE_DB, INSIGHT_CACHE_SWR,
+    INSIGHT_CACHE_UPSERT, INSIGHT_CACHE_SELECT, INSIGHT_GENERATION_SELECT, INSIGHT_GENERATION_BUMP,
+    INSIGHTS_UNAVAILABLE, CHAT_SYSTEM_PROMPT, REPORT_SYSTEM_PROMPT, build_chat_prompt, cached_insight,
+    report_content_hash, REPORT_AGGREGATES_QUERY, REPORT_GOALS_QUERY, REPORT_BUDGETS_QUERY, STREAK_QUERY,
+    fold_report_aggregates, assemble_report, budget_streak_write, check_spending_insight,
+    sse_event, event_hub, EVENT_STREAM_HEARTBEAT, SubscriberLimitError, queue_event, queue_change,
+    NOTIFICATION_INSERT, NOTIFICATION_FLUSH_INTERVAL, notification_event, publish_committed,
+    achievement_engine, record_awarded_achievements, notify_budget_status, notify_goal_milestones,
+    parse_new_transaction, TRANSACTION_BUDGET_QUERY, TRANSACTION_INSERT, new_rollup_deltas, add_rollup,
+    DAILY_ROLLUPS_UPSERT, daily_rollup_rows, BUDGET_SPEND_UPSERT, budget_period_start,
+    local_category, normalize_description, keyword_categorize, categorization_messages, category_cache,
+    categorization_stats, CATEGORY_CACHE_SELECT, CATEGORY_CACHE_UPSERT, CATEGORY_INFLIGHT_TIMEOUT,
+    VALID_CATEGORIES, DEFERRED_CATEGORIZATION, start_categorization_workers, categorization_wakeup,
+    start_request_stats, finish_request_stats, record_db_connection, current_request
+)
+
+api = cors(Quart(__name__), allow_origin='*')
+
+groq_client = AsyncGroq(api_key=os.getenv('GROQ_API_KEY'))
+# Shares the breaker, quotas and metrics with the Flask app's gateway
+llm = AsyncLLMGateway(groq_client, sync_llm)
+
+# Paths served by the async app; anything else goes to the Flask app
+ASYNC_PATHS = {'/chat', '/chat/stream', '/transaction-report', '/transaction-report/insights/stream', '/events'}
+# Paths served here for some methods only; the others stay with the Flask app
+ASYNC_METHODS = {'/transactions': {'POST'}}
+
+db_pool = None
+db_pool_lock = None
+background_tasks = set()  # Strong references, so running refreshes aren't garbage collected
+
+@api.before_serving
+async def startup():
+    global db_pool_lock
+    db_pool_lock = asyncio.Lock()
+    if DEFERRED_CATEGORIZATION:
+        start_categorization_workers()
+
+@api.after_serving
+async def shutdown():
+    await groq_client.close()
+    if db_pool is not None:
+        await db_pool.close_pool()
+
+# Same request metrics as the Flask app. Queries on the async pool count as
+# connections only.
+@api.before_request
+async def before_request_stats():
+    start_request_stats()
+
+@api.after_request
+async def after_request_stats(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    server_timing = finish_request_stats(route, request.method, response.status_code)
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+async def get_db_pool():
+    """Open the async pool on first use so the app can start without MySQL."""
+    global db_pool
+    async with db_pool_lock:
+        if db_pool is None:
+            pool = MySQLConnectionPool(
+                pool_name='budget_app_async_pool',
+                pool_size=DB_POOL_SIZE,
+                pool_reset_session=True,
+                **db_config
+            )
+            await pool.initialize_pool()
+            db_pool = pool
+            logger.info(f"Async database pool created with {DB_POOL_SIZE} connections")
+    return db_pool
+
+async def acquire_db_connection():
+    """Check a connection out of the async pool, waiting up to DB_POOL_TIMEOUT seconds."""
+    pool = await get_db_pool()
+    started = time.monotonic()
+    while True:
+        try:
+            conn = await pool.get_connection()
+            record_db_connection()
+            return conn
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() - started >= DB_POOL_TIMEOUT:
+                logger.error(f"Async database pool exhausted after waiting {DB_POOL_TIMEOUT}s")
+                raise
+            await asyncio.sleep(0.01)
+
+async def release_db_connection(conn):
+    try:
+        await conn.rollback()
+    except mysql.connector.Error as err:
+        logger.warning(f"Rollback before pool return failed: {str(err)}")
+    finally:
+        await conn.close()
+
+async def resolve_user_id(username):
+    user_id = user_id_cache.get(username)
+    if user_id is None:
+        conn = await acquire_db_connection()
+        try:
+            cursor = await conn.cursor()
+            try:
+                await cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
+                row = await cursor.fetchone()
+            finally:
+                await cursor.close()
+        finally:
+            await release_db_connection(conn)
+        if not row:
+            return None
+        user_id = row[0]
+        user_id_cache.set(username, user_id)
+    return user_id
+
+def require_user(view):
+    """The async twin of app.require_user."""
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        auth = request.headers.get('Authorization', '')
+        username = request.headers.get('X-Username')
+        if auth.startswith('Bearer '):
+            try:
+                claims = session_serializer.loads(auth[len('Bearer '):], max_age=SESSION_TOKEN_MAX_AGE)
+            except SignatureExpired:
+                logger.warning(f"{request.path} rejected: Session expired")
+                return jsonify({'error': 'Session expired'}), 401
+            except BadSignature:
+                logger.warning(f"{request.path} rejected: Invalid session token")
+                return jsonify({'error': 'Invalid session token'}), 401
+            g.user_id = claims['user_id']
+            g.username = claims['username']
+        elif username and ALLOW_USERNAME_HEADER:
+            try:
+                user_id = await resolve_user_id(username)
+            except mysql.connector.Error as err:
+                logger.error(f"User lookup database error: {str(err)}")
+                return jsonify({'error': str(err)}), 500
+            if user_id is None:
+                logger.warning(f"{request.path} rejected: User {username} not found")
+                return jsonify({'error': 'User not found'}), 404
+            g.user_id = user_id
+            g.username = username
+        else:
+            logger.warning(f"{request.path} rejected: Authentication required")
+            return jsonify({'error': 'Authentication required'}), 401
+        return await view(*args, **kwargs)
+    return wrapper
+
+def sse_response(events):
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def in_flask_context(view):
+    """Run a coroutine in a Flask app context, for the app.py helpers that stage
+    notifications, events and after-commit callbacks in flask.g."""
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        stats = current_request.get()
+        try:
+            with flask_app.app_context():
+                return await view(*args, **kwargs)
+        finally:
+            # The app context's teardown clears the stats after_request_stats records
+            current_request.set(stats)
+    return wrapper
+
+# Async twins of the app.py write helpers, on mysql.connector.aio connections.
+# They share app.py's statements and the plain-Python steps around them, and
+# run in a Flask app context (see in_flask_context).
+async def write_notifications(conn, rows):
+    """The async twin of app.write_notifications."""
+    written = []
+    cursor = await conn.cursor()
+    try:
+        for row in rows:
+            await cursor.execute(NOTIFICATION_INSERT, row)
+            written.append((cursor.lastrowid, row))
+    finally:
+        await cursor.close()
+    return written
+
+async def commit_request(conn):
+    """The async twin of app.commit_request."""
+    outbox = flask_g.pop('notification_outbox', [])
+    if outbox and not NOTIFICATION_FLUSH_INTERVAL:
+        for notification_id, row in await write_notifications(conn, outbox):
+            queue_event(row[0], 'notification', notification_event(notification_id, row))
+    await conn.commit()
+    publish_committed(outbox)
+
+async def record_daily_rollups(conn, deltas):
+    if not deltas:
+        return
+    cursor = await conn.cursor()
+    try:
+        await cursor.executemany(DAILY_ROLLUPS_UPSERT, daily_rollup_rows(deltas))
+    finally:
+        await cursor.close()
+
+async def record_budget_spend(conn, spends):
+    cursor = await conn.cursor()
+    try:
+        await cursor.executemany(BUDGET_SPEND_UPSERT, spends)
+    finally:
+        await cursor.close()
+
+async def check_achievements(conn, user_id, event, **facts):
+    """The async twin of app.check_achievements."""
+    try:
+        awarded = await achievement_engine.evaluate_async(conn, user_id, event, facts)
+    except mysql.connector.Error as err:
+        logger.error(f"Achievement award error: {str(err)}")
+        return
+    record_awarded_achievements(user_id, awarded)
+
+async def add_goal_contribution(conn, user_id, goal_id, amount):
+    """The async twin of app.add_goal_contribution."""
+    cursor = await conn.cursor(dictionary=True)
+    try:
+        await cursor.execute('''
+            SELECT name, current_amount, target_amount
+            FROM savings_goals
+            WHERE id = %s AND user_id = %s
+        ''', (goal_id, user_id))
+        goal = await cursor.fetchone()
+        if not goal:
+            return
+        await cursor.execute('''
+            UPDATE savings_goals
+            SET current_amount = current_amount + %s
+            WHERE id = %s AND user_id = %s
+        ''', (amount, goal_id, user_id))
+    finally:
+        await cursor.close()
+    new_current, target = notify_goal_milestones(conn, user_id, goal, amount)
+    await check_achievements(conn, user_id, 'goal_contribution', goal_current=new_current, goal_target=target)
+
+async def invalidate_insights(conn, user_id):
+    """The async twin of app.invalidate_insights."""
+    cursor = await conn.cursor()
+    try:
+        await cursor.execute(INSIGHT_GENERATION_BUMP, (user_id,))
+        if INSIGHT_CACHE_DB and not INSIGHT_CACHE_SWR:
+            await cursor.execute('DELETE FROM insight_cache WHERE user_id = %s', (user_id,))
+    finally:
+        await cursor.close()
+
+async def insight_generation(conn, user_id):
+    cursor = await conn.cursor()
+    try:
+        await cursor.execute(INSIGHT_GENERATION_SELECT, (user_id,))
+        row = await cursor.fetchone()
+    finally:
+        await cursor.close()
+    return row[0] if row else 0
+
+async def lookup_ai_insights(conn, key, report_hash, generation):
+    """The async twin of app.lookup_ai_insights."""
+    entry = insight_cache.get(key)
+
+    if entry is None and INSIGHT_CACHE_DB:
+        cursor = await conn.cursor()
+        try:
+            await cursor.execute(INSIGHT_CACHE_SELECT, key)
+            row = await cursor.fetchone()
+            if row:
+                entry = (row[0], generation, float(row[2]), row[1])
+                insight_cache.set(key, entry)
+        except mysql.connector.Error as err:
+            logger.error(f"Insight cache lookup error: {str(err)}")
+        finally:
+            await cursor.close()
+
+    return cached_insight(entry, report_hash, generation)
+
+async def build_transaction_report(conn, cursor, user_id, start_date, end_date):
+    """The async twin of app.build_transaction_report."""
+    await cursor.execute(REPORT_AGGREGATES_QUERY, (user_id, start_date, end_date))
+    aggregates = fold_report_aggregates(await cursor.fetchall())
+    await cursor.execute(REPORT_GOALS_QUERY, (user_id,))
+    goals = await cursor.fetchall()
+    await cursor.execute(REPORT_BUDGETS_QUERY, (user_id,))
+    budgets = await cursor.fetchall()
+    report, report_data, ai_prompt = assemble_report(start_date, end_date, aggregates, goals, budgets)
+
+    await cursor.execute(STREAK_QUERY, (user_id,))
+    streak_write = budget_streak_write(user_id, await cursor.fetchone(), report_data['budgets'], datetime.now().date())
+    if streak_write:
+        statement, params, streak = streak_write
+        await cursor.execute(statement, params)
+        if streak:
+            await check_achievements(conn, user_id, 'budget_check', budget_streak=streak)
+
+    _, total_expenses, category_sums, _, _ = aggregates
+    check_spending_insight(conn, user_id, category_sums, total_expenses)
+    return report, report_data, ai_prompt
+
+@in_flask_context
+async def load_report(user_id, start_date, end_date):
+    """The async twin of app.load_report, on a connection of its own that it commits.
+
+    Returns (report, ai_prompt, key, report_hash, generation, cached_text, fresh).
+    """
+    conn = await acquire_db_connection()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        try:
+            report, report_data, ai_prompt = await build_transaction_report(conn, cursor, user_id, start_date, end_date)
+        finally:
+            await cursor.close()
+        key = (user_id, start_date, end_date)
+        report_hash = report_content_hash(start_date, end_date, report_data)
+        generation = await insight_generation(conn, user_id)
+        cached_text, fresh = await lookup_ai_insights(conn, key, report_hash, generation)
+        await commit_request(conn)
+    finally:
+        await release_db_connection(conn)
+    return report, ai_prompt, key, report_hash, generation, cached_text, fresh
+
+async def load_cached_category(conn, key):
+    cursor = None
+    try:
+        cursor = await conn.cursor()
+        # Read through the module: invalidate_category_cache rebinds the version
+        await cursor.execute(CATEGORY_CACHE_SELECT, (key, sync_app.CATEGORIZATION_PROMPT_VERSION))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+    except mysql.connector.Error as err:
+        logger.error(f"Category cache lookup error: {str(err)}")
+        return None
+    finally:
+        if cursor:
+            await cursor.close()
+
+async def store_cached_category(conn, key, category):
+    cursor = None
+    try:
+        cursor = await conn.cursor()
+        await cursor.execute(CATEGORY_CACHE_UPSERT, (key, sync_app.CATEGORIZATION_PROMPT_VERSION, category))
+    except mysql.connector.Error as err:
+        logger.error(f"Category cache store error: {str(err)}")
+    finally:
+        if cursor:
+            await cursor.close()
+
+async def lookup_category(description, conn):
+    """The async twin of app.lookup_category."""
+    category = local_category(description)
+    if category:
+        return category
+
+    key = normalize_description(description)
+    category = await load_cached_category(conn, key)
+    if category:
+        categorization_stats['db_hits'] += 1
+        category_cache.set(key, category)
+        logger.debug(f"Categorized '{description}' as {category} via MySQL cache")
+    return category
+
+async def groq_categorize(description, user_id=None):
+    """Ask Groq for a category. Raises if the call fails or is refused."""
+    categorization_stats['llm_calls'] += 1
+    category = (await llm.complete(
+        'categorize',
+        categorization_messages(description),
+        max_tokens=10,
+        temperature=0.3,
+        user_id=user_id
+    )).strip()
+    logger.debug(f"Groq returned category: {category}")
+    return category if category in VALID_CATEGORIES else "Other"
+
+category_inflight = {}  # Normalized description -> future of the Groq call requests on this loop share
+
+async def groq_category(description, user_id):
+    """The Groq step of app.categorize_transaction, for a description
+    lookup_category missed. Holds no database connection.
+
+    Returns (category, answered). Only a category this call got from Groq is
+    answered; the caller stores those in MySQL. Keyword fallbacks and
+    categories shared from another request's call are not.
+    """
+    key = normalize_description(description)
+    categorization_stats['misses'] += 1
+    call = category_inflight.get(key)
+    if call is not None:
+        categorization_stats['inflight_shared'] += 1
+        try:
+            category = await asyncio.wait_for(asyncio.shield(call), CATEGORY_INFLIGHT_TIMEOUT)
+        except asyncio.TimeoutError:
+            category = None
+        return category or keyword_categorize(description), False
+
+    call = category_inflight[key] = asyncio.get_running_loop().create_future()
+    category = None
+    try:
+        try:
+            category = await groq_categorize(description, user_id)
+        except Exception as e:
+            logger.error(f"Groq categorization error: {str(e)}")
+            category = keyword_categorize(description)
+            return category, False
+        category_cache.set(key, category)
+        return category, True
+    finally:
+        del category_inflight[key]
+        call.set_result(category)
+
+async def generate_ai_insights(ai_prompt, user_id=None):
+    """Ask Groq for report insights. Returns None if the call fails or is refused."""
+    try:
+        text = await llm.complete(
+            'report',
+            [{"role": "system", "content": REPORT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+            max_tokens=350,
+            temperature=0.5,
+            user_id=user_id
+        )
+        logger.debug("Groq generated transaction report successfully")
+        return text.strip()
+    except Exception as e:
+        logger.error(f"Groq report generation error: {str(e)}")
+        return None
+
+async def store_ai_insights(key, report_hash, generation, text):
+    insight_cache.set(key, (report_hash, generation, time.time(), text))
+    if not INSIGHT_CACHE_DB:
+        return
+    try:
+        conn = await acquire_db_connection()
+        try:
+            cursor = await conn.cursor()
+            try:
+                await cursor.execute(INSIGHT_CACHE_UPSERT, (*key, report_hash, text))
+            finally:
+                await cursor.close()
+            await conn.commit()
+        finally:
+            await release_db_connection(conn)
+    except mysql.connector.Error as err:
+        logger.error(f"Insight cache store error: {str(err)}")
+
+async def refresh_ai_insights(key, report_hash, generation, ai_prompt):
+    """Background regeneration for stale-while-revalidate."""
+    try:
+        text = await generate_ai_insights(ai_prompt)
+        if text is not None:
+            await store_ai_insights(key, report_hash, generation, text)
+    finally:
+        with insight_refresh_lock:
+            insight_refreshing.discard(key)
+
+async def cached_ai_insights(ai_prompt, key, report_hash, generation, cached_text, fresh):
+    """Return (insights, status) like app.cached_ai_insights, from a lookup load_report already made."""
+    if cached_text is not None:
+        if fresh:
+            return cached_text, 'cached'
+        if INSIGHT_CACHE_SWR:
+            with insight_refresh_lock:
+                start_refresh = key not in insight_refreshing
+                insight_refreshing.add(key)
+            if start_refresh:
+                task = asyncio.create_task(refresh_ai_insights(key, report_hash, generation, ai_prompt))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
+            return cached_text, 'stale'
+
+    text = await generate_ai_insights(ai_prompt, key[0])
+    if text is None:
+        return (cached_text, 'stale') if cached_text is not None else (INSIGHTS_UNAVAILABLE, 'unavailable')
+    await store_ai_insights(key, report_hash, generation, text)
+    return text, 'generated'
+
+@api.route('/transaction-report', methods=['GET'])
+@require_user
+async def transaction_report():
+    username = g.username
+    user_id = g.user_id
+
+    try:
+        start_date, end_date = report_date_range(request.args)
+
+        if start_date > end_date:
+            logger.warning("Transaction report failed: Invalid date range")
+            return jsonify({'error': 'Start date cannot be after end date'}), 400
+
+        try:
+            report, ai_prompt, key, report_hash, generation, cached_text, fresh = \
+                await load_report(user_id, start_date, end_date)
+        except mysql.connector.Error as err:
+            logger.error(f"Transaction report database error: {str(err)}")
+            return jsonify({'error': str(err)}), 500
+
+        ai_report, insights_status = await cached_ai_insights(
+            ai_prompt, key, report_hash, generation, cached_text, fresh
+        )
+        report['ai_insights'] = ai_report
+        report['ai_insights_status'] = insights_status
+        logger.info(f"Transaction report generated for user {username}")
+        return jsonify(report), 200
+
+    except ValueError as ve:
+        logger.warning(f"Transaction report failed: Invalid date format - {str(ve)}")
+        return jsonify({'error': 'Invalid date format (use YYYY-MM-DD)'}), 400
+    except Exception as e:
+        logger.error(f"Transaction report unexpected error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api.route('/transaction-report/insights/stream', methods=['GET'])
+@require_user
+async def stream_report_insights():
+    """Stream a report as Server-Sent Events, as app.stream_report_insights does."""
+    user_id = g.user_id
+
+    try:
+        start_date, end_date = report_date_range(request.args)
+    except ValueError:
+        logger.warning("Report stream failed: Invalid date format")
+        return jsonify({'error': 'Invalid date format (use YYYY-MM-DD)'}), 400
+    if start_date > end_date:
+        logger.warning("Report stream failed: Invalid date range")
+        return jsonify({'error': 'Start date cannot be after end date'}), 400
+
+    try:
+        report, ai_prompt, key, report_hash, generation, cached_text, fresh = \
+            await load_report(user_id, start_date, end_date)
+    except mysql.connector.Error as err:
+        logger.error(f"Report stream database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+    async def events():
+        yield sse_event('report', report)
+        if cached_text is not None:
+            yield sse_event('insights', {'text': cached_text, 'status': 'cached' if fresh else 'stale'})
+            if fresh:
+                yield sse_event('done', {'status': 'cached'})
+                return
+
+        parts = []
+        try:
+            async for delta in llm.stream(
+                'report_stream',
+                [{"role": "system", "content": REPORT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+                max_tokens=350,
+                temperature=0.5,
+                user_id=user_id
+            ):
+                parts.append(delta)
+                yield sse_event('token', {'text': delta})
+        except Exception as e:
+            logger.error(f"Groq report stream error: {str(e)}")
+            yield sse_event('error', {'error': INSIGHTS_UNAVAILABLE})
+            return
+
+        await store_ai_insights(key, report_hash, generation, ''.join(parts).strip())
+        yield sse_event('done', {'status': 'generated'})
+
+    return sse_response(events())
+
+@api.route('/transactions', methods=['POST'])
+@require_user
+@in_flask_context
+async def create_transaction():
+    """Create a transaction as POST /transactions in app.transactions does. A
+    Groq categorization is awaited with no connection checked out."""
+    username = g.username
+    user_id = g.user_id
+
+    data = await request.get_json()
+    logger.debug(f"Transaction POST data: {data}")
+    try:
+        amount, description, transaction_date, goal_id, budget_id = parse_new_transaction(data)
+    except ValueError as e:
+        logger.warning(f"Transaction creation failed: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+    conn = None
+    try:
+        conn = await acquire_db_connection()
+        cursor = await conn.cursor(dictionary=True)
+        try:
+            if goal_id:
+                await cursor.execute('SELECT id FROM savings_goals WHERE id = %s AND user_id = %s', (goal_id, user_id))
+                if not await cursor.fetchone():
+                    logger.warning(f"Transaction creation failed: Invalid goal ID {goal_id}")
+                    return jsonify({'error': 'Invalid goal ID'}), 400
+
+            if budget_id:
+                await cursor.execute(TRANSACTION_BUDGET_QUERY, (budget_id, user_id))
+                budget = await cursor.fetchone()
+                if not budget:
+                    logger.warning(f"Transaction creation failed: Invalid budget ID {budget_id}")
+                    return jsonify({'error': 'Invalid budget ID'}), 400
+        finally:
+            await cursor.close()
+
+        # Categorize using Groq, or leave it to the background workers when deferred
+        ai_category = await lookup_category(description, conn)
+        if ai_category is None and not data.get('defer', DEFERRED_CATEGORIZATION):
+            # Hand the connection back while Groq answers; the writes take a fresh one
+            await release_db_connection(conn)
+            conn = None
+            ai_category, answered = await groq_category(description, user_id)
+            conn = await acquire_db_connection()
+            if answered:
+                await store_cached_category(conn, normalize_description(description), ai_category)
+
+        cursor = await conn.cursor(dictionary=True)
+        try:
+            await cursor.execute(
+                TRANSACTION_INSERT,
+                (user_id, amount, description, transaction_date, goal_id or None, budget_id or None, ai_category)
+            )
+
+            deltas = new_rollup_deltas()
+            add_rollup(deltas, user_id, transaction_date, ai_category, budget_id, goal_id, amount)
+            await record_daily_rollups(conn, deltas)
+
+            if budget_id and amount < 0:
+                period_start = budget_period_start(budget['period'], transaction_date)
+                await record_budget_spend(conn, [(budget_id, period_start, -amount)])
+                await cursor.execute(
+                    'SELECT spent FROM budget_spend WHERE budget_id = %s AND period_start = %s',
+                    (budget_id, period_start)
+                )
+                spent = float((await cursor.fetchone())['spent'])
+                notify_budget_status(conn, user_id, budget['category'], spent, float(budget['amount']))
+        finally:
+            await cursor.close()
+
+        if goal_id and amount > 0:
+            await add_goal_contribution(conn, user_id, goal_id, amount)
+
+        await check_achievements(conn, user_id, 'transaction_added')
+
+        await invalidate_insights(conn, user_id)
+        queue_change(user_id, 'transactions', 'budgets', 'goals')
+        await commit_request(conn)
+    except mysql.connector.Error as err:
+        logger.error(f"Transactions database error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+    except Exception as e:
+        logger.error(f"Transactions unexpected error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if conn is not None:
+            await release_db_connection(conn)
+
+    if ai_category is None:
+        start_categorization_workers()
+        categorization_wakeup.set()
+    logger.info(f"Transaction created for user {username}: {description}, AI Category: {ai_category or 'pending'}")
+    return jsonify({
+        'message': 'Transaction created',
+        'ai_category': ai_category,
+        'categorization_pending': ai_category is None
+    }), 201
+
+@api.route('/chat', methods=['POST'])
+@require_user
+async def chat():
+    data = await request.get_json()
+    query = data.get('query')
+    financial_data = data.get('financialData')
+
+    if not query or not financial_data:
+        logger.warning("Chat request failed: Missing query or financial data")
+        return jsonify({'error': 'Missing query or financial data'}), 400
+
+    try:
+        ai_prompt = build_chat_prompt(query, financial_data)
+        try:
+            ai_response = (await llm.complete(
+                'chat',
+                [{"role": "system", "content": CHAT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+                max_tokens=150,
+                temperature=0.5,
+                user_id=g.user_id
+            )).strip()
+            logger.debug(f"Groq chat response: {ai_response}")
+        except Exception as e:
+            logger.error(f"Groq chat error: {str(e)}")
+            ai_response = CHAT_UNAVAILABLE
+
+        return jsonify({'response': ai_response}), 200
+
+    except Exception as e:
+        logger.error(f"Chat unexpected error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api.route('/chat/stream', methods=['POST'])
+@require_user
+async def chat_stream():
+    """Stream the chatbot answer as Server-Sent Events: token events, then done."""
+    user_id = g.user_id
+    username = g.username
+
+    data = await request.get_json()
+    query = data.get('query')
+    financial_data = data.get('financialData')
+
+    if not query or not financial_data:
+        logger.warning("Chat stream failed: Missing query or financial data")
+        return jsonify({'error': 'Missing query or financial data'}), 400
+
+    logger.info(f"Chat stream started for user {username}")
+    ai_prompt = build_chat_prompt(query, financial_data)
+
+    async def events():
+        try:
+            async for delta in llm.stream(
+                'chat_stream',
+                [{"role": "system", "content": CHAT_SYSTEM_PROMPT}, {"role": "user", "content": ai_prompt}],
+                max_tokens=150,
+                temperature=0.5,
+                user_id=user_id
+            ):
+                yield sse_event('token', {'text': delta})
+        except Exception as e:
+            logger.error(f"Groq chat stream error: {str(e)}")
+            yield sse_event('error', {'error': CHAT_UNAVAILABLE})
+            return
+        yield sse_event('done', {})
+
+    return sse_response(events())
+
+@api.route('/events', methods=['GET'])
+@require_user
+async def event_stream():
+    """Per-user push stream, as app.event_stream, without holding a thread."""
+    username = g.username
+
+    try:
+        subscription = event_hub.subscribe(g.user_id, asyncio.get_running_loop())
+    except SubscriberLimitError as e:
+        logger.warning(f"Event stream refused for user {username}: {str(e)}")
+        return jsonify({'error': str(e)}), 429
+    logger.info(f"Event stream opened for user {username}")
+
+    async def events():
+        try:
+            yield sse_event('ready', {'heartbeat': EVENT_STREAM_HEARTBEAT})
+            while True:
+                item = await subscription.get(EVENT_STREAM_HEARTBEAT)
+                yield ': heartbeat\n\n' if item is None else sse_event(*item)
+        finally:
+            # Quart cancels the generator when the client disconnects
+            event_hub.unsubscribe(subscription)
+
+    return sse_response(events())
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+def served_async(scope):
+    path = scope['path']
+    return path in ASYNC_PATHS or scope['method'] in ASYNC_METHODS.get(path, ())
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and not served_async(scope):
+        # A context per request gives each Flask request a thread of its own,
+        # as the threaded development server does
+        async with ThreadSensitiveContext():
+            await wsgi_application(scope, receive, send)
+    else:
+        await api(scope, receive, send)
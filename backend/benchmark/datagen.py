@@ -0,0 +1,156 @@
+"""Fill the database with synthetic benchmark users.
+
+Each size in --sizes gets --users-per-size users named bench_<size>_<n>, all
+with the password 'benchmark', holding that many transactions plus a few
+goals, budgets and notifications. The rollup tables are rebuilt afterwards,
+and the users are written to dataset.json for the load test.
+"""
+import itertools
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import click
+
+os.environ.setdefault('GROQ_API_KEY', 'benchmark')  # app.py refuses to start without one
+
+from app import db_config, rebuild_budget_spend, rebuild_daily_rollups  # noqa: E402
+import mysql.connector  # noqa: E402
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset.json')
+PASSWORD = 'benchmark'
+INSERT_CHUNK_SIZE = 5000
+HISTORY_DAYS = 730
+NOTIFICATIONS_PER_USER = 60
+
+MERCHANTS = {
+    'Food': ['Whole Foods', 'Chipotle', 'Starbucks coffee', 'Trader Joes groceries', 'Pizza Hut'],
+    'Rent': ['Monthly rent', 'Apartment rent payment'],
+    'Entertainment': ['Netflix subscription', 'AMC movie tickets', 'Steam game purchase', 'Concert tickets'],
+    'Utilities': ['Electric bill', 'Water bill', 'Comcast internet', 'Phone bill'],
+    'Clothes': ['Uniqlo shirts', 'Nike shoes', 'H&M jacket'],
+    'Transport': ['Uber ride', 'Shell gas station', 'Metro card', 'Lyft ride'],
+    'Health': ['CVS pharmacy', 'Dentist visit', 'Gym membership'],
+    'Education': ['Udemy course', 'Textbooks', 'Coursera subscription'],
+    'Other': ['Amazon order', 'Gift for friend', 'Hardware store']
+}
+BUDGET_CATEGORIES = ['Food', 'Entertainment', 'Transport', 'Clothes', 'Utilities']
+
+
+def make_user(cursor, username, password_hash):
+    cursor.execute(
+        'INSERT INTO users (username, email, password_hash, full_name, currency) VALUES (%s, %s, %s, %s, %s)',
+        (username, f"{username}@bench.local", password_hash, f"Benchmark {username}", 'USD')
+    )
+    user_id = cursor.lastrowid
+    goal_ids = []
+    for name, target in [('Emergency fund', 10000), ('Vacation', 3000), ('New laptop', 1500)]:
+        cursor.execute(
+            'INSERT INTO savings_goals (user_id, name, target_amount, current_amount, deadline) VALUES (%s, %s, %s, %s, %s)',
+            (user_id, name, target, round(target * random.random() * 0.8, 2), date.today() + timedelta(days=365))
+        )
+        goal_ids.append(cursor.lastrowid)
+    budget_ids = {}
+    for category in BUDGET_CATEGORIES:
+        cursor.execute(
+            'INSERT INTO budgets (user_id, category, amount, period) VALUES (%s, %s, %s, %s)',
+            (user_id, category, random.choice([200, 400, 800, 1500]), 'monthly')
+        )
+        budget_ids[category] = cursor.lastrowid
+    return user_id, goal_ids, budget_ids
+
+
+def transaction_rows(user_id, count, goal_ids, budget_ids):
+    """Yield transaction rows: mostly expenses, a monthly-ish salary and some goal contributions."""
+    today = date.today()
+    for _ in range(count):
+        day = today - timedelta(days=random.randrange(HISTORY_DAYS))
+        roll = random.random()
+        if roll < 0.05:
+            yield (user_id, round(random.uniform(1500, 5000), 2), 'Salary deposit', day, None, None, 'Income')
+        elif roll < 0.08:
+            yield (user_id, round(random.uniform(20, 300), 2), 'Transfer to savings', day,
+                   random.choice(goal_ids), None, 'Savings')
+        else:
+            category = random.choice(list(MERCHANTS))
+            yield (user_id, -round(random.uniform(3, 250), 2), random.choice(MERCHANTS[category]), day,
+                   None, budget_ids.get(category), category)
+
+
+def insert_transactions(conn, rows):
+    """Insert rows from an iterator in executemany chunks, committing each chunk."""
+    cursor = conn.cursor()
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, INSERT_CHUNK_SIZE))
+            if not chunk:
+                break
+            cursor.executemany(
+                'INSERT INTO transactions (user_id, amount, description, transaction_date, goal_id, budget_id, ai_category) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s)', chunk
+            )
+            conn.commit()
+    finally:
+        cursor.close()
+
+
+def insert_notifications(cursor, user_id):
+    now = datetime.now()
+    rows = [
+        (user_id, f"Benchmark notification {i}", random.choice(['budget', 'savings', 'insight']),
+         now - timedelta(hours=NOTIFICATIONS_PER_USER - i), i < NOTIFICATIONS_PER_USER - 10)
+        for i in range(NOTIFICATIONS_PER_USER)
+    ]
+    cursor.executemany(
+        'INSERT INTO notifications (user_id, message, type, created_at, is_read) VALUES (%s, %s, %s, %s, %s)', rows
+    )
+
+
+@click.command()
+@click.option('--sizes', default='10,1000,100000', show_default=True,
+              help='Comma-separated transaction counts, one group of users per count (up to 1000000).')
+@click.option('--users-per-size', default=2, show_default=True)
+@click.option('--seed', default=0, show_default=True)
+@click.option('--reset/--no-reset', default=True, show_default=True, help='Delete earlier bench_* users first.')
+def main(sizes, users_per_size, seed, reset):
+    """Generate benchmark users and write dataset.json."""
+    random.seed(seed)
+    sizes = [int(s) for s in sizes.split(',') if s.strip()]
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    try:
+        if reset:
+            cursor.execute("DELETE FROM users WHERE username LIKE 'bench\\_%'")
+            conn.commit()
+            click.echo(f"Removed {cursor.rowcount} earlier benchmark users")
+
+        password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        users = []
+        for size in sizes:
+            for n in range(users_per_size):
+                username = f"bench_{size}_{n}"
+                user_id, goal_ids, budget_ids = make_user(cursor, username, password_hash)
+                insert_notifications(cursor, user_id)
+                conn.commit()
+                insert_transactions(conn, transaction_rows(user_id, size, goal_ids, budget_ids))
+                users.append({
+                    'username': username, 'password': PASSWORD, 'user_id': user_id, 'transactions': size,
+                    'goal_ids': goal_ids, 'budget_ids': list(budget_ids.values())
+                })
+                click.echo(f"Created {username} with {size} transactions")
+
+        click.echo(f"Rebuilt {rebuild_daily_rollups(conn)} daily rollup rows")
+        click.echo(f"Rebuilt {rebuild_budget_spend(conn)} budget spend rows")
+    finally:
+        cursor.close()
+        conn.close()
+
+    with open(DATASET_PATH, 'w') as file:
+        json.dump({'seed': seed, 'sizes': sizes, 'users': users}, file, indent=2)
+    click.echo(f"Wrote {len(users)} users to {DATASET_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Compare the full categorization prompt against retrieval-selected few-shot prompts.
+
+Offline, it measures prompt size and whether the selected examples carry the
+right category (hit@k, and the nearest example's category as a vote). With
+--call-groq it also sends every labelled description to Groq under each
+prompt, for accuracy, latency and the prompt tokens Groq reports. Point
+GROQ_BASE_URL at the stub to check the plumbing; accuracy only means
+something against the real API.
+"""
+import os
+import time
+
+import click
+
+os.environ.setdefault('GROQ_API_KEY', 'benchmark')  # app.py refuses to start without one
+
+from app import (  # noqa: E402
+    CATEGORIZATION_PROMPT, CATEGORIZATION_INSTRUCTIONS, VALID_CATEGORIES, LLM_MODEL, groq_client, example_index
+)
+from few_shot import build_prompt  # noqa: E402
+
+# Held out from the prompt: bank-statement style descriptions, not its example phrases
+LABELLED = [
+    ('STARBUCKS STORE #10234 SEATTLE WA', 'Food'),
+    ('SQ *BLUE BOTTLE COFFEE', 'Food'),
+    ('WHOLEFDS MKT 10155', 'Food'),
+    ('DOORDASH*THAI PALACE', 'Food'),
+    ('Chipotle Mexican Grill online order', 'Food'),
+    ('Safeway fuel and groceries', 'Food'),
+    ('Dinner at Olive Garden', 'Food'),
+    ('Monthly rent - Oak St apartment', 'Rent'),
+    ('Zelle payment to landlord for rent', 'Rent'),
+    ('HOA dues condo', 'Rent'),
+    ('NETFLIX.COM 866-579-7172', 'Entertainment'),
+    ('Spotify Premium family plan', 'Entertainment'),
+    ('AMC 0412 MOVIE TICKETS', 'Entertainment'),
+    ('STEAMGAMES.COM purchase', 'Entertainment'),
+    ('Ticketmaster concert tickets', 'Entertainment'),
+    ('PG&E electric bill autopay', 'Utilities'),
+    ('City water utility payment', 'Utilities'),
+    ('COMCAST XFINITY internet', 'Utilities'),
+    ('Verizon wireless monthly phone bill', 'Utilities'),
+    ('ACME CORP PAYROLL DIRECT DEP', 'Income'),
+    ('Freelance invoice payment received', 'Income'),
+    ('Quarterly dividend reinvestment', 'Income'),
+    ('Tax refund IRS TREAS 310', 'Income'),
+    ('UNIQLO USA 1123', 'Clothes'),
+    ('Nike.com running shoes', 'Clothes'),
+    ('H&M winter jacket', 'Clothes'),
+    ('Old Navy kids jeans', 'Clothes'),
+    ('UBER *TRIP HELP.UBER.COM', 'Transport'),
+    ('Shell oil 5744 gas station', 'Transport'),
+    ('MTA metrocard refill', 'Transport'),
+    ('Jiffy Lube oil change', 'Transport'),
+    ('Delta Air Lines flight to Denver', 'Transport'),
+    ('CVS/PHARMACY #0412 prescription', 'Health'),
+    ('Dental cleaning copay', 'Health'),
+    ('Planet Fitness monthly gym membership', 'Health'),
+    ('Urgent care visit', 'Health'),
+    ('Udemy online course purchase', 'Education'),
+    ('University tuition spring semester', 'Education'),
+    ('Chegg textbook rental', 'Education'),
+    ('Coursera Plus subscription', 'Education'),
+    ('Transfer to high yield savings', 'Savings'),
+    ('Vanguard IRA contribution', 'Savings'),
+    ('Emergency fund deposit', 'Savings'),
+    ('Automatic transfer to savings account', 'Savings'),
+    ('Amazon marketplace order', 'Other'),
+    ('Birthday gift for mom', 'Other'),
+    ('Red Cross donation', 'Other'),
+    ('ATM withdrawal fee', 'Other'),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def retrieval_quality(k):
+    """hit@k: the label is among the k nearest examples. vote: the nearest example's label is."""
+    hits = votes = 0
+    for description, label in LABELLED:
+        categories = [example_index.examples[position][1] for position in example_index.nearest(description, k)]
+        hits += label in categories
+        votes += bool(categories) and categories[0] == label
+    return hits / len(LABELLED), votes / len(LABELLED)
+
+
+def ask_groq(system_prompt, description):
+    """Return (category, seconds, prompt_tokens) for one categorization call."""
+    started = time.monotonic()
+    response = groq_client.chat.completions.create(
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Description: {description}"}
+        ],
+        max_tokens=10,
+        temperature=0.3
+    )
+    elapsed = time.monotonic() - started
+    category = response.choices[0].message.content.strip()
+    usage = getattr(response, 'usage', None)
+    return (category if category in VALID_CATEGORIES else 'Other'), elapsed, getattr(usage, 'prompt_tokens', None)
+
+
+def evaluate_prompt(prompt_for, repeat):
+    correct = calls = 0
+    latencies = []
+    prompt_tokens = []
+    for _ in range(repeat):
+        for description, label in LABELLED:
+            category, elapsed, tokens = ask_groq(prompt_for(description), description)
+            calls += 1
+            correct += category == label
+            latencies.append(elapsed)
+            if tokens:
+                prompt_tokens.append(tokens)
+    return {
+        'accuracy': round(correct / calls, 3),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'prompt_tokens': round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else None
+    }
+
+
+@click.command()
+@click.option('--k', 'ks', default='4,8,16', show_default=True, help='Comma-separated nearest-example counts.')
+@click.option('--call-groq', is_flag=True, help='Also categorize the labelled set through Groq under each prompt.')
+@click.option('--repeat', default=1, show_default=True, help='Passes over the labelled set per prompt with --call-groq.')
+def main(ks, call_groq, repeat):
+    """Print prompt size, retrieval quality and, with --call-groq, accuracy and latency per prompt."""
+    ks = [int(k) for k in ks.split(',') if k.strip()]
+    # (name, k, system prompt for a description); k is None for the full prompt
+    prompts = [('full', None, lambda description: CATEGORIZATION_PROMPT)]
+    for k in ks:
+        prompts.append((
+            f"few-shot k={k}", k,
+            lambda description, k=k: build_prompt(CATEGORIZATION_INSTRUCTIONS, example_index.select([description], k))
+        ))
+
+    click.echo(f"{len(LABELLED)} labelled descriptions, {len(example_index)} indexed examples\n")
+    click.echo(f"{'prompt':<16}{'avg chars':>10}{'hit@k':>8}{'vote':>8}")
+    for name, k, prompt_for in prompts:
+        chars = sum(len(prompt_for(description)) for description, _ in LABELLED) / len(LABELLED)
+        if k is None:
+            click.echo(f"{name:<16}{chars:>10.0f}{'-':>8}{'-':>8}")
+        else:
+            hit_rate, vote_rate = retrieval_quality(k)
+            click.echo(f"{name:<16}{chars:>10.0f}{hit_rate:>8.2f}{vote_rate:>8.2f}")
+
+    if not call_groq:
+        return
+    click.echo(f"\n{'prompt':<16}{'accuracy':>10}{'p50 ms':>10}{'p95 ms':>10}{'prompt tokens':>15}")
+    for name, _, prompt_for in prompts:
+        result = evaluate_prompt(prompt_for, repeat)
+        tokens = result['prompt_tokens'] if result['prompt_tokens'] is not None else '-'
+        click.echo(f"{name:<16}{result['accuracy']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{tokens:>15}")
+
+
+if __name__ == '__main__':
+    main()
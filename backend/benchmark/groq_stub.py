@@ -0,0 +1,173 @@
+"""Local stand-in for the Groq chat-completions API.
+
+Start the backend with GROQ_BASE_URL=http://127.0.0.1:8090 and GROQ_API_KEY set
+to anything, and every Groq call lands here instead. Replies are shaped to
+what each call site parses: a category, numbered categories for a batch, or
+filler text for chat and reports, optionally streamed.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+CATEGORIES = ["Food", "Rent", "Entertainment", "Utilities", "Clothes", "Transport", "Health", "Education", "Other"]
+FILLER = (
+    "Your spending is concentrated in a few categories. Food and entertainment are the largest, "
+    "so review them first. You are on track with most budgets, and setting aside a fixed amount "
+    "each week would move your savings goals forward faster."
+)
+NUMBERED_LINE_RE = re.compile(r'^(\d+)\. ', re.MULTILINE)
+
+
+class StubState:
+    def __init__(self, latency, jitter, error_rate, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'streamed': 0, 'errors': 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def delay(self):
+        with self.lock:
+            return max(0.0, self.random.gauss(self.latency, self.latency * self.jitter))
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+def reply_for(messages):
+    """Text a real model would plausibly return for this prompt."""
+    system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+    user = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+    if 'Categorize each numbered description' in user:
+        count = len(NUMBERED_LINE_RE.findall(user.split('\n', 1)[-1]))
+        return '\n'.join(f"{i}. {CATEGORIES[i % len(CATEGORIES)]}" for i in range(1, count + 1))
+    if 'financial advisor' not in system:
+        return CATEGORIES[len(user) % len(CATEGORIES)]
+    return FILLER
+
+
+def completion_body(model, text):
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': len(text.split()), 'total_tokens': len(text.split())}
+    }
+
+
+def chunk_body(model, delta, finish_reason=None):
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+    }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                with state.lock:
+                    self.send_json(200, dict(state.stats))
+            else:
+                self.send_json(404, {'error': {'message': 'Not found'}})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not self.path.endswith('/chat/completions'):
+                self.send_json(404, {'error': {'message': 'Not found'}})
+                return
+            state.count('calls')
+            delay = state.delay()
+            if state.should_fail():
+                state.count('errors')
+                time.sleep(delay / 2)
+                self.send_json(503, {'error': {'message': 'Stub injected failure', 'type': 'service_unavailable'}})
+                return
+
+            model = request.get('model', 'stub')
+            text = reply_for(request.get('messages', []))
+            if not request.get('stream'):
+                time.sleep(delay)
+                self.send_json(200, completion_body(model, text))
+                return
+
+            # Spend a third of the latency before the first token and spread the rest over the words
+            state.count('streamed')
+            words = [w + ' ' for w in text.split()]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            time.sleep(delay / 3)
+            for word in words:
+                self.wfile.write(f"data: {json.dumps(chunk_body(model, {'content': word}))}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(delay * 2 / 3 / max(len(words), 1))
+            self.wfile.write(f"data: {json.dumps(chunk_body(model, {}, 'stop'))}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_stub(host='127.0.0.1', port=8090, latency=0.5, jitter=0.2, error_rate=0.0, seed=0):
+    """Serve the stub from a background thread. Returns the server; call shutdown() to stop it."""
+    state = StubState(latency, jitter, error_rate, seed)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='groq-stub', daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=8090, show_default=True)
+@click.option('--latency', default=0.5, show_default=True, help='Mean seconds per completion.')
+@click.option('--jitter', default=0.2, show_default=True, help='Standard deviation as a fraction of the latency.')
+@click.option('--error-rate', default=0.0, show_default=True, help='Fraction of calls answered with a 503.')
+@click.option('--seed', default=0, show_default=True)
+def main(host, port, latency, jitter, error_rate, seed):
+    """Run the Groq stub until interrupted."""
+    server = start_stub(host, port, latency, jitter, error_rate, seed)
+    click.echo(f"Groq stub on http://{host}:{port} (latency {latency}s, error rate {error_rate})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
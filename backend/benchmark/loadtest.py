@@ -0,0 +1,420 @@
+"""Load test the running backend with scenario mixes and compare against a baseline.
+
+Two passes:
+  profile  each route alone, one request at a time, to count the MySQL
+           statements (the server's Questions counter) and Groq stub calls
+           each request causes.
+  load     each scenario mix for --duration seconds at --concurrency, for
+           throughput and p50/p95/p99 latency per route.
+
+Background work the app starts (deferred categorization, notification
+flushes, stale-while-revalidate refreshes) can land outside the request it
+belongs to, so keep those features off for exact profile counts.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+import click
+
+os.environ.setdefault('GROQ_API_KEY', 'benchmark')  # app.py refuses to start without one
+
+from app import app, db_config  # noqa: E402
+import mysql.connector  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BENCHMARK_DIR, 'dataset.json')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results.json')
+
+# A result regresses when latency grows or throughput falls by more than this
+# fraction, or when a route makes more queries or Groq calls than the baseline
+REGRESSION_TOLERANCE = 0.2
+QUERY_COUNT_TOLERANCE = 0.5
+LLM_CALL_TOLERANCE = 0.05
+
+# auth is True for the acting user's token, 'admin' for the --admin-user token, False for none
+Request = namedtuple('Request', ['method', 'path', 'json_body', 'data', 'content_type', 'until_first_event', 'auth'])
+Request.__new__.__defaults__ = (None, None, None, False, True)
+
+Op = namedtuple('Op', ['route', 'build'])
+
+
+def today_offset(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+FINANCIAL_DATA = {
+    'summary': {'total_income': 4200.0, 'total_expenses': 3100.0, 'net_balance': 1100.0, 'period': 'last 30 days'},
+    'categories': [{'name': 'Food', 'amount': -640.0, 'type': 'Expense'}, {'name': 'Rent', 'amount': -1500.0, 'type': 'Expense'}],
+    'budgets': [{'category': 'Food', 'spent': 640.0, 'limit': 600.0}],
+    'goals': [{'name': 'Vacation', 'current': 1200.0, 'target': 3000.0}],
+    'ai_insights': 'Food spending is above budget.'
+}
+
+
+def import_body(rnd, count=20):
+    lines = ['date,description,amount']
+    for _ in range(count):
+        lines.append(f"{today_offset(rnd.randrange(30))},Benchmark import {rnd.randrange(1000)},{-rnd.randrange(5, 200)}.00")
+    return '\n'.join(lines).encode('utf-8')
+
+
+def latest_transaction_path(ctx, user, rnd):
+    """Untimed setup for the delete: find the user's newest transaction."""
+    status, body, _ = ctx.client.send(Request('GET', '/transactions?limit=1'), ctx.tokens[user['username']])
+    transactions = json.loads(body).get('transactions', []) if status == 200 else []
+    return f"/transactions/{transactions[0]['id']}" if transactions else '/transactions/0'
+
+
+OPS = {
+    'login': Op('/login', lambda ctx, user, rnd: Request(
+        'POST', '/login', {'username': user['username'], 'password': user['password']}, auth=False)),
+    'register': Op('/register', lambda ctx, user, rnd: Request('POST', '/register', {
+        'username': f"bench_reg_{rnd.getrandbits(48):x}", 'email': f"{rnd.getrandbits(48):x}@bench.local",
+        'password': 'benchmark', 'full_name': 'Benchmark Registration'}, auth=False)),
+    'dashboard': Op('/dashboard', lambda ctx, user, rnd: Request('GET', '/dashboard')),
+    'unread_count': Op('/notifications/unread-count', lambda ctx, user, rnd: Request('GET', '/notifications/unread-count')),
+    'notifications': Op('/notifications', lambda ctx, user, rnd: Request('GET', '/notifications')),
+    'mark_read': Op('/notifications/mark-read', lambda ctx, user, rnd: Request(
+        'POST', '/notifications/mark-read', {'up_to_id': 2 ** 31 - 1})),
+    'achievements': Op('/achievements', lambda ctx, user, rnd: Request('GET', '/achievements')),
+    'goals': Op('/savings-goals', lambda ctx, user, rnd: Request('GET', '/savings-goals')),
+    'create_goal': Op('/savings-goals', lambda ctx, user, rnd: Request(
+        'POST', '/savings-goals', {'name': f"Goal {rnd.randrange(1000)}", 'target_amount': 500})),
+    'budgets': Op('/budgets', lambda ctx, user, rnd: Request('GET', '/budgets')),
+    'create_budget': Op('/budgets', lambda ctx, user, rnd: Request(
+        'POST', '/budgets', {'category': rnd.choice(['Health', 'Education', 'Other']), 'amount': 300})),
+    'transactions_page': Op('/transactions', lambda ctx, user, rnd: Request('GET', '/transactions?limit=50')),
+    'add_expense': Op('/transactions', lambda ctx, user, rnd: Request('POST', '/transactions', {
+        'amount': -rnd.randrange(5, 120), 'description': rnd.choice(['Chipotle', 'Uber ride', 'Netflix subscription']),
+        'transaction_date': today_offset(0), 'budget_id': rnd.choice(user['budget_ids'])})),
+    'add_contribution': Op('/transactions', lambda ctx, user, rnd: Request('POST', '/transactions', {
+        'amount': rnd.randrange(20, 200), 'description': 'Transfer to savings',
+        'transaction_date': today_offset(0), 'goal_id': rnd.choice(user['goal_ids'])})),
+    'delete_transaction': Op('/transactions/<int:transaction_id>', lambda ctx, user, rnd: Request(
+        'DELETE', latest_transaction_path(ctx, user, rnd))),
+    'import_csv': Op('/transactions/import', lambda ctx, user, rnd: Request(
+        'POST', '/transactions/import?format=csv', data=import_body(rnd), content_type='text/csv')),
+    'report': Op('/transaction-report', lambda ctx, user, rnd: Request(
+        'GET', f"/transaction-report?start_date={today_offset(90)}")),
+    'report_stream': Op('/transaction-report/insights/stream', lambda ctx, user, rnd: Request(
+        'GET', f"/transaction-report/insights/stream?start_date={today_offset(90)}")),
+    'chat': Op('/chat', lambda ctx, user, rnd: Request(
+        'POST', '/chat', {'query': 'How can I save more this month?', 'financialData': FINANCIAL_DATA})),
+    'chat_stream': Op('/chat/stream', lambda ctx, user, rnd: Request(
+        'POST', '/chat/stream', {'query': 'Where am I overspending?', 'financialData': FINANCIAL_DATA})),
+    'events': Op('/events', lambda ctx, user, rnd: Request('GET', '/events', until_first_event=True)),
+    'event_stats': Op('/event-stats', lambda ctx, user, rnd: Request('GET', '/event-stats', auth='admin')),
+    'pool_stats': Op('/pool-stats', lambda ctx, user, rnd: Request('GET', '/pool-stats', auth='admin')),
+    'categorization_stats': Op('/categorization-stats', lambda ctx, user, rnd: Request(
+        'GET', '/categorization-stats', auth='admin')),
+    'invalidate_category_cache': Op('/category-cache/invalidate', lambda ctx, user, rnd: Request(
+        'POST', '/category-cache/invalidate', auth='admin')),
+}
+
+# Relative weights of the routes in each scenario
+SCENARIOS = {
+    'dashboard': {'dashboard': 5, 'unread_count': 3, 'notifications': 2, 'achievements': 1, 'goals': 1,
+                  'budgets': 1, 'events': 1, 'mark_read': 1},
+    'writes': {'add_expense': 5, 'add_contribution': 2, 'delete_transaction': 2, 'import_csv': 1,
+               'create_budget': 1, 'create_goal': 1},
+    'reports': {'report': 3, 'report_stream': 2, 'transactions_page': 3},
+    'chat': {'chat': 3, 'chat_stream': 2},
+    'auth': {'login': 3, 'register': 1},
+    'ops': {'event_stats': 3, 'pool_stats': 3, 'categorization_stats': 3, 'invalidate_category_cache': 1},
+}
+SCENARIOS['mixed'] = {
+    op: weight for scenario in ['dashboard', 'writes', 'reports', 'chat', 'auth'] for op, weight in SCENARIOS[scenario].items()
+}
+
+
+class ApiClient:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, spec, token=None):
+        """Send a Request; returns (status, body, seconds). Status 0 means no response."""
+        headers = {}
+        data = spec.data
+        content_type = spec.content_type
+        if spec.json_body is not None:
+            data = json.dumps(spec.json_body).encode('utf-8')
+            content_type = 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        if spec.auth and token:
+            headers['Authorization'] = f"Bearer {token}"
+        request = urllib.request.Request(self.base_url + spec.path, data=data, method=spec.method, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status = response.status
+                if spec.until_first_event:
+                    # Endless stream: stop once the first event has arrived
+                    while response.readline() not in (b'\n', b''):
+                        pass
+                    body = b''
+                else:
+                    body = response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except OSError as e:
+            status, body = 0, str(e).encode('utf-8')
+        return status, body, time.perf_counter() - started
+
+
+class Counters:
+    """MySQL statements executed and Groq stub calls made, read before and after a request."""
+
+    def __init__(self, stub_url):
+        self.stub_url = stub_url.rstrip('/')
+        self.conn = mysql.connector.connect(autocommit=True, **db_config)
+
+    def read(self):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+            questions = int(cursor.fetchone()[1])
+        finally:
+            cursor.close()
+        with urllib.request.urlopen(self.stub_url + '/stats', timeout=5) as response:
+            llm_calls = json.loads(response.read())['calls']
+        return questions, llm_calls
+
+    def delta(self, before, after):
+        # The SHOW STATUS statement that took the second reading counts itself
+        return after[0] - before[0] - 1, after[1] - before[1]
+
+    def close(self):
+        self.conn.close()
+
+
+class Context:
+    def __init__(self, client, users, admin=None):
+        self.client = client
+        self.users = users
+        self.admin = admin
+        self.tokens = {}
+
+    def log_in_all(self):
+        for user in self.users + ([self.admin] if self.admin else []):
+            status, body, _ = self.client.send(OPS['login'].build(self, user, None))
+            if status != 200:
+                raise click.ClickException(f"Login failed for {user['username']}: {status} {body[:200]!r}")
+            self.tokens[user['username']] = json.loads(body)['token']
+
+    def token_for(self, spec, user):
+        if spec.auth == 'admin':
+            return self.tokens[self.admin['username']] if self.admin else None
+        return self.tokens[user['username']]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def latency_summary(samples):
+    values = sorted(samples)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+    }
+
+
+def profile_ops(ctx, counters, op_names, requests_per_op, seed):
+    """Send each route alone, one request at a time, and count its queries and Groq calls."""
+    rnd = random.Random(seed)
+    profile = {}
+    for name in op_names:
+        queries = llm_calls = errors = 0
+        samples = []
+        for _ in range(requests_per_op):
+            user = rnd.choice(ctx.users)
+            spec = OPS[name].build(ctx, user, rnd)
+            before = counters.read()
+            status, _, elapsed = ctx.client.send(spec, ctx.token_for(spec, user))
+            query_delta, llm_delta = counters.delta(before, counters.read())
+            queries += query_delta
+            llm_calls += llm_delta
+            errors += status == 0 or status >= 400
+            samples.append(elapsed)
+        profile[name] = dict(
+            latency_summary(samples),
+            queries_per_request=round(queries / requests_per_op, 2),
+            llm_calls_per_request=round(llm_calls / requests_per_op, 2),
+            errors=errors
+        )
+    return profile
+
+
+def run_scenario(ctx, weights, duration, concurrency, seed):
+    """Drive a weighted mix of routes from concurrency threads for duration seconds."""
+    names = list(weights)
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(worker_seed):
+        rnd = random.Random(worker_seed)
+        while time.monotonic() < deadline:
+            name = rnd.choices(names, [weights[n] for n in names])[0]
+            user = rnd.choice(ctx.users)
+            spec = OPS[name].build(ctx, user, rnd)
+            status, _, elapsed = ctx.client.send(spec, ctx.token_for(spec, user))
+            with lock:
+                samples[name].append(elapsed)
+                if status == 0 or status >= 400:
+                    errors[name] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(seed + i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    everything = [s for values in samples.values() for s in values]
+    return dict(
+        latency_summary(everything),
+        throughput_rps=round(len(everything) / elapsed, 2),
+        errors=sum(errors.values()),
+        ops={name: dict(latency_summary(samples[name]), errors=errors[name]) for name in names if samples[name]}
+    )
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for name, scenario in results.get('scenarios', {}).items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        if scenario['p95_ms'] > base['p95_ms'] * (1 + REGRESSION_TOLERANCE):
+            regressions.append(f"{name}: p95 {scenario['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if scenario['throughput_rps'] < base['throughput_rps'] * (1 - REGRESSION_TOLERANCE):
+            regressions.append(f"{name}: {scenario['throughput_rps']} req/s vs baseline {base['throughput_rps']} req/s")
+    for name, op in results.get('profile', {}).items():
+        base = baseline.get('profile', {}).get(name)
+        if not base:
+            continue
+        if op['queries_per_request'] > base['queries_per_request'] + QUERY_COUNT_TOLERANCE:
+            regressions.append(f"{name}: {op['queries_per_request']} queries/request vs baseline {base['queries_per_request']}")
+        if op['llm_calls_per_request'] > base['llm_calls_per_request'] + LLM_CALL_TOLERANCE:
+            regressions.append(f"{name}: {op['llm_calls_per_request']} LLM calls/request vs baseline {base['llm_calls_per_request']}")
+    return regressions
+
+
+def uncovered_routes():
+    """Rules in app.py that no benchmark op exercises."""
+    covered = {op.route for op in OPS.values()}
+    return sorted(
+        rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static' and rule.rule not in covered
+    )
+
+
+def print_profile(profile):
+    click.echo(f"\n{'route':<28}{'p50 ms':>10}{'queries/req':>14}{'llm calls/req':>15}{'errors':>8}")
+    for name, op in profile.items():
+        click.echo(f"{name:<28}{op['p50_ms']:>10}{op['queries_per_request']:>14}{op['llm_calls_per_request']:>15}{op['errors']:>8}")
+
+
+def print_scenario(name, scenario):
+    click.echo(f"\n{name}: {scenario['throughput_rps']} req/s, p50 {scenario['p50_ms']}ms, "
+               f"p95 {scenario['p95_ms']}ms, p99 {scenario['p99_ms']}ms, {scenario['errors']} errors")
+    for op_name, op in scenario['ops'].items():
+        click.echo(f"  {op_name:<26}{op['count']:>7}{op['p50_ms']:>10}{op['p95_ms']:>10}{op['p99_ms']:>10}{op['errors']:>6}")
+
+
+@click.command()
+@click.option('--api-url', default='http://127.0.0.1:5001', show_default=True)
+@click.option('--stub-url', default='http://127.0.0.1:8090', show_default=True, help='The running Groq stub.')
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(sorted(SCENARIOS)),
+              help='Scenario to run; repeatable. Default: all of them.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds per scenario.')
+@click.option('--concurrency', default=16, show_default=True)
+@click.option('--profile-requests', default=20, show_default=True, help='Sequential requests per route when profiling.')
+@click.option('--skip-profile', is_flag=True)
+@click.option('--min-transactions', default=0, show_default=True, help='Only act as users with at least this many.')
+@click.option('--admin-user', help='Dataset user listed in the server\'s ADMIN_USERNAMES, for the ops routes.')
+@click.option('--timeout', default=60.0, show_default=True)
+@click.option('--seed', default=0, show_default=True)
+@click.option('--save-baseline', is_flag=True, help='Store these results as the new baseline.')
+def main(api_url, stub_url, scenarios, duration, concurrency, profile_requests, skip_profile,
+         min_transactions, admin_user, timeout, seed, save_baseline):
+    """Profile and load test the backend; exits 1 on a regression against the baseline."""
+    with open(DATASET_PATH, 'r') as file:
+        dataset = json.load(file)
+    users = [u for u in dataset['users'] if u['transactions'] >= min_transactions]
+    if not users:
+        raise click.ClickException('No dataset users match; run python -m benchmark.datagen first')
+    for route in uncovered_routes():
+        click.echo(f"warning: no benchmark op covers {route}")
+    admin = None
+    if admin_user:
+        admin = next((u for u in dataset['users'] if u['username'] == admin_user), None)
+        if not admin:
+            raise click.ClickException(f"{admin_user} is not a dataset user")
+
+    scenarios = list(scenarios) or list(SCENARIOS)
+    if not admin and 'ops' in scenarios:
+        click.echo('warning: the ops routes need --admin-user; without it they fail with 401')
+    ctx = Context(ApiClient(api_url, timeout), users, admin)
+    ctx.log_in_all()
+    results = {
+        'meta': {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'users': len(users),
+            'transactions_per_user': sorted({u['transactions'] for u in users}),
+            'duration': duration, 'concurrency': concurrency
+        }
+    }
+
+    if not skip_profile:
+        counters = Counters(stub_url)
+        try:
+            op_names = sorted({name for scenario in scenarios for name in SCENARIOS[scenario]})
+            results['profile'] = profile_ops(ctx, counters, op_names, profile_requests, seed)
+        finally:
+            counters.close()
+        print_profile(results['profile'])
+
+    results['scenarios'] = {}
+    for name in scenarios:
+        results['scenarios'][name] = run_scenario(ctx, SCENARIOS[name], duration, concurrency, seed)
+        print_scenario(name, results['scenarios'][name])
+
+    with open(RESULTS_PATH, 'w') as file:
+        json.dump(results, file, indent=2)
+    if save_baseline:
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(results, file, indent=2)
+        click.echo(f"\nSaved baseline to {BASELINE_PATH}")
+        return
+    if not os.path.exists(BASELINE_PATH):
+        click.echo('\nNo baseline yet; rerun with --save-baseline to store one')
+        return
+    with open(BASELINE_PATH, 'r') as file:
+        regressions = find_regressions(results, json.load(file))
+    if regressions:
+        click.echo('\nRegressions against the baseline:')
+        for regression in regressions:
+            click.echo(f"  {regression}")
+        raise SystemExit(1)
+    click.echo('\nNo regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Check the incrementally maintained rollup tables against a rebuild.
+
+Creates a scratch user with a weekly and a monthly budget and a savings goal,
+then drives every write path that maintains daily_rollups and budget_spend
+through the Flask app in-process: single inserts (categorized at once or
+deferred), CSV imports, deletes, and the deferred categorization worker
+moving rows out of 'Uncategorized'. Afterwards the user's maintained rows
+are snapshotted, rebuilt from transactions for that user only, and compared.
+Exits 1 on any difference.
+
+Uses the database configured in .env. Groq calls go to an in-process stub.
+"""
+import csv
+import io
+import os
+import random
+import secrets
+from datetime import date, timedelta
+
+import click
+
+STUB_PORT = 8091
+os.environ.setdefault('GROQ_API_KEY', 'benchmark')  # app.py refuses to start without one
+os.environ.setdefault('GROQ_BASE_URL', f'http://127.0.0.1:{STUB_PORT}')
+
+from app import (  # noqa: E402
+    app, acquire_db_connection, release_db_connection, issue_session_token, categorize_pending_batch,
+    rebuild_budget_spend, rebuild_daily_rollups
+)
+from benchmark.groq_stub import start_stub  # noqa: E402
+
+HISTORY_DAYS = 70  # Spans several weeks and at least two months
+DESCRIPTIONS = [
+    'Starbucks coffee', 'Whole Foods groceries', 'Uber ride', 'Netflix subscription', 'Electric bill',
+    'Salary deposit', 'Transfer to savings',
+    # Matched by no rule, so they reach Groq or wait for the deferred workers
+    'zq ref 4471 misc', 'POS 99812 terminal 7', 'wire ref k2 payment'
+]
+OPERATIONS = ['insert'] * 6 + ['delete'] * 2 + ['import', 'categorize']
+
+
+def make_user(conn):
+    """Insert a scratch user with budgets and a goal; returns (user_id, username, budget_ids, goal_id)."""
+    username = f"rollupcheck_{secrets.token_hex(4)}"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            'INSERT INTO users (username, email, password_hash, full_name, currency) VALUES (%s, %s, %s, %s, %s)',
+            (username, f"{username}@check.local", '!', 'Rollup check', 'USD')
+        )
+        user_id = cursor.lastrowid
+        budget_ids = []
+        for category, amount, period in [('Food', 400, 'monthly'), ('Transport', 80, 'weekly')]:
+            cursor.execute(
+                'INSERT INTO budgets (user_id, category, amount, period) VALUES (%s, %s, %s, %s)',
+                (user_id, category, amount, period)
+            )
+            budget_ids.append(cursor.lastrowid)
+        cursor.execute(
+            'INSERT INTO savings_goals (user_id, name, target_amount, current_amount, deadline) VALUES (%s, %s, %s, %s, %s)',
+            (user_id, 'Rollup check goal', 5000, 0, date.today() + timedelta(days=365))
+        )
+        goal_id = cursor.lastrowid
+    finally:
+        cursor.close()
+    conn.commit()
+    return user_id, username, budget_ids, goal_id
+
+
+def drop_user(conn, user_id):
+    """Delete the scratch user; the derived rows have no foreign keys, so they go first."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            'DELETE s FROM budget_spend s JOIN budgets b ON b.id = s.budget_id WHERE b.user_id = %s', (user_id,)
+        )
+        cursor.execute('DELETE FROM daily_rollups WHERE user_id = %s', (user_id,))
+        cursor.execute('DELETE FROM insight_generations WHERE user_id = %s', (user_id,))
+        cursor.execute('DELETE FROM users WHERE id = %s', (user_id,))
+    finally:
+        cursor.close()
+    conn.commit()
+
+
+def random_transaction(rnd, budget_ids, goal_id):
+    """(date, description, amount, budget_id, goal_id) for one transaction."""
+    day = date.today() - timedelta(days=rnd.randrange(HISTORY_DAYS))
+    description = rnd.choice(DESCRIPTIONS)
+    if rnd.random() < 0.25:
+        return day, description, round(rnd.uniform(10, 500), 2), None, rnd.choice([None, goal_id])
+    return day, description, -round(rnd.uniform(1, 120), 2), rnd.choice([None, *budget_ids]), None
+
+
+def snapshot(conn, user_id):
+    """The user's daily_rollups and budget_spend rows as {key: values} dicts."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            'SELECT day, category, budget_id, goal_id, income, expense, count FROM daily_rollups WHERE user_id = %s',
+            (user_id,)
+        )
+        # Rows netted to zero by deletes are left behind by the incremental path; the rebuild has none
+        rollups = {tuple(row[:4]): tuple(row[4:]) for row in cursor.fetchall() if any(row[4:])}
+        cursor.execute('''
+            SELECT s.budget_id, s.period_start, s.spent
+            FROM budget_spend s
+            JOIN budgets b ON b.id = s.budget_id
+            WHERE b.user_id = %s
+        ''', (user_id,))
+        spend = {tuple(row[:2]): row[2] for row in cursor.fetchall() if row[2] != 0}
+    finally:
+        cursor.close()
+    conn.commit()
+    return rollups, spend
+
+
+def diff(name, maintained, rebuilt):
+    """Print and count the keys whose values differ between the two snapshots."""
+    mismatches = 0
+    for key in sorted(set(maintained) | set(rebuilt), key=str):
+        if maintained.get(key) != rebuilt.get(key):
+            mismatches += 1
+            click.echo(f"  {name} {key}: maintained {maintained.get(key)}, rebuilt {rebuilt.get(key)}")
+    return mismatches
+
+
+def run_operations(client, conn, user_id, username, budget_ids, goal_id, count, rnd):
+    """Apply count random write operations; returns how many of each ran."""
+    headers = {'Authorization': f"Bearer {issue_session_token(user_id, username)}"}
+    counts = dict.fromkeys(OPERATIONS, 0)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for _ in range(count):
+            operation = rnd.choice(OPERATIONS)
+            if operation == 'insert':
+                day, description, amount, budget_id, goal = random_transaction(rnd, budget_ids, goal_id)
+                response = client.post('/transactions', headers=headers, json={
+                    'amount': amount, 'description': description, 'transaction_date': day.isoformat(),
+                    'budget_id': budget_id, 'goal_id': goal, 'defer': rnd.random() < 0.5
+                })
+            elif operation == 'delete':
+                cursor.execute('SELECT id FROM transactions WHERE user_id = %s', (user_id,))
+                ids = [row['id'] for row in cursor.fetchall()]
+                conn.commit()
+                if not ids:
+                    continue
+                response = client.delete(f"/transactions/{rnd.choice(ids)}", headers=headers)
+            elif operation == 'import':
+                body = io.StringIO()
+                writer = csv.writer(body)
+                writer.writerow(['date', 'description', 'amount', 'budget_id', 'goal_id'])
+                for _ in range(rnd.randint(1, 8)):
+                    day, description, amount, budget_id, goal = random_transaction(rnd, budget_ids, goal_id)
+                    writer.writerow([day.isoformat(), description, amount, budget_id or '', goal or ''])
+                defer = 'true' if rnd.random() < 0.5 else 'false'
+                response = client.post(
+                    f"/transactions/import?format=csv&defer={defer}", headers=headers, data=body.getvalue()
+                )
+            else:
+                cursor.execute('''
+                    SELECT id, user_id, description, amount, transaction_date, budget_id, goal_id
+                    FROM transactions WHERE user_id = %s AND ai_category IS NULL
+                ''', (user_id,))
+                rows = cursor.fetchall()
+                conn.commit()
+                if rows:
+                    categorize_pending_batch(rows)
+                counts[operation] += 1
+                continue
+            if response.status_code >= 400:
+                raise click.ClickException(f"{operation} failed: {response.status_code} {response.get_data(as_text=True)}")
+            counts[operation] += 1
+    finally:
+        cursor.close()
+    return counts
+
+
+@click.command()
+@click.option('--operations', default=300, show_default=True, help='Random write operations to apply.')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--keep-user', is_flag=True, help='Leave the scratch user in place for inspection.')
+def main(operations, seed, keep_user):
+    """Drive the write paths for a scratch user and compare its rollups with a rebuild."""
+    rnd = random.Random(seed)
+    stub = start_stub(port=STUB_PORT, latency=0.0, jitter=0.0)
+    conn = acquire_db_connection()
+    user_id = None
+    try:
+        user_id, username, budget_ids, goal_id = make_user(conn)
+        counts = run_operations(app.test_client(), conn, user_id, username, budget_ids, goal_id, operations, rnd)
+        click.echo(f"User {username} (id {user_id}): " + ', '.join(f"{n} {op}" for op, n in counts.items()))
+
+        maintained_rollups, maintained_spend = snapshot(conn, user_id)
+        rebuild_daily_rollups(conn, user_id)
+        rebuild_budget_spend(conn, user_id)
+        rebuilt_rollups, rebuilt_spend = snapshot(conn, user_id)
+
+        mismatches = diff('daily_rollups', maintained_rollups, rebuilt_rollups)
+        mismatches += diff('budget_spend', maintained_spend, rebuilt_spend)
+        click.echo(
+            f"{len(rebuilt_rollups)} daily_rollups rows, {len(rebuilt_spend)} budget_spend rows, {mismatches} mismatches"
+        )
+    finally:
+        if user_id and not keep_user:
+            drop_user(conn, user_id)
+        release_db_connection(conn)
+        stub.shutdown()
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
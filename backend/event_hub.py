@@ -0,0 +1,112 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+RESYNC = ('resync', {})  # Sent in place of events a slow subscriber missed
+
+
+class SubscriberLimitError(Exception):
+    """Raised when a user already has the maximum number of open streams."""
+
+
+class Subscription:
+    """One open event stream: a bounded queue of (event, data) pairs."""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+
+    def push(self, event, data):
+        try:
+            self.queue.put_nowait((event, data))
+        except queue.Full:
+            # The client fell behind: drop what is queued and ask it to refetch everything
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait(RESYNC)
+
+    def get(self, timeout):
+        """Next (event, data) pair, or None if nothing arrived within timeout seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """A subscription read from an event loop. push() may be called from any thread."""
+
+    def __init__(self, user_id, queue_size, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event, data):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event, data)
+        except RuntimeError:
+            pass  # The loop has shut down; the stream is gone
+
+    def _put(self, event, data):
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """In-process publish/subscribe of per-user events.
+
+    Only reaches streams served by this process. With several workers, swap
+    in a hub with the same subscribe/unsubscribe/publish methods backed by a
+    shared broker such as Redis pub/sub.
+    """
+
+    def __init__(self, max_per_user, queue_size=100):
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, loop=None):
+        """Open a stream; pass the running event loop for an AsyncSubscription."""
+        with self.lock:
+            if len(self.subscribers[user_id]) >= self.max_per_user:
+                raise SubscriberLimitError(f"At most {self.max_per_user} open streams per user")
+            if loop is None:
+                subscription = Subscription(user_id, self.queue_size)
+            else:
+                subscription = AsyncSubscription(user_id, self.queue_size, loop)
+            self.subscribers[user_id].add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            streams = self.subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id, event, data):
+        with self.lock:
+            streams = list(self.subscribers.get(user_id, ()))
+        for subscription in streams:
+            subscription.push(event, data)
+        return len(streams)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'users': len(self.subscribers),
+                'streams': sum(len(streams) for streams in self.subscribers.values())
+            }
@@ -0,0 +1,90 @@
+import functools
+import gzip
+import json
+
+from mysql.connector import FieldType
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this go out uncompressed; the headers would eat the saving
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# MySQL type -> converter for the JSON encoder; other types encode as they are
+CONVERTERS = {
+    FieldType.DECIMAL: str,
+    FieldType.NEWDECIMAL: str,
+    FieldType.DATE: lambda value: value.isoformat(),
+    FieldType.NEWDATE: lambda value: value.isoformat(),
+    FieldType.DATETIME: lambda value: value.isoformat(),
+    FieldType.TIMESTAMP: lambda value: value.isoformat(),
+    FieldType.TIME: str,
+}
+
+dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+class RowEncoder:
+    """Turns tuple rows of one query into JSON-ready lists or dicts.
+
+    Only the columns whose type needs converting are touched, and NULLs are
+    left alone. Decimals become strings, dates and datetimes ISO 8601.
+    """
+
+    def __init__(self, columns, type_codes):
+        self.columns = list(columns)
+        self.conversions = [
+            (position, CONVERTERS[type_code]) for position, type_code in enumerate(type_codes)
+            if type_code in CONVERTERS
+        ]
+
+    def row(self, row):
+        row = list(row)
+        for position, convert in self.conversions:
+            value = row[position]
+            if value is not None:
+                row[position] = convert(value)
+        return row
+
+    def rows(self, rows):
+        return [self.row(row) for row in rows]
+
+    def records(self, rows):
+        columns = self.columns
+        return [dict(zip(columns, self.row(row))) for row in rows]
+
+    def encode(self, rows, layout):
+        """'columns' gives {"columns": [...], "rows": [[...]]}; anything else a list of objects."""
+        if layout == 'columns':
+            return {'columns': self.columns, 'rows': self.rows(rows)}
+        return self.records(rows)
+
+
+@functools.lru_cache(maxsize=256)
+def compiled_encoder(columns, type_codes):
+    return RowEncoder(columns, type_codes)
+
+
+def row_encoder(description):
+    """The RowEncoder for a cursor.description, compiled once per column layout."""
+    return compiled_encoder(tuple(column[0] for column in description), tuple(column[1] for column in description))
+
+
+def choose_encoding(accept_encodings):
+    """Pick 'br', 'gzip' or None from a werkzeug Accept-Encoding header."""
+    if brotli is not None and accept_encodings.quality('br'):
+        return 'br'
+    if accept_encodings.quality('gzip'):
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output byte-identical for the same body, so ETags hold
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
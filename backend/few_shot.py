@@ -0,0 +1,119 @@
+import math
+import re
+from collections import defaultdict
+
+from rule_matcher import parse_prompt_examples
+
+SHINGLE_SIZE = 3
+WORD_RE = re.compile(r'[a-z0-9&]+')
+QUOTED_RE = re.compile(r'"([^"]*)"')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character n-grams of the lowercased words, padded so a short word still
+    yields some, plus the words themselves so a whole-word match counts extra."""
+    words = WORD_RE.findall(text.lower())
+    normalized = f" {' '.join(words)} "
+    grams = {f"#{word}" for word in words}
+    grams.update(normalized[i:i + size] for i in range(max(1, len(normalized) - size + 1)))
+    return grams
+
+
+def prompt_instructions(prompt_text):
+    """The categorization prompt without its example list.
+
+    categorization_prompt.txt is written as a parenthesized run of string
+    literals; their text is joined before the 'Examples:' marker is cut off.
+    """
+    text = prompt_text.strip()
+    if text.startswith(('(', '"')):
+        text = ''.join(QUOTED_RE.findall(text))
+    return text.split('Examples:', 1)[0].strip()
+
+
+def build_prompt(instructions, examples):
+    """A system prompt holding only the given ('phrase', 'Category') examples."""
+    if not examples:
+        return instructions
+    return f"{instructions} Examples: " + ', '.join(f"'{phrase}' → {category}" for phrase, category in examples)
+
+
+class ExampleIndex:
+    """Inverted index from character shingles to labelled example phrases.
+
+    nearest() ranks the examples sharing a shingle with a description by cosine
+    similarity over IDF-weighted shingle sets, so 'STARBUCKS #1234' finds
+    'starbucks' and 'uber eats order' finds 'ubereats', while shingles as
+    common as 'ion' count for little. The first example added per category is
+    kept as that category's anchor.
+    """
+
+    def __init__(self):
+        self.examples = []
+        self.shingle_sets = []
+        self.postings = defaultdict(list)
+        self.anchors = {}
+        self.phrases = set()
+        self.weighted = None  # (idf, norms), computed on the first lookup after an add
+
+    def __len__(self):
+        return len(self.examples)
+
+    def add(self, phrase, category):
+        key = ' '.join(WORD_RE.findall(phrase.lower()))
+        if not key or key in self.phrases:
+            return
+        self.phrases.add(key)
+        position = len(self.examples)
+        grams = shingles(phrase)
+        self.examples.append((phrase, category))
+        self.shingle_sets.append(grams)
+        for gram in grams:
+            self.postings[gram].append(position)
+        self.anchors.setdefault(category, position)
+        self.weighted = None
+
+    def weights(self):
+        if self.weighted is None:
+            count = len(self.examples)
+            idf = {gram: math.log((count + 1) / len(positions)) for gram, positions in self.postings.items()}
+            norms = [math.sqrt(sum(idf[gram] ** 2 for gram in grams)) or 1.0 for grams in self.shingle_sets]
+            self.weighted = (idf, norms)
+        return self.weighted
+
+    def nearest(self, description, k):
+        """Positions of the k examples most similar to the description, best first."""
+        idf, norms = self.weights()
+        scores = defaultdict(float)
+        for gram in shingles(description):
+            weight = idf.get(gram)
+            if weight:
+                for position in self.postings[gram]:
+                    scores[position] += weight * weight
+        # The description's own norm is the same for every example, so it doesn't change the order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1] / norms[item[0]], item[0]))
+        return [position for position, _ in ranked[:k]]
+
+    def select(self, descriptions, k):
+        """Examples for one prompt: every category's anchor, then the k nearest to
+        each description, most similar last so they sit next to the question."""
+        chosen = list(self.anchors.values())
+        seen = set(chosen)
+        for description in descriptions:
+            for position in reversed(self.nearest(description, k)):
+                if position in seen:
+                    chosen.remove(position)  # Move it down, next to its neighbours
+                chosen.append(position)
+                seen.add(position)
+        return [self.examples[position] for position in chosen]
+
+
+def build_example_index(prompt_text, extra_examples=()):
+    """Index the prompt's examples, then any extra ('phrase', 'Category') pairs."""
+    index = ExampleIndex()
+    for phrase, category in parse_prompt_examples(prompt_text):
+        index.add(phrase, category)
+    for phrase, category in extra_examples:
+        index.add(phrase, category)
+    index.weights()
+    return index
@@ -0,0 +1,359 @@
+import asyncio
+import random
+import threading
+import time
+from collections import namedtuple
+
+import groq
+
+# Per call site: seconds allowed per attempt, and retries after the first attempt
+CallSite = namedtuple('CallSite', ['timeout', 'retries'])
+
+# Failures that say Groq is unhealthy. They are retried and count against the
+# breaker; any other error (a rejected request) is returned to the caller as is.
+RETRYABLE_ERRORS = (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+
+RETRY_BACKOFF_BASE = 0.25  # seconds
+RETRY_BACKOFF_CAP = 4.0
+MAX_TRACKED_USERS = 10000
+
+METRIC_NAMES = [
+    'requests', 'successes', 'errors', 'timeouts', 'retries',
+    'rejected_circuit', 'rejected_quota', 'rejected_busy', 'latency_total', 'latency_max',
+    'prompt_tokens', 'completion_tokens'
+]
+
+
+class LLMUnavailable(Exception):
+    """Raised instead of calling Groq, so the caller can fall back at once."""
+
+
+def chunk_usage(chunk):
+    """Token usage from a stream chunk; Groq sends it in x_groq on the final chunk."""
+    x_groq = getattr(chunk, 'x_groq', None)
+    return getattr(chunk, 'usage', None) or getattr(x_groq, 'usage', None)
+
+
+def retry_delay(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails fast for
+    reset_timeout seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        """True while calls should fail fast, without claiming the half-open trial."""
+        with self.lock:
+            return self.opened_at is not None and (
+                time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight
+            )
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        self.refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class LLMGateway:
+    """The one way to call Groq.
+
+    Every call names its call site, which sets its timeout and retries.
+    Calls are bounded by a global concurrency limit and a per-user token
+    bucket, and a shared circuit breaker fails them fast while Groq is down.
+    Metrics are kept per call site, and on_call(site, seconds, usage) is run
+    after each successful call. Raises LLMUnavailable when a call is refused,
+    or the last Groq error once the retries run out.
+    """
+
+    def __init__(self, client, model, sites, max_concurrency, queue_timeout, user_rate, user_burst, breaker,
+                 on_call=None):
+        self.client = client.with_options(max_retries=0)  # Retries happen here, where the breaker sees them
+        self.model = model
+        self.sites = sites
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.breaker = breaker
+        self.on_call = on_call
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.buckets = {}
+        self.in_flight = 0
+        self.metrics = {site: dict.fromkeys(METRIC_NAMES, 0) for site in sites}
+        self.lock = threading.Lock()
+
+    def count(self, site, name, amount=1):
+        with self.lock:
+            self.metrics[site][name] += amount
+
+    def observe(self, site, seconds, usage):
+        with self.lock:
+            metrics = self.metrics[site]
+            metrics['successes'] += 1
+            metrics['latency_total'] += seconds
+            metrics['latency_max'] = max(metrics['latency_max'], seconds)
+            if usage is not None:
+                metrics['prompt_tokens'] += usage.prompt_tokens or 0
+                metrics['completion_tokens'] += usage.completion_tokens or 0
+        if self.on_call is not None:
+            self.on_call(site, seconds, usage)
+
+    def take_user_token(self, user_id):
+        with self.lock:
+            bucket = self.buckets.get(user_id)
+            if bucket is None:
+                if len(self.buckets) >= MAX_TRACKED_USERS:
+                    # Forget users whose buckets have refilled; they lose nothing
+                    for idle_user, idle_bucket in list(self.buckets.items()):
+                        idle_bucket.refill()
+                        if idle_bucket.tokens >= idle_bucket.burst:
+                            del self.buckets[idle_user]
+                bucket = self.buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+            return bucket.take()
+
+    def check_admission(self, site, user_id):
+        """Refuse a call up front when the breaker is open or the user is over quota."""
+        self.count(site, 'requests')
+        if self.breaker.is_open():
+            self.count(site, 'rejected_circuit')
+            raise LLMUnavailable('Groq circuit breaker is open')
+        if user_id is not None and not self.take_user_token(user_id):
+            self.count(site, 'rejected_quota')
+            raise LLMUnavailable('LLM quota exceeded for this user')
+
+    def track_in_flight(self, delta):
+        with self.lock:
+            self.in_flight += delta
+
+    def attempt_failed(self, site, config, attempt, error):
+        """Record a failed attempt. Returns the seconds to wait before retrying, or None to give up."""
+        if not isinstance(error, RETRYABLE_ERRORS):
+            self.breaker.record_success()  # Groq answered; the request itself was refused
+            self.count(site, 'errors')
+            return None
+        self.breaker.record_failure()
+        self.count(site, 'timeouts' if isinstance(error, groq.APITimeoutError) else 'errors')
+        if attempt >= config.retries:
+            return None
+        self.count(site, 'retries')
+        return retry_delay(attempt + 1)
+
+    def claim_attempt(self, site):
+        if not self.breaker.allow():
+            self.count(site, 'rejected_circuit')
+            raise LLMUnavailable('Groq circuit breaker is open')
+
+    def acquire_slot(self, site):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            self.count(site, 'rejected_busy')
+            raise LLMUnavailable('Too many LLM calls in flight')
+        self.track_in_flight(1)
+
+    def release_slot(self):
+        self.track_in_flight(-1)
+        self.slots.release()
+
+    def create(self, site, user_id, **kwargs):
+        """Call chat.completions.create with admission, retries and the breaker around it.
+
+        On success the caller holds a concurrency slot and must release_slot().
+        """
+        config = self.sites[site]
+        self.check_admission(site, user_id)
+        self.acquire_slot(site)
+        try:
+            attempt = 0
+            while True:
+                self.claim_attempt(site)
+                try:
+                    response = self.client.chat.completions.create(model=self.model, timeout=config.timeout, **kwargs)
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    delay = self.attempt_failed(site, config, attempt, e)
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    time.sleep(delay)
+        except BaseException:
+            self.release_slot()
+            raise
+
+    def complete(self, site, messages, max_tokens, temperature, user_id=None):
+        """Return the completion text."""
+        started = time.monotonic()
+        response = self.create(site, user_id, messages=messages, max_tokens=max_tokens, temperature=temperature)
+        self.release_slot()
+        self.observe(site, time.monotonic() - started, response.usage)
+        return response.choices[0].message.content
+
+    def stream(self, site, messages, max_tokens, temperature, user_id=None):
+        """Yield text deltas. Only opening the stream is retried; a failure mid-stream ends it."""
+        started = time.monotonic()
+        stream = self.create(site, user_id, messages=messages, max_tokens=max_tokens, temperature=temperature, stream=True)
+        usage = None
+        try:
+            for chunk in stream:
+                usage = chunk_usage(chunk) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except RETRYABLE_ERRORS:
+            self.breaker.record_failure()
+            self.count(site, 'errors')
+            raise
+        finally:
+            self.release_slot()
+        self.observe(site, time.monotonic() - started, usage)
+
+    def stats(self):
+        with self.lock:
+            sites = {}
+            for site, metrics in self.metrics.items():
+                site_stats = dict(metrics)
+                site_stats['latency_avg'] = metrics['latency_total'] / metrics['successes'] if metrics['successes'] else 0.0
+                sites[site] = site_stats
+            in_flight = self.in_flight
+            tracked_users = len(self.buckets)
+        return {
+            'circuit': self.breaker.state(),
+            'in_flight': in_flight,
+            'max_concurrency': self.max_concurrency,
+            'tracked_users': tracked_users,
+            'sites': sites
+        }
+
+
+class AsyncLLMGateway:
+    """LLMGateway for an event loop, over an AsyncGroq client.
+
+    Shares the breaker, quotas and metrics of a sync gateway, so both serving
+    modes see one picture of Groq's health; only the concurrency slots are its own.
+    """
+
+    def __init__(self, client, gateway):
+        self.client = client.with_options(max_retries=0)
+        self.gateway = gateway
+        self.slots = None  # Created on the running loop
+
+    async def acquire_slot(self, site):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.gateway.max_concurrency)
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.gateway.queue_timeout)
+        except asyncio.TimeoutError:
+            self.gateway.count(site, 'rejected_busy')
+            raise LLMUnavailable('Too many LLM calls in flight')
+        self.gateway.track_in_flight(1)
+
+    def release_slot(self):
+        self.gateway.track_in_flight(-1)
+        self.slots.release()
+
+    async def create(self, site, user_id, **kwargs):
+        gateway = self.gateway
+        config = gateway.sites[site]
+        gateway.check_admission(site, user_id)
+        await self.acquire_slot(site)
+        try:
+            attempt = 0
+            while True:
+                gateway.claim_attempt(site)
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=gateway.model, timeout=config.timeout, **kwargs
+                    )
+                    gateway.breaker.record_success()
+                    return response
+                except Exception as e:
+                    delay = gateway.attempt_failed(site, config, attempt, e)
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        except BaseException:
+            self.release_slot()
+            raise
+
+    async def complete(self, site, messages, max_tokens, temperature, user_id=None):
+        started = time.monotonic()
+        response = await self.create(site, user_id, messages=messages, max_tokens=max_tokens, temperature=temperature)
+        self.release_slot()
+        self.gateway.observe(site, time.monotonic() - started, response.usage)
+        return response.choices[0].message.content
+
+    async def stream(self, site, messages, max_tokens, temperature, user_id=None):
+        started = time.monotonic()
+        stream = await self.create(
+            site, user_id, messages=messages, max_tokens=max_tokens, temperature=temperature, stream=True
+        )
+        usage = None
+        try:
+            async for chunk in stream:
+                usage = chunk_usage(chunk) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except RETRYABLE_ERRORS:
+            self.gateway.breaker.record_failure()
+            self.gateway.count(site, 'errors')
+            raise
+        finally:
+            self.release_slot()
+        self.gateway.observe(site, time.monotonic() - started, usage)
@@ -0,0 +1,198 @@
+import bisect
+import contextvars
+import threading
+import time
+
+# Seconds. The tail reaches past the LLM timeouts.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    def __init__(self, name, help_text, labelnames, kind):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames, 'counter')
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [
+            f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Metric):
+    """A value read at scrape time from read(), which returns {labels: value}."""
+
+    def __init__(self, name, help_text, labelnames=(), read=None):
+        super().__init__(name, help_text, labelnames, 'gauge')
+        self.read = read
+
+    def render(self):
+        items = sorted(self.read().items())
+        return self.header() + [
+            f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}" for labels, value in items
+        ]
+
+
+class Histogram(Metric):
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames, 'histogram')
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                # Per-bucket counts (not cumulative) with +Inf last, then the sum
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def render(self):
+        with self.lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self.values.items())
+        lines = self.header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                le = (('le', format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics in registration order, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# The RequestStats of the request being handled. A context variable rather
+# than flask.g, so the ASGI app's requests are covered too.
+current_request = contextvars.ContextVar('current_request', default=None)
+
+
+class RequestStats:
+    """Where one request spent its time, for the metrics and the Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.db_connections = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.labels = None  # (route, method) once recorded; later work is recorded as it happens
+
+    def server_timing(self, total):
+        app_seconds = max(0.0, total - self.db_seconds - self.llm_seconds)
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'llm;dur={self.llm_seconds * 1000:.1f};desc="{self.llm_calls} calls"',
+            f'app;dur={app_seconds * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}'
+        ])
+
+
+class TimedCursor:
+    """Cursor proxy that reports the time spent in each call that talks to MySQL."""
+
+    TIMED = frozenset(['execute', 'executemany', 'callproc', 'fetchone', 'fetchmany', 'fetchall'])
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        if name not in self.TIMED:
+            return attribute
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self._on_query(time.perf_counter() - started, name.startswith('exec') or name == 'callproc')
+        return timed
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+
+class TimedConnection:
+    """Connection proxy whose cursors, commits and rollbacks report to on_query(seconds, is_statement)."""
+
+    def __init__(self, conn, on_query):
+        self._conn = conn
+        self._on_query = on_query
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs), self._on_query)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            self._on_query(time.perf_counter() - started, True)
+
+    def rollback(self):
+        started = time.perf_counter()
+        try:
+            self._conn.rollback()
+        finally:
+            self._on_query(time.perf_counter() - started, True)
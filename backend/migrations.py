@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+LOCK_NAME = 'budget_app.schema_migrations'
+
+
+class MigrationError(Exception):
+    pass
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Read NNNN_name.sql files as (version, name, sql, checksum), in version order."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'r') as file:
+            sql = file.read()
+        migrations.append((int(match.group(1)), match.group(2), sql, hashlib.sha256(sql.encode('utf-8')).hexdigest()))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError('Two migration files share a version number')
+    return migrations
+
+
+def split_statements(sql):
+    """Split a migration into statements. Statements end with ';' at the end of a line."""
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        if line.strip().startswith('--'):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if '\n'.join(current).strip():
+        raise MigrationError('Migration ends without a terminating ;')
+    return statements
+
+
+def applied_migrations(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT version, checksum FROM schema_migrations')
+    return dict(cursor.fetchall())
+
+
+def migrate(conn, directory=MIGRATIONS_DIR, dry_run=False, log=print):
+    """Apply pending migrations in version order and return the versions applied.
+
+    MySQL commits DDL implicitly, so a failed migration is not rolled back; it
+    is left unrecorded and runs again from the top next time. That is why the
+    migrations use IF NOT EXISTS where they can, and otherwise hold a single
+    DDL statement, last, after only statements that are safe to repeat. A
+    named lock keeps two processes from migrating at once.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT GET_LOCK(%s, 30)', (LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            raise MigrationError('Another process is running migrations')
+        try:
+            applied = applied_migrations(cursor)
+            done = []
+            for version, name, sql, checksum in load_migrations(directory):
+                if version in applied:
+                    if applied[version] != checksum:
+                        log(f"warning: migration {version:04d}_{name} was edited after it was applied")
+                    continue
+                log(f"{'Would apply' if dry_run else 'Applying'} {version:04d}_{name}")
+                if dry_run:
+                    done.append(version)
+                    continue
+                for statement in split_statements(sql):
+                    cursor.execute(statement)
+                cursor.execute(
+                    'INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)',
+                    (version, name, checksum)
+                )
+                conn.commit()
+                done.append(version)
+            return done
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
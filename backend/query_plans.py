@@ -0,0 +1,121 @@
+import ast
+import re
+
+SQL_RE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT)\s')
+PLACEHOLDER = '%s'
+
+# Sample values for EXPLAIN. Comparing a string column with a number defeats
+# its index, so text columns get a quoted value.
+DATE_COLUMN_RE = re.compile(r'(date|day|period_start|last_login|last_budget_check|deadline)$')
+TEXT_COLUMNS = {
+    'username', 'email', 'category', 'ai_category', 'name', 'description', 'description_key',
+    'prompt_version', 'period', 'type', 'message'
+}
+# The column a placeholder is compared with: "t.user_id = %s", "id IN (%s", ...
+COMPARED_COLUMN_RE = re.compile(r'([A-Za-z_][\w.]*)\s*(?:=|!=|<=|>=|<|>|\bIN\s*\(|\bBETWEEN\b)', re.IGNORECASE)
+
+
+class StatementCollector(ast.NodeVisitor):
+    """Collect SQL string literals with the function each appears in.
+
+    f-strings are rendered for EXPLAIN: an interpolation holding a placeholder
+    template (e.g. ', '.join(['%s'] * n)) becomes that template once, and any
+    other interpolation (optional filters, ORDER direction) becomes ''.
+    """
+
+    def __init__(self):
+        self.function = '<module>'
+        self.statements = []
+
+    def visit_FunctionDef(self, node):
+        outer = self.function
+        self.function = node.name
+        self.generic_visit(node)
+        self.function = outer
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and SQL_RE.match(node.value):
+            self.statements.append((self.function, node.lineno, node.value))
+
+    def visit_JoinedStr(self, node):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+                continue
+            templates = [
+                n.value for n in ast.walk(value.value)
+                if isinstance(n, ast.Constant) and isinstance(n.value, str) and PLACEHOLDER in n.value
+            ]
+            parts.append(templates[0] if templates else '')
+        sql = ''.join(parts)
+        if SQL_RE.match(sql):
+            self.statements.append((self.function, node.lineno, sql))
+
+
+def extract_statements(path):
+    """Return (function, line, sql) for every SQL statement written in a module."""
+    with open(path, 'r') as file:
+        tree = ast.parse(file.read(), path)
+    collector = StatementCollector()
+    collector.visit(tree)
+    return collector.statements
+
+
+def sample_value(preceding):
+    """Pick a literal for a placeholder from the column it is compared with."""
+    if re.search(r'\blimit\s*$', preceding, re.IGNORECASE):
+        return '10'
+    columns = COMPARED_COLUMN_RE.findall(preceding)
+    column = columns[-1].split('.')[-1].lower() if columns else ''
+    if DATE_COLUMN_RE.search(column):
+        return "'2024-01-15'"
+    if column in TEXT_COLUMNS:
+        return "'sample'"
+    return '1'
+
+
+def fill_placeholders(sql):
+    parts = sql.split(PLACEHOLDER)
+    filled = parts[0]
+    for part in parts[1:]:
+        filled += sample_value(filled) + part
+    return filled
+
+
+def check_query_plans(conn, path, full_scan_ok=()):
+    """EXPLAIN every statement in a module and collect the table scans.
+
+    A statement fails when some table is read with type ALL and no usable
+    index at all. A scan the optimizer chose despite a usable index (common
+    on small tables) is only a warning. Statements in functions listed in
+    full_scan_ok (backfills, admin commands) are expected to scan. A statement
+    EXPLAIN rejects (e.g. a column missing from the schema) also fails.
+    Returns (failures, warnings) as lists of (function, line, detail).
+    """
+    failures, warnings = [], []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for function, line, sql in extract_statements(path):
+            if function in full_scan_ok:
+                continue
+            if sql.lstrip().upper().startswith('INSERT') and 'SELECT' not in sql.upper():
+                continue  # INSERT ... VALUES reads no table
+            try:
+                cursor.execute('EXPLAIN ' + fill_placeholders(sql))
+                plan = cursor.fetchall()
+            except Exception as e:
+                failures.append((function, line, f"EXPLAIN failed: {str(e)}"))
+                continue
+            for row in plan:
+                if row.get('type') != 'ALL' or not row.get('table') or row['table'].startswith('<'):
+                    continue
+                detail = f"full scan of {row['table']}"
+                if row.get('possible_keys'):
+                    warnings.append((function, line, f"{detail} (usable: {row['possible_keys']})"))
+                else:
+                    failures.append((function, line, f"{detail} (no usable index)"))
+    finally:
+        cursor.close()
+        conn.rollback()
+    return failures, warnings
@@ -0,0 +1,99 @@
+import re
+
+# Weights for the two rule sources. Prompt examples are specific merchants and
+# phrases, while the keyword lists are broad words like 'car' or 'game'.
+EXAMPLE_WEIGHT = 0.9
+KEYWORD_WEIGHT = 0.7
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+EXAMPLE_RE = re.compile(r"'([^']+)' → (\w+)")
+TERMINAL = '$'  # Tokens are alphanumeric, so this key never collides with one
+
+
+def tokenize(text):
+    """Split text into lowercase tokens, folding simple plurals ('shoes' -> 'shoe')."""
+    return [t[:-1] if len(t) > 3 and t.endswith('s') else t for t in TOKEN_RE.findall(text.lower())]
+
+
+def parse_prompt_examples(prompt_text):
+    """Extract the ('phrase', 'Category') pairs from the categorization prompt."""
+    return EXAMPLE_RE.findall(prompt_text)
+
+
+class CategoryMatcher:
+    """Token trie mapping known phrases to categories.
+
+    match() walks the description once, taking the longest phrase at each
+    position, and returns the winning category with a confidence in [0, 1].
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, phrase, category, weight):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # Keep the first rule added for a phrase so prompt examples win over keywords
+        if TERMINAL not in node:
+            node[TERMINAL] = (category, weight)
+            self.size += 1
+
+    def match(self, description):
+        tokens = tokenize(description)
+        words = [t for t in tokens if not t.isdigit()]
+        if not words:
+            return None, 0.0
+
+        scores = {}
+        matched = 0
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if TERMINAL in node:
+                    best = (j, node[TERMINAL])
+            if best is None:
+                i += 1
+                continue
+            end, (category, weight) = best
+            length = end - i
+            # Multi-word phrases are more specific than single words
+            weight = min(1.0, weight + 0.05 * (length - 1))
+            scores[category] = max(scores.get(category, 0.0), weight)
+            matched += length
+            i = end
+
+        if not scores:
+            return None, 0.0
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        category, confidence = ranked[0]
+        if len(ranked) > 1:
+            # Competing categories: scale down by the runner-up's share
+            runner_up = ranked[1][1]
+            confidence *= 1 - runner_up / (confidence + runner_up)
+        elif matched >= len(words):
+            # The whole description is a known phrase
+            confidence = max(confidence, 0.95)
+        confidence *= 0.75 + 0.25 * min(1.0, matched / len(words))
+        return category, round(confidence, 3)
+
+
+def build_matcher(prompt_text, keyword_rules):
+    """Compile prompt examples and {category: [keywords]} rules into one matcher."""
+    matcher = CategoryMatcher()
+    for phrase, category in parse_prompt_examples(prompt_text):
+        matcher.add(phrase, category, EXAMPLE_WEIGHT)
+    for category, keywords in keyword_rules.items():
+        for keyword in keywords:
+            matcher.add(keyword, category, KEYWORD_WEIGHT)
+    return matcher
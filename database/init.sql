@@ -1,12 +1,6 @@
-CREATE DATABASE budget_app;
+CREATE DATABASE IF NOT EXISTS budget_app;
 USE budget_app;
 
-CREATE TABLE users (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    username VARCHAR(50) UNIQUE NOT NULL,
-    email VARCHAR(100) UNIQUE NOT NULL,
-    password_hash VARCHAR(255) NOT NULL,
-    full_name VARCHAR(100),
-    currency VARCHAR(10) DEFAULT 'USD',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+-- Tables and indexes are created by the versioned migrations in
+-- database/migrations. From backend/, run:
+--   flask --app app migrate
@@ -0,0 +1,49 @@
+-- Caches and maintained aggregates. Everything here can be rebuilt from the
+-- core tables.
+
+-- Categories returned by Groq, keyed on the normalized description and the
+-- hash of categorization_prompt.txt that produced them
+CREATE TABLE IF NOT EXISTS category_cache (
+    description_key VARCHAR(255) NOT NULL,
+    prompt_version CHAR(16) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (description_key, prompt_version)
+);
+
+-- Spend per budget per period (period_start is the 1st of the month or the
+-- Monday of the week), maintained on transaction insert and delete.
+-- Rebuild with: flask --app app rebuild-budget-spend
+CREATE TABLE IF NOT EXISTS budget_spend (
+    budget_id INT NOT NULL,
+    period_start DATE NOT NULL,
+    spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (budget_id, period_start)
+);
+
+-- Per-user daily totals backing /transaction-report. budget_id and goal_id
+-- use 0 for "none" so they can be part of the key; category is
+-- 'Uncategorized' until a category is assigned.
+-- Backfill with: flask --app app rebuild-daily-rollups
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    budget_id INT NOT NULL DEFAULT 0,
+    goal_id INT NOT NULL DEFAULT 0,
+    income DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    expense DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, category, budget_id, goal_id)
+);
+
+-- Optional shared tier for generated report insights (INSIGHT_CACHE_DB=true)
+CREATE TABLE IF NOT EXISTS insight_cache (
+    user_id INT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    report_hash CHAR(64) NOT NULL,
+    insights TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, start_date, end_date)
+);
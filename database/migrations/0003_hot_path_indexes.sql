@@ -0,0 +1,17 @@
+-- Composite indexes matched to the queries in backend/app.py. InnoDB appends
+-- the primary key to every secondary index, so (user_id, transaction_date)
+-- also serves ORDER BY transaction_date DESC, id DESC keyset pages.
+--
+-- MySQL has no ADD INDEX IF NOT EXISTS, so each index migration is a single
+-- ALTER TABLE: DDL is atomic, and a failed one leaves nothing behind to
+-- collide with when the migration is rerun.
+--
+-- idx_transactions_user_date: GET /transactions pages, report ranges,
+--   first-transaction checks
+-- idx_transactions_budget_amount: budget spend rebuilds and per-budget spend sums
+-- idx_transactions_ai_category: deferred categorization scans
+--   WHERE ai_category IS NULL ORDER BY id
+ALTER TABLE transactions
+    ADD INDEX idx_transactions_user_date (user_id, transaction_date),
+    ADD INDEX idx_transactions_budget_amount (budget_id, amount),
+    ADD INDEX idx_transactions_ai_category (ai_category);
@@ -0,0 +1,9 @@
+-- idx_notifications_user_id: notification history and since_id polling page
+--   on (user_id, id). id order is insertion order, so this is the created_at
+--   order as well.
+-- idx_notifications_user_unread: unread lists and the unread count
+--
+-- One ALTER TABLE, so a rerun after a failure starts clean (see 0003).
+ALTER TABLE notifications
+    ADD INDEX idx_notifications_user_id (user_id, id),
+    ADD INDEX idx_notifications_user_unread (user_id, is_read, id);
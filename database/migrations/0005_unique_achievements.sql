@@ -0,0 +1,8 @@
+-- One row per achievement per user; the duplicate check becomes a unique probe.
+-- Earlier duplicates would make the unique index fail, so keep the first
+-- award of each and drop the rest. Rerunning the DELETE is harmless.
+DELETE later FROM achievements later
+JOIN achievements earlier
+    ON earlier.user_id = later.user_id AND earlier.name = later.name AND earlier.id < later.id;
+
+ALTER TABLE achievements ADD UNIQUE INDEX uq_achievements_user_name (user_id, name);
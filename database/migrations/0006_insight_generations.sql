@@ -0,0 +1,8 @@
+-- Per-user write generation for cached report insights. Every transaction,
+-- budget or goal write bumps it in the same transaction; insights cached
+-- under an older generation are stale in every process.
+-- No row means generation 0.
+CREATE TABLE IF NOT EXISTS insight_generations (
+    user_id INT NOT NULL PRIMARY KEY,
+    generation INT NOT NULL DEFAULT 0
+);
@@ -0,0 +1,8 @@
+// Session token from POST /login, sent as a Bearer token on every API request.
+export const authHeaders = () => ({ Authorization: `Bearer ${localStorage.getItem('token')}` });
+
+export const clearSession = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('username');
+  localStorage.removeItem('user_id');
+};
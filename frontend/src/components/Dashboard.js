@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Box,
   VStack,
@@ -32,6 +32,8 @@ import {
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { useToast } from '@chakra-ui/toast';
+import { readEventStream, throwIfFailed } from '../eventStream';
+import { authHeaders, clearSession } from '../auth';
 
 const Dashboard = () => {
   const navigate = useNavigate();
@@ -42,6 +44,8 @@ const Dashboard = () => {
   const [budgets, setBudgets] = useState([]);
   const [achievements, setAchievements] = useState([]);
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const latestNotificationId = useRef(0);
   const [goalForm, setGoalForm] = useState({
     name: '',
     target_amount: '',
@@ -61,42 +65,42 @@ const Dashboard = () => {
     CheckIcon,
   };
 
-  // Fetch savings goals, budgets, achievements, and notifications
+  // Load the dashboard, then keep it current from the server's push stream
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        // Fetch goals
-        const goalsResponse = await axios.get('http://localhost:5001/savings-goals', {
-          headers: { 'X-Username': username },
-        });
-        const formattedGoals = goalsResponse.data.goals.map(goal => ({
-          ...goal,
-          target_amount: parseFloat(goal.target_amount),
-          current_amount: parseFloat(goal.current_amount),
-        }));
-        setGoals(formattedGoals);
-
-        // Fetch budgets
-        const budgetsResponse = await axios.get('http://localhost:5001/budgets', {
-          headers: { 'X-Username': username },
-        });
-        setBudgets(budgetsResponse.data.budgets.map(b => ({
-          ...b,
-          budget_amount: parseFloat(b.budget_amount),
-          spent_amount: parseFloat(b.spent_amount),
-        })));
+    const dashboardFields = ['goals', 'budgets', 'achievements', 'notifications'];
 
-        // Fetch achievements
-        const achievementsResponse = await axios.get('http://localhost:5001/achievements', {
-          headers: { 'X-Username': username },
-        });
-        setAchievements(achievementsResponse.data.achievements);
-
-        // Fetch notifications
-        const notificationsResponse = await axios.get('http://localhost:5001/notifications', {
-          headers: { 'X-Username': username },
+    // Refetch, in one request, the sections a 'changed' event names that this page shows
+    const refetch = async (resources) => {
+      const fields = dashboardFields.filter(f => resources.includes(f));
+      if (fields.length === 0) return;
+      try {
+        const response = await axios.get('http://localhost:5001/dashboard', {
+          headers: authHeaders(),
+          params: { fields: fields.join(',') },
         });
-        setNotifications(notificationsResponse.data.notifications);
+        const data = response.data;
+        if (data.goals) {
+          setGoals(data.goals.map(goal => ({
+            ...goal,
+            target_amount: parseFloat(goal.target_amount),
+            current_amount: parseFloat(goal.current_amount),
+          })));
+        }
+        if (data.budgets) {
+          setBudgets(data.budgets.map(b => ({
+            ...b,
+            budget_amount: parseFloat(b.budget_amount),
+            spent_amount: parseFloat(b.spent_amount),
+          })));
+        }
+        if (data.achievements) {
+          setAchievements(data.achievements);
+        }
+        if (data.notifications) {
+          setNotifications(data.notifications);
+          setUnreadCount(data.unread_count);
+          latestNotificationId.current = data.latest_id;
+        }
       } catch (error) {
         toast({
           title: 'Error',
@@ -107,13 +111,70 @@ const Dashboard = () => {
         });
       }
     };
-    fetchData();
+    const refetchAll = () => refetch(dashboardFields);
+
+    const controller = new AbortController();
+    let retryTimer = null;
+    const connect = async () => {
+      let retryDelay = 3000;
+      try {
+        const response = await fetch('http://localhost:5001/events', {
+          headers: authHeaders(),
+          signal: controller.signal,
+        });
+        await throwIfFailed(response, 'Failed to open event stream.');
+        await readEventStream(response, (event, data) => {
+          if (event === 'ready' || event === 'resync') {
+            // Loaded after subscribing, so nothing written in between is missed
+            refetchAll();
+          } else if (event === 'notification') {
+            if (data.id > latestNotificationId.current) {
+              latestNotificationId.current = data.id;
+              setNotifications(prev => [data, ...prev]);
+              setUnreadCount(prev => prev + 1);
+            }
+          } else if (event === 'changed') {
+            refetch(data.resources);
+          }
+        });
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        // No stream (e.g. too many open tabs): show current data and try again later
+        refetchAll();
+        retryDelay = 30000;
+      }
+      if (!controller.signal.aborted) {
+        retryTimer = setTimeout(connect, retryDelay);
+      }
+    };
 
-    // Poll for new notifications every 10 seconds
-    const interval = setInterval(fetchData, 10000);
-    return () => clearInterval(interval);
+    connect();
+    return () => {
+      controller.abort();
+      clearTimeout(retryTimer);
+    };
   }, [username, toast]);
 
+  const handleMarkAllRead = async () => {
+    try {
+      await axios.post(
+        'http://localhost:5001/notifications/mark-read',
+        { up_to_id: latestNotificationId.current },
+        { headers: authHeaders() }
+      );
+      setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+      setUnreadCount(0);
+    } catch (error) {
+      toast({
+        title: 'Error',
+        description: error.response?.data?.error || 'Failed to mark notifications read.',
+        status: 'error',
+        duration: 3000,
+        isClosable: true,
+      });
+    }
+  };
+
   const handleGoalChange = (e) => {
     setGoalForm({ ...goalForm, [e.target.name]: e.target.value });
   };
@@ -127,7 +188,7 @@ const Dashboard = () => {
     setLoading(true);
     try {
       await axios.post('http://localhost:5001/savings-goals', goalForm, {
-        headers: { 'X-Username': username },
+        headers: authHeaders(),
       });
       toast({
         title: 'Success',
@@ -138,7 +199,7 @@ const Dashboard = () => {
       });
       setGoalForm({ name: '', target_amount: '', deadline: '' });
       const response = await axios.get('http://localhost:5001/savings-goals', {
-        headers: { 'X-Username': username },
+        headers: authHeaders(),
       });
       const formattedGoals = response.data.goals.map(goal => ({
         ...goal,
@@ -163,7 +224,7 @@ const Dashboard = () => {
     setLoading(true);
     try {
       await axios.post('http://localhost:5001/budgets', budgetForm, {
-        headers: { 'X-Username': username },
+        headers: authHeaders(),
       });
       toast({
         title: 'Success',
@@ -174,7 +235,7 @@ const Dashboard = () => {
       });
       setBudgetForm({ category: '', amount: '' });
       const response = await axios.get('http://localhost:5001/budgets', {
-        headers: { 'X-Username': username },
+        headers: authHeaders(),
       });
       setBudgets(response.data.budgets.map(b => ({
         ...b,
@@ -194,14 +255,10 @@ const Dashboard = () => {
   };
 
   const handleLogout = () => {
-    localStorage.removeItem('username');
-    localStorage.removeItem('user_id');
+    clearSession();
     navigate('/login');
   };
 
-  // Count unread notifications
-  const unreadCount = notifications.filter(n => !n.is_read).length;
-
   return (
     <Box
       minH="100vh"
@@ -296,17 +353,27 @@ const Dashboard = () => {
                       ))}
                   </VStack>
                 )}
-                <Button
-                  colorScheme="teal"
-                  size="sm"
-                  mt={4}
-                  onClick={() => {
-                    onClose();
-                    navigate('/notifications');
-                  }}
-                >
-                  View All Notifications
-                </Button>
+                <Flex gap={2} mt={4}>
+                  <Button
+                    colorScheme="teal"
+                    size="sm"
+                    onClick={() => {
+                      onClose();
+                      navigate('/notifications');
+                    }}
+                  >
+                    View All Notifications
+                  </Button>
+                  <Button
+                    colorScheme="teal"
+                    variant="outline"
+                    size="sm"
+                    isDisabled={unreadCount === 0}
+                    onClick={handleMarkAllRead}
+                  >
+                    Mark All Read
+                  </Button>
+                </Flex>
               </DrawerBody>
             </DrawerContent>
           </Drawer>
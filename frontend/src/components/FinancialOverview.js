@@ -33,10 +33,11 @@ import {
 } from '@chakra-ui/react';
 import { InfoIcon, CheckCircleIcon, ArrowForwardIcon, QuestionIcon } from '@chakra-ui/icons';
 import { useNavigate } from 'react-router-dom';
-import axios from 'axios';
 import { useToast } from '@chakra-ui/react';
 import { Pie } from 'react-chartjs-2';
 import { Chart as ChartJS, ArcElement, Tooltip as ChartTooltip, Legend } from 'chart.js';
+import { readEventStream, throwIfFailed } from '../eventStream';
+import { authHeaders } from '../auth';
 
 // Register Chart.js components
 ChartJS.register(ArcElement, ChartTooltip, Legend);
@@ -51,18 +52,31 @@ const FinancialOverview = () => {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
 
-  // Fetch transaction report
+  // Fetch transaction report: numbers arrive first, insights stream in after
   useEffect(() => {
     const fetchReport = async () => {
       try {
-        const reportResponse = await axios.get('http://localhost:5001/transaction-report', {
-          headers: { 'X-Username': username },
+        const response = await fetch('http://localhost:5001/transaction-report/insights/stream', {
+          headers: authHeaders(),
+        });
+        await throwIfFailed(response, 'Failed to fetch report.');
+        let streamed = '';
+        await readEventStream(response, (event, data) => {
+          if (event === 'report') {
+            setReport({ ...data, ai_insights: '' });
+          } else if (event === 'insights') {
+            setReport((prev) => ({ ...prev, ai_insights: data.text }));
+          } else if (event === 'token') {
+            streamed += data.text;
+            setReport((prev) => ({ ...prev, ai_insights: streamed }));
+          } else if (event === 'error') {
+            setReport((prev) => ({ ...prev, ai_insights: prev.ai_insights || data.error }));
+          }
         });
-        setReport(reportResponse.data);
       } catch (error) {
         toast({
           title: 'Error',
-          description: error.response?.data?.error || 'Failed to fetch report.',
+          description: error.message || 'Failed to fetch report.',
           status: 'error',
           duration: 3000,
           isClosable: true,
@@ -103,19 +117,26 @@ const FinancialOverview = () => {
     setLoading(true);
 
     try {
-      const response = await axios.post(
-        'http://localhost:5001/chat',
-        { query: input, financialData: report },
-        { headers: { 'X-Username': username } }
-      );
-      const botMessage = { type: 'bot', text: response.data.response };
-      setMessages((prev) => [...prev, botMessage]);
+      const response = await fetch('http://localhost:5001/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
+        body: JSON.stringify({ query: input, financialData: report }),
+      });
+      await throwIfFailed(response, 'Failed to get response.');
+      setMessages((prev) => [...prev, { type: 'bot', text: '' }]);
+      let answer = '';
+      await readEventStream(response, (event, data) => {
+        if (event === 'token') answer += data.text;
+        else if (event === 'error') answer = data.error;
+        else return;
+        setMessages((prev) => [...prev.slice(0, -1), { type: 'bot', text: answer }]);
+      });
     } catch (error) {
       const errorMessage = { type: 'bot', text: 'Sorry, something went wrong. Try again!' };
       setMessages((prev) => [...prev, errorMessage]);
       toast({
         title: 'Chat Error',
-        description: error.response?.data?.error || 'Failed to get response.',
+        description: error.message || 'Failed to get response.',
         status: 'error',
         duration: 3000,
         isClosable: true,
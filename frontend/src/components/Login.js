@@ -36,6 +36,7 @@ const Login = () => {
         duration: 3000,
         isClosable: true,
       });
+      localStorage.setItem('token', response.data.token);
       localStorage.setItem('username', response.data.username);
       localStorage.setItem('user_id', response.data.user_id);
       setFormData({ username: '', password: '' });
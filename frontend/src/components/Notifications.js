@@ -12,21 +12,25 @@ import {
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { useToast } from '@chakra-ui/toast';
+import { authHeaders } from '../auth';
 
 const Notifications = () => {
   const navigate = useNavigate();
   const toast = useToast();
   const username = localStorage.getItem('username') || 'User';
   const [notifications, setNotifications] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  // Fetch notifications
+  // Fetch the newest page of notifications
   useEffect(() => {
     const fetchNotifications = async () => {
       try {
         const response = await axios.get('http://localhost:5001/notifications', {
-          headers: { 'X-Username': username },
+          headers: authHeaders(),
         });
         setNotifications(response.data.notifications);
+        setNextCursor(response.data.next_cursor);
       } catch (error) {
         toast({
           title: 'Error',
@@ -40,6 +44,28 @@ const Notifications = () => {
     fetchNotifications();
   }, [username, toast]);
 
+  // Fetch the next (older) page of notifications
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await axios.get('http://localhost:5001/notifications', {
+        headers: authHeaders(),
+        params: { before_id: nextCursor },
+      });
+      setNotifications(prev => [...prev, ...response.data.notifications]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      toast({
+        title: 'Error',
+        description: error.response?.data?.error || 'Failed to fetch notifications.',
+        status: 'error',
+        duration: 3000,
+        isClosable: true,
+      });
+    }
+    setLoadingMore(false);
+  };
+
   // Group notifications by date
   const groupByDate = (nots) => {
     const grouped = {};
@@ -120,6 +146,17 @@ const Notifications = () => {
               </Box>
             ))
           )}
+          {nextCursor && (
+            <Button
+              colorScheme="teal"
+              variant="outline"
+              alignSelf="center"
+              isLoading={loadingMore}
+              onClick={loadMore}
+            >
+              Load More
+            </Button>
+          )}
         </VStack>
       </Box>
     </Box>
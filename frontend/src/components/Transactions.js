@@ -25,9 +25,12 @@ import {
 import { ArrowBackIcon } from '@chakra-ui/icons';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
+import { authHeaders } from '../auth';
 
 const Transactions = () => {
   const [transactions, setTransactions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [goals, setGoals] = useState([]);
   const [budgets, setBudgets] = useState([]);
   const [formData, setFormData] = useState({
@@ -53,17 +56,19 @@ const Transactions = () => {
       try {
         const [transactionsRes, goalsRes, budgetsRes] = await Promise.all([
           axios.get('http://localhost:5001/transactions', {
-            headers: { 'X-Username': username },
+            headers: authHeaders(),
+            params: { limit: 50 },
           }),
           axios.get('http://localhost:5001/savings-goals', {
-            headers: { 'X-Username': username },
+            headers: authHeaders(),
           }),
           axios.get('http://localhost:5001/budgets', {
-            headers: { 'X-Username': username },
+            headers: authHeaders(),
           }),
         ]);
 
         setTransactions(transactionsRes.data.transactions);
+        setNextCursor(transactionsRes.data.next_cursor);
         setGoals(goalsRes.data.goals);
         setBudgets(budgetsRes.data.budgets);
       } catch (error) {
@@ -111,12 +116,12 @@ const Transactions = () => {
           budget_id: formData.budget_id || null,
         },
         {
-          headers: { 'X-Username': username },
+          headers: authHeaders(),
         }
       );
       toast({
         title: 'Success',
-        description: `Transaction added. AI Category: ${response.data.ai_category}`,
+        description: `Transaction added. AI Category: ${response.data.ai_category || 'pending'}`,
         status: 'success',
         duration: 3000,
         isClosable: true,
@@ -146,6 +151,29 @@ const Transactions = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await axios.get('http://localhost:5001/transactions', {
+        headers: authHeaders(),
+        params: { limit: 50, cursor: nextCursor },
+      });
+      setTransactions([...transactions, ...response.data.transactions]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading transactions:', error);
+      toast({
+        title: 'Error',
+        description: error.response?.data?.error || 'Failed to load more transactions',
+        status: 'error',
+        duration: 3000,
+        isClosable: true,
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (transactionId) => {
     if (!window.confirm('Are you sure you want to delete this transaction?')) {
       return;
@@ -153,7 +181,7 @@ const Transactions = () => {
 
     try {
       await axios.delete(`http://localhost:5001/transactions/${transactionId}`, {
-        headers: { 'X-Username': username },
+        headers: authHeaders(),
       });
       setTransactions(transactions.filter((t) => t.id !== transactionId));
       toast({
@@ -343,6 +371,19 @@ const Transactions = () => {
               ))}
             </Tbody>
           </Table>
+          {nextCursor && (
+            <Button
+              mt={4}
+              colorScheme="teal"
+              variant="outline"
+              width="full"
+              isLoading={loadingMore}
+              loadingText="Loading..."
+              onClick={handleLoadMore}
+            >
+              Load More
+            </Button>
+          )}
         </Box>
 
         <Box
@@ -373,7 +414,7 @@ const Transactions = () => {
                   borderColor="teal.300"
                 >
                   <Text fontWeight="bold" color="teal.800">{transaction.description}</Text>
-                  <Text color="teal.600">AI Category: {transaction.ai_category}</Text>
+                  <Text color="teal.600">AI Category: {transaction.ai_category || 'Pending'}</Text>
                   <Text color="teal.600">Amount: ${Math.abs(transaction.amount).toFixed(2)}</Text>
                   <Text color="teal.600">Type: {transaction.amount < 0 ? 'Debit' : 'Credit'}</Text>
                 </Box>
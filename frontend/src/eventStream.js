@@ -0,0 +1,38 @@
+// Read a Server-Sent Events response from fetch, calling onEvent(name, data) per event.
+// EventSource can't send the Authorization header, so the stream is parsed by hand.
+// Comment lines (': heartbeat') only keep the connection alive and are skipped.
+export const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const chunk = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let data = '';
+      let hasFields = false;
+      chunk.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) {
+          event = line.slice(7);
+          hasFields = true;
+        } else if (line.startsWith('data: ')) {
+          data += line.slice(6);
+          hasFields = true;
+        }
+      });
+      if (hasFields) onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+};
+
+export const throwIfFailed = async (response, fallback) => {
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}));
+    throw new Error(body.error || fallback);
+  }
+};